@@ -0,0 +1,183 @@
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Priorities, lower is served first
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Priority of the work running in this context; set per request and
+# inherited by the tasks it submits to the inference pools
+request_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed. status_code is 429 when the caller is over
+    its own rate, 503 when the service is at capacity.
+    """
+
+    def __init__(self, message, status_code=503, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` saved up. A rate of 0 admits everything."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, tokens=1):
+        """Takes `tokens` and returns 0, or returns the seconds until they are available and takes nothing."""
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.burst)  # A large batch waits for a full bucket, not forever
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    One TokenBucket per key (e.g. a user or client address), for the `max_keys`
+    most recently seen keys. `admit` raises Overloaded with `status_code` for
+    keys over their rate: 429 for a client's own limit, 503 for a shared budget.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, status_code=429):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.status_code = status_code
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "rejected": 0}
+
+    def admit(self, key, cost=1):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+        wait = bucket.take(cost)
+        with self._lock:
+            self._stats["rejected" if wait else "admitted"] += 1
+        if wait:
+            message = "Too many requests, please slow down." if self.status_code == 429 \
+                else "The service is at capacity, please retry shortly."
+            raise Overloaded(message, self.status_code, wait)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, rate=self.rate, burst=self.burst, tracked_keys=len(self._buckets))
+
+
+class PriorityLimiter:
+    """
+    Allows `max_concurrent` callers at a time. Others wait in a queue where
+    interactive work goes before bulk work, first come first served within a
+    priority. A caller is shed with Overloaded (503) when `max_queue` are
+    already waiting or after waiting `max_wait` seconds.
+
+    `on_wait(name, priority, seconds)`, if given, is called with every wait
+    time, including the zero waits of callers admitted straight away.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue=64, max_wait=5.0, on_wait=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.on_wait = on_wait
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiters = []  # Heap of [priority, sequence, granted]
+        self._sequence = itertools.count()
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "timed_out": 0,
+                       "wait_seconds_total": 0.0, "max_wait_seconds": 0.0}
+
+    @contextmanager
+    def slot(self, priority=None):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority=None):
+        priority = request_priority.get() if priority is None else priority
+        started_at = time.monotonic()
+        with self._condition:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._in_flight += 1
+                self._stats["admitted"] += 1
+            else:
+                if len(self._waiters) >= self.max_queue:
+                    self._stats["rejected_queue_full"] += 1
+                    raise Overloaded(f"{self.name} is at capacity, please retry shortly.", 503, self.max_wait)
+                waiter = [priority, next(self._sequence), False]
+                heapq.heappush(self._waiters, waiter)
+                self._stats["queued"] += 1
+                deadline = started_at + self.max_wait
+                while not waiter[2]:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiters.remove(waiter)
+                        heapq.heapify(self._waiters)
+                        self._stats["timed_out"] += 1
+                        raise Overloaded(f"Timed out waiting for {self.name}, please retry shortly.", 503,
+                                         self.max_wait)
+                    self._condition.wait(remaining)
+                self._stats["admitted"] += 1  # The releasing caller handed its slot over
+            waited = time.monotonic() - started_at
+            self._stats["wait_seconds_total"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+        if self.on_wait is not None:
+            self.on_wait(self.name, priority, waited)
+
+    def release(self):
+        with self._condition:
+            if self._waiters:
+                heapq.heappop(self._waiters)[2] = True
+                self._condition.notify_all()
+            else:
+                self._in_flight -= 1
+
+    def queue_depth(self):
+        """Waiting callers per priority name."""
+        with self._condition:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._waiters:
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                depth[name] = depth.get(name, 0) + 1
+            return depth
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats, in_flight=self._in_flight, max_concurrent=self.max_concurrent)
+        stats["queue_depth"] = self.queue_depth()
+        wait_seconds_total = stats.pop("wait_seconds_total")
+        stats["avg_wait_ms"] = round(wait_seconds_total / stats["admitted"] * 1000, 2) if stats["admitted"] else 0.0
+        stats["max_wait_ms"] = round(stats.pop("max_wait_seconds") * 1000, 2)
+        return stats
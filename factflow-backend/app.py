@@ -1,42 +1,99 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, Request, g
 import requests
 import time
+import threading
+import contextvars
 from tabulate import tabulate
-from deep_translator import GoogleTranslator
-import langdetect
-import google.generativeai as genai
 import pytesseract # Added for OCR
 from PIL import Image # Added for Image handling
 import io # Added for reading image stream
+import base64
+import itertools
+import math
 import os
-import re
+import queue
 from flask_cors import CORS  # Import CORS for cross-origin support
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
 from bson import ObjectId
+from bson.errors import InvalidId
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
+from verdict_cache import VerdictCache, make_cache_key
+from model_race import race_models, check_race_cancelled, RaceCancelled
+from circuit_breaker import CircuitBreaker
+from http_pool import create_pooled_session, pool_stats
+from coalescing import SingleFlight
+from translation import Translator, google_translate
+from input_validator import InputValidator
+from language_id import LanguageDetector
+from ocr_service import OcrService, OcrQueueFull
+from jobs import JobStore
+from image_cache import ImageCache
+from claim_index import ClaimIndex
+from claims import ClaimSplitter, aggregate_claim_verdicts, estimate_tokens
+from history_sink import HistorySink, HistoryBacklogFull
+from keep_warm import ModelWarmer
+from resources import LazyResource, LazyCollection, warm_up_in_background
+from metrics import MetricsRegistry, SampledLog, ContextThreadPoolExecutor, mongo_command_listener, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from auth import PasswordHasher, SessionTokens, UserCache
+from admission import RateLimiter, PriorityLimiter, Overloaded, request_priority, INTERACTIVE, BULK, PRIORITY_NAMES
+from gemini_output import BATCH_VERDICT_SCHEMA, VERDICT_SCHEMA, VerdictStreamParser, parse_verdict
 
 # Load environment variables from .env file if present
 load_dotenv()
 
 # --- Configuration ---
+class InMemoryRequest(Request):
+    """Keeps uploaded files in memory instead of spooling large ones to a temp file."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+
+# OCR worker processes import the main script as "__mp_main__" when the app runs
+# with `python app.py`; they need none of the app's background startup work
+IN_OCR_WORKER = __name__ == '__mp_main__'
 CORS(app)  # Enable CORS for all routes
 
-# Create a directory to save uploaded images
+# Uploads are kept in memory, so their size is bounded
+OCR_MAX_UPLOAD_MB = int(os.environ.get("OCR_MAX_UPLOAD_MB", "16"))
+app.config['MAX_CONTENT_LENGTH'] = OCR_MAX_UPLOAD_MB * 1024 * 1024
+
+# Older versions saved uploaded images here, leftovers are removed at startup
 UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif'}
 
 # Configure Gemini API key from environment variables
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+
+def create_gemini_model():
+    # google.generativeai takes most of a second to import, so it is loaded on first use
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+gemini_model = LazyResource("gemini", create_gemini_model)
+
+# Bump whenever the Gemini prompt changes so cached verdicts are not reused
+GEMINI_PROMPT_VERSION = "v2"
+# Caps the justification; a cut-off answer keeps its verdict
+GEMINI_MAX_OUTPUT_TOKENS = int(os.environ.get("GEMINI_MAX_OUTPUT_TOKENS", "400"))
+GEMINI_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": VERDICT_SCHEMA,
+    "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS
+}
 
 # Hugging Face API Token from environment variables
 HF_API_TOKEN = os.environ.get("HF_API_TOKEN", "")
 HEADERS = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+# Base URL of the inference API, e.g. a local stand-in for load tests
+HF_INFERENCE_URL = os.environ.get("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models").rstrip("/")
 
 # List of fake news detection models to try
 # These are more modern or specialized for fake news detection
@@ -51,6 +108,49 @@ FAKE_NEWS_MODELS = [
 # Primary model to use first
 PRIMARY_MODEL = FAKE_NEWS_MODELS[0]
 
+# Where FAKE_NEWS_MODELS run: "remote" uses the hosted inference API, "local" runs
+# LOCAL_INFERENCE_MODELS on this machine's CPU and keeps the rest on the hosted API
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "remote").lower()
+LOCAL_INFERENCE_MODELS = [
+    model.strip() for model in os.environ.get("LOCAL_INFERENCE_MODELS", ",".join(FAKE_NEWS_MODELS[:2])).split(",")
+    if model.strip()
+]
+LOCAL_MODEL_DIR = os.environ.get("LOCAL_MODEL_DIR") or None  # Hugging Face cache holding the downloaded weights
+LOCAL_MAX_BATCH_SIZE = int(os.environ.get("LOCAL_MAX_BATCH_SIZE", "16"))
+LOCAL_MAX_WAIT_MS = float(os.environ.get("LOCAL_MAX_WAIT_MS", "10"))  # How long a batch waits to fill up
+LOCAL_WORKERS = int(os.environ.get("LOCAL_WORKERS", "2"))
+LOCAL_QUANTIZE = os.environ.get("LOCAL_QUANTIZE", "false").lower() == "true"  # Dynamic int8 quantization
+LOCAL_USE_ONNX = os.environ.get("LOCAL_USE_ONNX", "false").lower() == "true"  # Load exported ONNX weights
+
+# Hugging Face connection pool settings
+HF_POOL_MAXSIZE = int(os.environ.get("HF_POOL_MAXSIZE", "32"))  # Keep-alive connections per host
+HF_CONNECT_TIMEOUT = float(os.environ.get("HF_CONNECT_TIMEOUT", "3.05"))
+HF_READ_TIMEOUT = float(os.environ.get("HF_READ_TIMEOUT", "20"))
+
+# Circuit breaker settings, one breaker per model
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_BASE_BACKOFF_SECONDS = float(os.environ.get("BREAKER_BASE_BACKOFF_SECONDS", "5"))
+BREAKER_MAX_BACKOFF_SECONDS = float(os.environ.get("BREAKER_MAX_BACKOFF_SECONDS", "300"))
+# Status codes that mean the model is unhealthy rather than the input being bad
+BREAKER_FAILURE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+hf_session = create_pooled_session(headers=HEADERS, pool_connections=4, pool_maxsize=HF_POOL_MAXSIZE)
+model_breakers = {
+    model: CircuitBreaker(
+        model,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        base_backoff=BREAKER_BASE_BACKOFF_SECONDS,
+        max_backoff=BREAKER_MAX_BACKOFF_SECONDS
+    )
+    for model in FAKE_NEWS_MODELS
+}
+
+# Keep-warm settings: hosted models are probed in the background and the fastest warm one is tried first
+KEEP_WARM_ENABLED = os.environ.get("KEEP_WARM_ENABLED", "false").lower() == "true"
+KEEP_WARM_INTERVAL_SECONDS = float(os.environ.get("KEEP_WARM_INTERVAL_SECONDS", "240"))  # Idle models are probed this often
+KEEP_WARM_REORDER_MARGIN = float(os.environ.get("KEEP_WARM_REORDER_MARGIN", "1.25"))  # How much faster a model must be to move up
+KEEP_WARM_PROBE_TEXT = os.environ.get("KEEP_WARM_PROBE_TEXT", "Water boils at 100 degrees Celsius at sea level.")
+
 # List of supported languages for translation
 SUPPORTED_LANGUAGES = {
     'en': 'English',
@@ -70,130 +170,513 @@ SUPPORTED_LANGUAGES = {
     'kn': 'Kannada'
 }
 
+# Inference settings
+# "concurrent" races FAKE_NEWS_MODELS with hedged starts and runs Gemini alongside them,
+# "sequential" tries the models one after another and asks Gemini afterwards
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "concurrent").lower()
+INFERENCE_HEDGE_DELAY_SECONDS = float(os.environ.get("INFERENCE_HEDGE_DELAY_SECONDS", "2.0"))  # Head start per model
+INFERENCE_DEADLINE_SECONDS = float(os.environ.get("INFERENCE_DEADLINE_SECONDS", "30.0"))  # Bound on model + Gemini time
+INFERENCE_MAX_WORKERS = int(os.environ.get("INFERENCE_MAX_WORKERS", "32"))
+INFERENCE_HEDGE_WORKERS = int(os.environ.get("INFERENCE_HEDGE_WORKERS", "4"))  # Threads for hedged model calls
+
+# Shared pool for upstream model calls; tasks keep the request context for stage timings
+inference_executor = ContextThreadPoolExecutor(max_workers=INFERENCE_MAX_WORKERS, thread_name_prefix="inference")
+# Hedged calls that lose a race run on until their upstream answers; they wait for
+# these few threads instead of taking workers from inference_executor
+hedge_executor = ContextThreadPoolExecutor(max_workers=INFERENCE_HEDGE_WORKERS, thread_name_prefix="hedge")
+
+# Batch checking settings
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "500"))  # Texts accepted per /check_news_batch call
+HF_BATCH_SIZE = int(os.environ.get("HF_BATCH_SIZE", "16"))  # Texts sent per Hugging Face "inputs" array
+GEMINI_BATCH_SIZE = int(os.environ.get("GEMINI_BATCH_SIZE", "10"))  # Claims packed into one Gemini prompt
+
+# Batch chunks run here so they never wait on a slot in inference_executor
+batch_executor = ContextThreadPoolExecutor(max_workers=4, thread_name_prefix="batch")
+
+# Claim segmentation settings: long texts (articles, OCR output) are checked claim by claim
+SEGMENT_MIN_TOKENS = int(os.environ.get("SEGMENT_MIN_TOKENS", "80"))  # Shorter texts are checked whole, 0 disables
+MAX_CLAIMS = int(os.environ.get("MAX_CLAIMS", "8"))  # Claims checked per text
+CLAIM_TOKEN_BUDGET = int(os.environ.get("CLAIM_TOKEN_BUDGET", "600"))  # Estimated model tokens checked per text
+MAX_CLAIM_TOKENS = int(os.environ.get("MAX_CLAIM_TOKENS", "128"))  # Longer sentences are cut
+
+claim_splitter = ClaimSplitter(max_claims=MAX_CLAIMS, max_claim_tokens=MAX_CLAIM_TOKENS, token_budget=CLAIM_TOKEN_BUDGET)
+
+# Coalesces identical texts checked concurrently into one pipeline run
+inflight_checks = SingleFlight()
+
+# Validation tables are compiled once at startup
+input_validator = InputValidator()
+
+# Language identification settings
+LANGUAGE_DETECTOR = os.environ.get("LANGUAGE_DETECTOR", "langdetect").lower()  # "langdetect" or "langid"
+LANGUAGE_DETECT_MAX_CHARS = int(os.environ.get("LANGUAGE_DETECT_MAX_CHARS", "2000"))  # Text read per detection
+LANGUAGE_MEMO_MAX_CHARS = int(os.environ.get("LANGUAGE_MEMO_MAX_CHARS", "512"))  # Longer texts are not memoized
+
+# Profiles are loaded here instead of on the first request
+language_detector = LanguageDetector(
+    SUPPORTED_LANGUAGES,
+    backend=LANGUAGE_DETECTOR,
+    max_text_chars=LANGUAGE_DETECT_MAX_CHARS,
+    memo_max_chars=LANGUAGE_MEMO_MAX_CHARS
+)
+
+# OCR settings
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 2)))  # OCR worker processes
+OCR_QUEUE_SIZE = int(os.environ.get("OCR_QUEUE_SIZE", "16"))  # Images waiting for a worker before 429s
+OCR_JOB_TTL_SECONDS = int(os.environ.get("OCR_JOB_TTL_SECONDS", "600"))  # How long async results can be polled
+OCR_MAX_DIMENSION = int(os.environ.get("OCR_MAX_DIMENSION", "2000"))  # Images are downscaled to this size
+OCR_BINARIZE = os.environ.get("OCR_BINARIZE", "true").lower() == "true"  # Binarize and crop to the text
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+
+# The worker processes start with the first image, in the process that serves it
+ocr_service = OcrService(
+    processes=OCR_WORKERS,
+    max_queue=OCR_QUEUE_SIZE,
+    engine_options={"lang": OCR_LANG, "max_dimension": OCR_MAX_DIMENSION, "binarize": OCR_BINARIZE}
+)
+# Images submitted with ?async=true are checked here and polled through /check_news_image/jobs/<job_id>
+ocr_jobs = JobStore(
+    ThreadPoolExecutor(max_workers=OCR_WORKERS + OCR_QUEUE_SIZE, thread_name_prefix="ocr-job"),
+    ttl_seconds=OCR_JOB_TTL_SECONDS
+)
+
+# Per-request stage timings, reported in the Server-Timing response header
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+# --- Metrics ---
+# Share of verbose logs (model responses, OCR text, request traces) that are printed
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+log_sampled = SampledLog(LOG_SAMPLE_RATE)
+
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "factflow_stage_seconds", "Time spent in each pipeline stage.", ["stage"])
+UPSTREAM_SECONDS = metrics.histogram(
+    "factflow_upstream_seconds", "Latency of calls to Hugging Face, Gemini, Google Translate and MongoDB.",
+    ["upstream", "target", "outcome"])
+UPSTREAM_RESPONSES = metrics.counter(
+    "factflow_upstream_responses_total", "Upstream calls by response status.", ["upstream", "target", "status"])
+REQUEST_SECONDS = metrics.histogram(
+    "factflow_request_seconds", "Time to produce a response, per route.", ["route", "method", "status"])
+VERDICTS = metrics.counter(
+    "factflow_verdicts_total", "Freshly computed verdicts, and whether Gemini overrode the primary model.",
+    ["label", "fallback_triggered"])
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "factflow_queue_wait_seconds", "Time spent waiting for a check or upstream slot.", ["limiter", "priority"])
+QUEUE_DEPTH = metrics.gauge(
+    "factflow_queue_depth", "Callers waiting for a check or upstream slot.", ["limiter", "priority"])
+IN_FLIGHT = metrics.gauge(
+    "factflow_in_flight", "Checks and upstream calls holding a slot.", ["limiter"])
+
+
+def record_timing(stage, seconds):
+    """Adds a stage duration to the stage histogram and to the current request's timings, if it is timed."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def record_upstream(upstream, target, seconds, status):
+    """Records one upstream call; status is an HTTP status code, "ok" or an error name."""
+    outcome = "ok" if status == "ok" or (isinstance(status, int) and status < 400) else "error"
+    UPSTREAM_SECONDS.observe(seconds, upstream=upstream, target=target, outcome=outcome)
+    UPSTREAM_RESPONSES.inc(upstream=upstream, target=target, status=status)
+
+
+def record_queue_wait(limiter, priority, seconds):
+    QUEUE_WAIT_SECONDS.observe(seconds, limiter=limiter, priority=PRIORITY_NAMES.get(priority, priority))
+    if seconds:
+        record_timing("queue_wait", seconds)
+
+
+# --- Admission Control ---
+# Clients are rate limited on every check; checks that miss the verdict cache
+# also draw on a shared budget and wait for one of MAX_CONCURRENT_CHECKS slots.
+# Interactive requests are served before /check_news_batch work in every queue.
+ADMISSION_CLIENT_RATE = float(os.environ.get("ADMISSION_CLIENT_RATE", "2"))  # Checks per second per client, 0 disables
+ADMISSION_CLIENT_BURST = int(os.environ.get("ADMISSION_CLIENT_BURST", "20"))
+# Reverse proxies in front of the app; their X-Forwarded-For entries name the client
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", "0"))
+ADMISSION_GLOBAL_RATE = float(os.environ.get("ADMISSION_GLOBAL_RATE", "20"))  # Uncached checks per second, 0 disables
+ADMISSION_GLOBAL_BURST = int(os.environ.get("ADMISSION_GLOBAL_BURST", "40"))
+MAX_CONCURRENT_CHECKS = int(os.environ.get("MAX_CONCURRENT_CHECKS", "32"))
+CHECK_QUEUE_SIZE = int(os.environ.get("CHECK_QUEUE_SIZE", "64"))  # Beyond this, checks get a 503
+CHECK_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("CHECK_QUEUE_TIMEOUT_SECONDS", "10"))
+# In-flight calls per upstream, so a spike queues here instead of hitting their rate limits
+HF_MAX_CONCURRENT = int(os.environ.get("HF_MAX_CONCURRENT", "8"))  # Per FAKE_NEWS_MODELS entry
+GEMINI_MAX_CONCURRENT = int(os.environ.get("GEMINI_MAX_CONCURRENT", "16"))
+TRANSLATOR_MAX_CONCURRENT = int(os.environ.get("TRANSLATOR_MAX_CONCURRENT", "8"))
+UPSTREAM_QUEUE_SIZE = int(os.environ.get("UPSTREAM_QUEUE_SIZE", "64"))
+UPSTREAM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT_SECONDS", "5"))
+
+if TRUSTED_PROXY_COUNT > 0:
+    # Without this, every client behind the proxy would share the proxy's rate limit
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
+client_limiter = RateLimiter(ADMISSION_CLIENT_RATE, ADMISSION_CLIENT_BURST)
+check_budget = RateLimiter(ADMISSION_GLOBAL_RATE, ADMISSION_GLOBAL_BURST, status_code=503)
+check_slots = PriorityLimiter("checks", MAX_CONCURRENT_CHECKS, CHECK_QUEUE_SIZE, CHECK_QUEUE_TIMEOUT_SECONDS,
+                              on_wait=record_queue_wait)
+upstream_limiters = {
+    name: PriorityLimiter(name, max_concurrent, UPSTREAM_QUEUE_SIZE, UPSTREAM_QUEUE_TIMEOUT_SECONDS,
+                          on_wait=record_queue_wait)
+    for name, max_concurrent in [(model, HF_MAX_CONCURRENT) for model in FAKE_NEWS_MODELS]
+    + [("gemini", GEMINI_MAX_CONCURRENT), ("translator", TRANSLATOR_MAX_CONCURRENT)]
+}
+
+
+def overloaded_response(error):
+    """429 or 503 response, with Retry-After, for a shed request."""
+    return {"error": f"🚦 {error}", "retry_after": error.retry_after}, error.status_code, \
+        {"Retry-After": str(error.retry_after)}
+
+
+def timed_google_translate(text, target_lang, source_lang):
+    """google_translate with its latency and outcome recorded, within the translator's concurrency limit."""
+    with upstream_limiters["translator"].slot():
+        started_at = time.perf_counter()
+        status = "ok"
+        try:
+            return google_translate(text, target_lang, source_lang)
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            record_upstream("google_translate", target_lang, time.perf_counter() - started_at, status)
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
+
+# Translation cache settings
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", "5000"))
+# Translate the verdict labels into every supported language at startup
+TRANSLATION_PRECOMPUTE_LABELS = os.environ.get("TRANSLATION_PRECOMPUTE_LABELS", "true").lower() == "true"
+VERDICT_LABELS = ["REAL", "FAKE", "UNSURE"]
+
+translator = Translator(backend=timed_google_translate, max_entries=TRANSLATION_CACHE_MAX_ENTRIES)
+if TRANSLATION_PRECOMPUTE_LABELS and not IN_OCR_WORKER:
+    # Runs in the background so a slow or offline translator does not delay startup
+    threading.Thread(target=translator.pin, args=(VERDICT_LABELS, list(SUPPORTED_LANGUAGES)), daemon=True).start()
+
+# Verdict cache settings
+VERDICT_CACHE_MAX_ENTRIES = int(os.environ.get("VERDICT_CACHE_MAX_ENTRIES", "10000"))
+VERDICT_CACHE_TTL_SECONDS = int(os.environ.get("VERDICT_CACHE_TTL_SECONDS", "3600"))
+VERDICT_CACHE_SHARED = os.environ.get("VERDICT_CACHE_SHARED", "false").lower() == "true"  # Share verdicts through MongoDB
+# Only deterministic outcomes are cached: verdicts and validation rejections
+CACHEABLE_STATUS_CODES = {200, 400}
+
+# Image cache settings: identical uploads, and near-identical ones if enabled, reuse the OCR text and verdict
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+IMAGE_CACHE_TTL_SECONDS = int(os.environ.get("IMAGE_CACHE_TTL_SECONDS", str(VERDICT_CACHE_TTL_SECONDS)))
+# Differing perceptual hash bits still matched; 0 reuses only identical images, since
+# same-layout screenshots of different claims can be a few bits apart
+IMAGE_CACHE_MAX_DISTANCE = int(os.environ.get("IMAGE_CACHE_MAX_DISTANCE", "0"))
+IMAGE_HASH_SIZE = int(os.environ.get("IMAGE_HASH_SIZE", "32"))  # Hash grid side, the hash has 2 * IMAGE_HASH_SIZE^2 bits
+
+image_cache = ImageCache(
+    max_distance=IMAGE_CACHE_MAX_DISTANCE,
+    max_entries=IMAGE_CACHE_MAX_ENTRIES,
+    ttl_seconds=IMAGE_CACHE_TTL_SECONDS,
+    hash_size=IMAGE_HASH_SIZE
+)
+
+# Identifies the model chain that produced a verdict, part of the cache key. Local
+# weights, int8 quantization and ONNX can score differently from the hosted API
+INFERENCE_VERSION = INFERENCE_BACKEND
+if INFERENCE_BACKEND == "local":
+    INFERENCE_VERSION = (f"local:{','.join(LOCAL_INFERENCE_MODELS)}:{LOCAL_MODEL_DIR or 'hf-cache'}"
+                         f"{':int8' if LOCAL_QUANTIZE else ''}{':onnx' if LOCAL_USE_ONNX else ''}")
+MODEL_VERSION = "|".join(FAKE_NEWS_MODELS + [GEMINI_MODEL_NAME, INFERENCE_VERSION])
+
+# Claim index settings: reworded claims reuse the verdict of a claim checked before
+CLAIM_INDEX_ENABLED = os.environ.get("CLAIM_INDEX_ENABLED", "true").lower() == "true"
+CLAIM_MATCH_THRESHOLD = float(os.environ.get("CLAIM_MATCH_THRESHOLD", "0.9"))  # Jaccard similarity of content words
+CLAIM_INDEX_TTL_DAYS = int(os.environ.get("CLAIM_INDEX_TTL_DAYS", "30"))
+
+local_engine = None
+if INFERENCE_BACKEND == "local":
+    from local_inference import LocalInferenceEngine
+    local_engine = LocalInferenceEngine(
+        LOCAL_INFERENCE_MODELS,
+        model_dir=LOCAL_MODEL_DIR,
+        max_batch_size=LOCAL_MAX_BATCH_SIZE,
+        max_wait_ms=LOCAL_MAX_WAIT_MS,
+        num_workers=LOCAL_WORKERS,
+        quantize=LOCAL_QUANTIZE,
+        use_onnx=LOCAL_USE_ONNX
+    )
+
 # --- Helper Functions ---
 
-def get_prediction(model_name, input_text):
-    """Sends text to Hugging Face model for prediction."""
+def get_retry_after(response):
+    """Reads how long the upstream asked us to back off, in seconds."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    # Hugging Face reports how long a cold model needs to load
     try:
-        url = f"https://api-inference.huggingface.co/models/{model_name}"
-        # Add a timeout to prevent indefinite hangs
-        response = requests.post(url, headers=HEADERS, json={"inputs": input_text}, timeout=20)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        result = response.json()
-        print(f"\n🔍 Model ({model_name}) response:", result)
-
-        # Different models use different formats, handle them appropriately
-        # NLI models label format: "entailment", "contradiction", "neutral"
-        # Fake news models label format: "FAKE"/"REAL" or 0/1 etc.
-        
-        if model_name.endswith("mnli") or "fever" in model_name.lower():
-            # For NLI models, we check if the statement is true by checking the "entailment" probability
-            # Prepare a simple claim to test against
-            if isinstance(result, list) and result:
-                if isinstance(result[0], dict) and 'labels' in result[0]:
-                    # Get scores for different labels
-                    label_scores = {label: score for label, score in zip(result[0]['labels'], result[0]['scores'])}
-                    
-                    # For NLI models:
-                    # - If high "entailment" score → REAL
-                    # - If high "contradiction" score → FAKE
-                    # - If high "neutral" score → UNSURE
-                    
-                    # Ensure labels are lowercase for consistency
-                    normalized_scores = {k.lower(): v for k, v in label_scores.items()}
-                    
-                    if 'entailment' in normalized_scores and normalized_scores['entailment'] > 0.5:
-                        label = "REAL"
-                        score = normalized_scores['entailment'] * 10
-                    elif 'contradiction' in normalized_scores and normalized_scores['contradiction'] > 0.5:
-                        label = "FAKE"
-                        score = normalized_scores['contradiction'] * 10
-                    else:
-                        label = "UNSURE"
-                        score = 5.0
-                    
-                    # Ensure score is capped at 10.0 and properly rounded
-                    score = min(round(score, 1), 10.0)
-                    return score, label, result
-                    
-            # If we can't parse NLI format, return None to trigger fallback
-            return None, None, {"error": "Could not parse NLI model response", "details": result}
-
-        # Model sometimes returns a list of lists, handle that
-        if isinstance(result, list) and result and isinstance(result[0], list):
-            predictions = result[0]
-        elif isinstance(result, list):
-             predictions = result # Original expected format
-        else:
-             return None, None, {"error": "Unexpected model response format", "details": result}
+        estimated_time = response.json().get("estimated_time")
+        return float(estimated_time) if estimated_time else None
+    except (ValueError, AttributeError):
+        return None
 
-        if not predictions:
-             return None, None, {"error": "Empty prediction list from model", "details": result}
 
-        # Ensure items in predictions are dictionaries with 'label' and 'score'
-        valid_predictions = [p for p in predictions if isinstance(p, dict) and 'label' in p and 'score' in p]
-        if not valid_predictions:
-            return None, None, {"error": "No valid predictions found in model response", "details": result}
+def parse_prediction(model_name, result):
+    """
+    Turns a Hugging Face model response into (score, label, raw_output).
+    score and label are None when the response cannot be used.
+    """
+    # Different models use different formats, handle them appropriately
+    # NLI models label format: "entailment", "contradiction", "neutral"
+    # Fake news models label format: "FAKE"/"REAL" or 0/1 etc.
+    
+    if model_name.endswith("mnli") or "fever" in model_name.lower():
+        # For NLI models, we check if the statement is true by checking the "entailment" probability
+        # Prepare a simple claim to test against
+        if isinstance(result, list) and result:
+            if isinstance(result[0], dict) and 'labels' in result[0]:
+                # Get scores for different labels
+                label_scores = {label: score for label, score in zip(result[0]['labels'], result[0]['scores'])}
+                
+                # For NLI models:
+                # - If high "entailment" score → REAL
+                # - If high "contradiction" score → FAKE
+                # - If high "neutral" score → UNSURE
+                
+                # Ensure labels are lowercase for consistency
+                normalized_scores = {k.lower(): v for k, v in label_scores.items()}
+                
+                if 'entailment' in normalized_scores and normalized_scores['entailment'] > 0.5:
+                    label = "REAL"
+                    score = normalized_scores['entailment'] * 10
+                elif 'contradiction' in normalized_scores and normalized_scores['contradiction'] > 0.5:
+                    label = "FAKE"
+                    score = normalized_scores['contradiction'] * 10
+                else:
+                    label = "UNSURE"
+                    score = 5.0
+                
+                # Ensure score is capped at 10.0 and properly rounded
+                score = min(round(score, 1), 10.0)
+                return score, label, result
+                
+        # If we can't parse NLI format, return None to trigger fallback
+        return None, None, {"error": "Could not parse NLI model response", "details": result}
+
+    # Model sometimes returns a list of lists, handle that
+    if isinstance(result, list) and result and isinstance(result[0], list):
+        predictions = result[0]
+    elif isinstance(result, list):
+         predictions = result # Original expected format
+    else:
+         return None, None, {"error": "Unexpected model response format", "details": result}
 
-        top_result = max(valid_predictions, key=lambda x: x['score'])
-        
-        # Cap the confidence score at 9.0 to avoid absolute certainty
-        # This will allow Gemini verification for very high confidence results
-        score = min(round(top_result['score'] * 10, 1), 9.0) 
-        
-        label = top_result['label'].upper() # Ensure label is uppercase (FAKE/REAL)
-        # Map common variations if needed (e.g., some models use 0/1 or true/false)
-        if label == 'LABEL_0' or label == '0': label = 'FAKE'
-        if label == 'LABEL_1' or label == '1': label = 'REAL'
+    if not predictions:
+         return None, None, {"error": "Empty prediction list from model", "details": result}
+
+    # Ensure items in predictions are dictionaries with 'label' and 'score'
+    valid_predictions = [p for p in predictions if isinstance(p, dict) and 'label' in p and 'score' in p]
+    if not valid_predictions:
+        return None, None, {"error": "No valid predictions found in model response", "details": result}
+
+    top_result = max(valid_predictions, key=lambda x: x['score'])
+    
+    # Cap the confidence score at 9.0 to avoid absolute certainty
+    # This will allow Gemini verification for very high confidence results
+    score = min(round(top_result['score'] * 10, 1), 9.0) 
+    
+    label = top_result['label'].upper() # Ensure label is uppercase (FAKE/REAL)
+    # Map common variations if needed (e.g., some models use 0/1 or true/false)
+    if label == 'LABEL_0' or label == '0': label = 'FAKE'
+    if label == 'LABEL_1' or label == '1': label = 'REAL'
+
+    return score, label, predictions
+
+
+def query_model(model_name, inputs):
+    """
+    Posts inputs to the Hugging Face inference API through the pooled session,
+    reporting the outcome to the model's circuit breaker.
+    Returns the decoded JSON response or raises requests.exceptions.RequestException,
+    or Overloaded when the model's concurrency limit has no slot in time.
+    """
+    url = f"{HF_INFERENCE_URL}/{model_name}"
+    breaker = model_breakers.get(model_name)
+    # Add a timeout to prevent indefinite hangs
+    with upstream_limiters[model_name].slot():
+        try:
+            # A losing hedged call that waited for this slot hands it on without sending
+            check_race_cancelled()
+        except RaceCancelled:
+            if breaker is not None:
+                breaker.release()
+            raise
+        started_at = time.perf_counter()
+        try:
+            response = hf_session.post(url, json={"inputs": inputs}, timeout=(HF_CONNECT_TIMEOUT, HF_READ_TIMEOUT))
+        except requests.exceptions.RequestException as e:
+            record_upstream("huggingface", model_name, time.perf_counter() - started_at, type(e).__name__)
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except Exception:
+            # Failed before an answer, the breaker learned nothing
+            if breaker is not None:
+                breaker.release()
+            raise
+    if breaker is not None:
+        if response.status_code in BREAKER_FAILURE_STATUS_CODES:
+            breaker.record_failure(retry_after=get_retry_after(response))
+        else:
+            # Any other answer, a 4xx for a bad input included, means the model is up
+            breaker.record_success()
+    record_upstream("huggingface", model_name, time.perf_counter() - started_at, response.status_code)
+    response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+    return response.json()
+
+
+def get_prediction(model_name, input_text):
+    """Sends text to Hugging Face model for prediction."""
+    started_at = time.perf_counter()
+    if local_engine is not None and local_engine.supports(model_name):
+        status = "ok"
+        try:
+            return parse_prediction(model_name, local_engine.predict(model_name, input_text, timeout=HF_READ_TIMEOUT))
+        except Exception as e:
+            status = type(e).__name__
+            print(f"⚠️ Local inference error ({model_name}): {e}")
+            return None, None, {"error": f"Local inference failed: {str(e)}"}
+        finally:
+            record_upstream("local", model_name, time.perf_counter() - started_at, status)
+            record_timing("model_inference", time.perf_counter() - started_at)
+
+    breaker = model_breakers.get(model_name)
+    if breaker is not None and not breaker.allow_request():
+        UPSTREAM_RESPONSES.inc(upstream="huggingface", target=model_name, status="circuit_open")
+        return None, None, {"error": f"Circuit open for {model_name}, skipping model"}
 
-        return score, label, predictions
+    try:
+        result = query_model(model_name, input_text)
+        model_warmer.observe(model_name, "ok", time.perf_counter() - started_at)
+        log_sampled(f"🔍 Model ({model_name}) response: {result}")
+        return parse_prediction(model_name, result)
+    except Overloaded as e:
+        # Busy here, not unhealthy upstream: the next model is tried without tripping the breaker,
+        # and a half-open breaker gets its probe back
+        if breaker is not None:
+            breaker.release()
+        return None, None, {"error": f"{model_name} skipped: {e}"}
+    except RaceCancelled as e:
+        return None, None, {"error": str(e)}
     except requests.exceptions.RequestException as e:
+        model_warmer.observe(model_name, warm_state_outcome(e), time.perf_counter() - started_at)
         print(f"⚠️ Hugging Face API Error ({model_name}): {e}")
         return None, None, {"error": f"API request failed: {str(e)}"}
     except Exception as e:
         print(f"⚠️ Error processing prediction ({model_name}): {e}")
         return None, None, {"error": f"Prediction processing error: {str(e)}"}
+    finally:
+        record_timing("model_inference", time.perf_counter() - started_at)
 
 
-def get_gemini_response(input_text):
-    """Uses Gemini for fallback prediction and explanation."""
-    prompt = (
+def warm_state_outcome(error):
+    """Keep-warm outcome of a failed Hugging Face call: a 503 means the model is cold and loading."""
+    response = getattr(error, "response", None)
+    return "loading" if response is not None and response.status_code == 503 else "error"
+
+
+def probe_model(model_name):
+    """Keep-warm probe: one short inference, queued behind user requests. Returns the outcome for model_warmer."""
+    breaker = model_breakers.get(model_name)
+    if breaker is not None and not breaker.allow_request():
+        return None  # Backing off, or a half-open breaker already has its probe in flight
+    request_priority.set(BULK)
+    try:
+        query_model(model_name, KEEP_WARM_PROBE_TEXT)
+        return "ok"
+    except Overloaded:
+        if breaker is not None:
+            breaker.release()
+        return None  # The model is busy with requests, which report its state themselves
+    except requests.exceptions.RequestException as e:
+        return warm_state_outcome(e)
+
+
+# Models run by the local engine are always warm and are not probed
+model_warmer = ModelWarmer(
+    [model for model in FAKE_NEWS_MODELS if local_engine is None or not local_engine.supports(model)],
+    probe_model,
+    interval=KEEP_WARM_INTERVAL_SECONDS,
+    reorder_margin=KEEP_WARM_REORDER_MARGIN
+)
+
+
+def model_order():
+    """FAKE_NEWS_MODELS in the order to try them: local models first, then hosted ones as ranked by model_warmer."""
+    if not KEEP_WARM_ENABLED:
+        return FAKE_NEWS_MODELS
+    local_models = [model for model in FAKE_NEWS_MODELS if model not in model_warmer.models]
+    return local_models + model_warmer.order()
+
+
+def build_gemini_prompt(input_text):
+    """Builds the Gemini fact-checking prompt. Bump GEMINI_PROMPT_VERSION when changing it."""
+    return (
         "You are an unbiased Fact checker and a Fake News detection system. "
         "Analyze the following text objectively. Do not express personal opinions or feelings. "
         "Focus solely on evaluating the factual nature of the statement based on reliable information. \n\n"
         f"User Input: \"{input_text}\"\n\n"
-        "1. Classification: Classify the input strictly as 'REAL', 'FAKE', or 'UNSURE'. "
-        "2. Confidence Rating: Provide a confidence score for your classification on a scale of 0 to 10 (e.g., Confidence Rating: 8.5). "
-        "3. Justification: Provide a concise, neutral justification for your classification, citing potential evidence or lack thereof if possible. Avoid subjective language."
+        "Respond with a JSON object with the keys \"classification\" (strictly 'REAL', 'FAKE', or 'UNSURE'), "
+        "\"confidence\" (your confidence in the classification on a scale of 0 to 10, e.g. 8.5) and "
+        "\"justification\" (a concise, neutral justification for your classification, citing potential "
+        "evidence or lack thereof if possible. Avoid subjective language)."
     )
-    try:
-        response = gemini_model.generate_content(prompt)
-        response_text = response.text.strip()
-        print(f"\n✨ Gemini Raw Response:\n{response_text}") # Log Gemini output
 
-        # Refined Regex for better extraction
-        label_match = re.search(r"Classification:\s*\b(REAL|FAKE|UNSURE)\b", response_text, re.IGNORECASE)
-        conf_match = re.search(r"Confidence Rating:\s*(\d+(?:\.\d+)?)", response_text, re.IGNORECASE)
 
-        label = label_match.group(1).upper() if label_match else "UNSURE"
-        # Default confidence to 5.0 if not found, ensure it's within 0-10
-        confidence = min(max(float(conf_match.group(1)), 0.0), 10.0) if conf_match else 5.0
-
-        # Extract Justification more reliably
-        justification_match = re.search(r"Justification:(.*)", response_text, re.IGNORECASE | re.DOTALL)
-        explanation = justification_match.group(1).strip() if justification_match else response_text # Fallback to full text
+def get_gemini_response(input_text, on_verdict=None):
+    """
+    Uses Gemini for fallback prediction and explanation. The answer is streamed;
+    on_verdict(confidence, label) is called as soon as the classification and
+    confidence arrive, before the justification is complete.
+    Returns a tuple: (confidence, label, explanation). Raises Overloaded when
+    no Gemini slot frees up in time.
+    """
+    started_at = time.perf_counter()
 
-        # Combine label, confidence, and explanation for the final output string
-        final_explanation = f"Classification: {label}\nConfidence Rating: {confidence}\nJustification: {explanation}"
+    def verdict_received(confidence, label):
+        record_timing("gemini_verdict", time.perf_counter() - started_at)
+        if on_verdict is not None:
+            on_verdict(confidence, label)
 
-        return confidence, label, final_explanation # Return the structured explanation
+    parser = VerdictStreamParser(verdict_received)
+    try:
+        with upstream_limiters["gemini"].slot():
+            response = gemini_model.get().generate_content(
+                build_gemini_prompt(input_text), generation_config=GEMINI_GENERATION_CONFIG, stream=True
+            )
+            for chunk in response:
+                if chunk.parts:
+                    parser.feed(chunk.text)
+        log_sampled(f"✨ Gemini Raw Response: {parser.text}") # Log Gemini output
+        result = parser.result()
+        record_upstream("gemini", GEMINI_MODEL_NAME, time.perf_counter() - started_at, "ok")
+        return result
+    except Overloaded:
+        # Shed the whole check rather than answer without Gemini
+        raise
     except Exception as e:
+        record_upstream("gemini", GEMINI_MODEL_NAME, time.perf_counter() - started_at, type(e).__name__)
         print(f"⚠️ Gemini API Error: {e}")
         # Extract error details if possible from the exception object
         error_details = str(e)
         # Check for specific Gemini error types if the library provides them
         # Example: if isinstance(e, google.api_core.exceptions.PermissionDenied): ...
         return 5.0, "UNSURE", f"⚠️ Gemini Error: {error_details}"
+    finally:
+        record_timing("gemini", time.perf_counter() - started_at)
 
 
 def get_simple_explanation(input_text, label):
@@ -202,120 +685,248 @@ def get_simple_explanation(input_text, label):
     return f"The primary model classified this input as '{label}' based on patterns learned from its training data."
 
 def translate_text(text, target_lang, source_lang='auto'):
-    """Translates text using GoogleTranslator."""
+    """Translates text using GoogleTranslator, through the translation cache."""
     if not text or not target_lang or source_lang == target_lang:
         return text # No translation needed
     try:
-        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+        return translator.translate(text, target_lang, source_lang)
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"⚠️ Translation Error from {source_lang} to {target_lang}: {e}")
         return f"⚠️ Translation Failed: {text}" # Return original text with error marker
 
 
-def process_text_for_fakery(input_text, original_input_identifier="N/A"):
+def run_models_sequentially(text_to_process):
     """
-    Core logic for checking news text. Handles validation, language,
-    prediction, fallback, and translation.
-    Returns a tuple: (response_dict, status_code)
+    Tries each model, in model_order(), until one works.
+    Returns a tuple: (score, label, primary_output, used_model)
     """
-    if not input_text:
-        return {"error": "Input text is empty after processing (e.g., OCR failed or empty input)."}, 400
+    score = None
+    label = None
+    primary_output = None
+    used_model = "None"
+
+    for model in model_order():
+        log_sampled(f"Trying model: {model}")
+        score, label, primary_output = get_prediction(model, text_to_process)
+        if score is not None and label is not None:
+            used_model = model
+            log_sampled(f"✅ Successfully got prediction from {used_model}")
+            break
+
+    return score, label, primary_output, used_model
+
+
+def run_models_concurrently(text_to_process):
+    """
+    Races the models, in model_order(), with hedged starts while Gemini runs in parallel.
+    Both are bounded by INFERENCE_DEADLINE_SECONDS.
+    Returns a tuple: ((score, label, primary_output, used_model), (gemini_score, gemini_label, gemini_explanation))
+    """
+    started_at = time.monotonic()
+    gemini_future = inference_executor.submit(get_gemini_response, text_to_process)
 
-    # --- Language Detection ---
+    model_result = race_models(
+        model_order(), get_prediction, text_to_process, inference_executor,
+        hedge_delay=INFERENCE_HEDGE_DELAY_SECONDS, deadline=INFERENCE_DEADLINE_SECONDS, hedge_executor=hedge_executor
+    )
+    if model_result[3] != "None":
+        log_sampled(f"✅ Successfully got prediction from {model_result[3]}")
+
+    return model_result, wait_for_gemini(gemini_future, started_at)
+
+
+def wait_for_gemini(gemini_future, started_at):
+    """
+    Waits for a Gemini call submitted at `started_at` (time.monotonic()) until
+    INFERENCE_DEADLINE_SECONDS have passed.
+    Returns a tuple: (gemini_score, gemini_label, gemini_explanation)
+    """
+    remaining = max(INFERENCE_DEADLINE_SECONDS - (time.monotonic() - started_at), 0)
     try:
-        detected_lang = langdetect.detect(input_text)
-        # Force English if the detected language is unclear or unsupported
-        if detected_lang not in SUPPORTED_LANGUAGES.keys():
-            detected_lang = 'en'
-            print(f"⚠️ Detected language '{detected_lang}' not supported, defaulting to English.")
-    except langdetect.lang_detect_exception.LangDetectException:
-        detected_lang = 'en'
-        print("⚠️ Language detection failed, defaulting to English.")
-
-    lower_input = input_text.lower().strip()
-    word_count = len(lower_input.split())
-
-    # --- Input Validation Messages (with language awareness) ---
-    validation_messages = {
-        'en': {
-            'too_short': "🛑 Input is too short. Please provide a complete statement or headline (at least 3 words).",
-            'question': "🛑 Input appears to be a question. Please provide a factual statement or headline.",
-            'subjective': "📋 Input appears subjective or contains personal opinions/attacks. Please provide a factual or neutral statement.",
-            'meaningless': "🛑 Input lacks meaningful content. Please provide a complete statement or headline."
-        },
-        'kn': {
-            'too_short': "🛑 ಇನ್‌ಪುಟ್ ತುಂಬಾ ಚಿಕ್ಕದಾಗಿದೆ. ದಯವಿಟ್ಟು ಪೂರ್ಣ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ (ಕನಿಷ್ಠ 3 ಪದಗಳು).",
-            'question': "🛑 ಇನ್‌ಪುಟ್ ಪ್ರಶ್ನೆಯಂತೆ ಕಾಣುತ್ತದೆ. ದಯವಿಟ್ಟು ವಾಸ್ತವಿಕ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ.",
-            'subjective': "📋 ಇನ್‌ಪುಟ್ ವಸ್ತುನಿಷ್ಠವಾಗಿ ಕಾಣುತ್ತದೆ ಅಥವಾ ವೈಯಕ್ತಿಕ ಅಭಿಪ್ರಾಯಗಳು/ದಾಳಿಗಳನ್ನು ಒಳಗೊಂಡಿರುತ್ತದೆ. ದಯವಿಟ್ಟು ವಾಸ್ತವಿಕ ಅಥವಾ ತಟಸ್ಥ ಹೇಳಿಕೆಯನ್ನು ಒದಗಿಸಿ.",
-            'meaningless': "🛑 ಇನ್‌ಪುಟ್‌ನಲ್ಲಿ ಅರ್ಥಪೂರ್ಣ ವಿಷಯವಿಲ್ಲ. ದಯವಿಟ್ಟು ಪೂರ್ಣ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ."
-        }
-    }
-    
-    # Get messages for the detected language, fallback to English if not available
-    messages = validation_messages.get(detected_lang, validation_messages['en'])
-
-    # --- Enhanced Input Validation ---
-    if word_count < 3:
-        return {
-            "input": original_input_identifier,
-            "message": messages['too_short'],
-            "label": "INVALID",
-            "confidence_score": 0,
-            "fallback_triggered": False,
-            "used_model": "N/A"
-        }, 400
-
-    # Question validation
-    question_starters = (
-        "what", "why", "how", "when", "where", "who", "whom",
-        "is ", "are ", "was ", "were ", "do ", "does ", "did ", "can ", "could ",
-        "should ", "would ", "will ", "shall ", "have ", "has ", "had ",
-        "am i", "are we", "do they", "did he", "does she", "will it", "could they",
-        "can i", "can we", "should i", "should we", "must i", "would they"
+        return gemini_future.result(timeout=remaining)
+    except FutureTimeoutError:
+        gemini_future.cancel()
+        return (5.0, "UNSURE", f"⚠️ Gemini Error: No response within {INFERENCE_DEADLINE_SECONDS}s")
+
+
+def get_predictions_batch(model_name, texts):
+    """
+    Sends several texts to a Hugging Face model as one "inputs" array per HF_BATCH_SIZE texts.
+    Returns a list of (score, label, raw_output) tuples, one per text.
+    """
+    if local_engine is not None and local_engine.supports(model_name):
+        try:
+            return [parse_prediction(model_name, raw) for raw in local_engine.predict_many(model_name, texts)]
+        except Exception as e:
+            print(f"⚠️ Local inference error ({model_name}, batch of {len(texts)}): {e}")
+            return [(None, None, {"error": f"Local inference failed: {str(e)}"})] * len(texts)
+
+    results = []
+    for start in range(0, len(texts), HF_BATCH_SIZE):
+        chunk = texts[start:start + HF_BATCH_SIZE]
+        breaker = model_breakers.get(model_name)
+        if breaker is not None and not breaker.allow_request():
+            UPSTREAM_RESPONSES.inc(upstream="huggingface", target=model_name, status="circuit_open")
+            results.extend([(None, None, {"error": f"Circuit open for {model_name}, skipping model"})] * len(chunk))
+            continue
+        try:
+            response = query_model(model_name, chunk)
+            if not isinstance(response, list) or len(response) != len(chunk):
+                raise ValueError(f"Expected {len(chunk)} results, got {response!r:.200}")
+            # Each item has the shape a single-input call returns inside its outer list
+            results.extend(parse_prediction(model_name, [item]) for item in response)
+        except Overloaded as e:
+            if breaker is not None:
+                breaker.release()
+            results.extend([(None, None, {"error": f"{model_name} skipped: {e}"})] * len(chunk))
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Hugging Face API Error ({model_name}, batch of {len(chunk)}): {e}")
+            results.extend([(None, None, {"error": f"API request failed: {str(e)}"})] * len(chunk))
+        except Exception as e:
+            print(f"⚠️ Error processing batch prediction ({model_name}): {e}")
+            results.extend([(None, None, {"error": f"Prediction processing error: {str(e)}"})] * len(chunk))
+    return results
+
+
+def run_models_batch(texts):
+    """
+    Runs the model fallback chain, in model_order(), over a list of texts. Each model only
+    receives the texts that earlier models could not classify.
+    Returns a list of (score, label, primary_output, used_model) tuples, one per text.
+    """
+    model_results = [(None, None, None, "None")] * len(texts)
+    remaining = list(range(len(texts)))
+    for model in model_order():
+        if not remaining:
+            break
+        predictions = get_predictions_batch(model, [texts[i] for i in remaining])
+        still_remaining = []
+        for index, (score, label, output) in zip(remaining, predictions):
+            if score is not None and label is not None:
+                model_results[index] = (score, label, output, model)
+            else:
+                model_results[index] = (None, None, output, "None")
+                still_remaining.append(index)
+        remaining = still_remaining
+    return model_results
+
+
+def get_gemini_batch_response(texts):
+    """
+    Classifies several claims with a single Gemini prompt using JSON output.
+    Returns a list of (confidence, label, explanation) tuples, one per text. Claims
+    missing from the structured answer are retried one by one.
+    """
+    claims = "\n".join(f"{i}. \"{text}\"" for i, text in enumerate(texts))
+    prompt = (
+        "You are an unbiased Fact checker and a Fake News detection system. "
+        "Analyze each of the following numbered claims objectively and independently. Do not express personal opinions or feelings. "
+        "Focus solely on evaluating the factual nature of each statement based on reliable information. \n\n"
+        f"Claims:\n{claims}\n\n"
+        "Respond with a JSON array containing one object per claim with the keys "
+        "\"id\" (the claim number), \"classification\" (strictly 'REAL', 'FAKE', or 'UNSURE'), "
+        "\"confidence\" (a number from 0 to 10) and \"justification\" "
+        "(a concise, neutral justification citing potential evidence or lack thereof if possible)."
     )
-    if lower_input.endswith("?") or any(lower_input.startswith(q) for q in question_starters):
-        return {
-            "input": original_input_identifier,
-            "message": messages['question'],
-            "label": "INVALID",
-            "confidence_score": 0,
-            "fallback_triggered": False,
-            "used_model": "N/A"
-        }, 400
-
-    # Subjective validation
-    subjective_keywords = [
-        "best", "worst", "amazing", "awesome", "terrible", "beautiful", "ugly", "superior", "inferior",
-        "i think", "i believe", "in my opinion", "greatest", "favorite", "strongest", "nicest",
-        "most beautiful", "most amazing", "most delicious", "should be", "needs to be",
-        "fool", "idiot", "stupid", "dumb", "smart", "genius", "moron", "incompetent",
-        "great", "terrible", "horrible", "wonderful", "perfect", "awful"
-    ]
-    
-    if any(phrase in lower_input for phrase in subjective_keywords):
-        return {
-            "input": original_input_identifier,
-            "message": messages['subjective'],
-            "label": "INVALID",
-            "confidence_score": 0,
-            "fallback_triggered": False,
-            "used_model": "N/A"
-        }, 400
-
-    # Meaningful content validation
-    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"}
-    meaningful_words = [word for word in lower_input.split() if word not in stop_words]
-    
-    if len(meaningful_words) < 2:
-        return {
-            "input": original_input_identifier,
-            "message": messages['meaningless'],
-            "label": "INVALID",
-            "confidence_score": 0,
-            "fallback_triggered": False,
-            "used_model": "N/A"
-        }, 400
+    answers = {}
+    started_at = time.perf_counter()
+    try:
+        with upstream_limiters["gemini"].slot():
+            response = gemini_model.get().generate_content(prompt, generation_config=dict(
+                GEMINI_GENERATION_CONFIG,
+                response_schema=BATCH_VERDICT_SCHEMA,
+                max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS * len(texts)
+            ))
+        items = json.loads(response.text)
+        record_upstream("gemini", GEMINI_MODEL_NAME, time.perf_counter() - started_at, "ok")
+        for item in items:
+            try:
+                answers[int(item["id"])] = parse_verdict(item)
+            except (KeyError, TypeError, ValueError):
+                continue
+    except Overloaded:
+        raise
+    except Exception as e:
+        record_upstream("gemini", GEMINI_MODEL_NAME, time.perf_counter() - started_at, type(e).__name__)
+        print(f"⚠️ Gemini batch error, falling back to single prompts: {e}")
+
+    return [answers[i] if i in answers else get_gemini_response(text) for i, text in enumerate(texts)]
+
 
+def detect_language(input_text):
+    """Detects the input language, English when it is not among SUPPORTED_LANGUAGES."""
+    detected_lang, detect_seconds = language_detector.detect(input_text)
+    record_timing("language_detection", detect_seconds)
+    # Force English if the language could not be identified among SUPPORTED_LANGUAGES
+    if detected_lang is None:
+        detected_lang = 'en'
+        print("⚠️ Language detection failed or language not supported, defaulting to English.")
+    return detected_lang
+
+
+def invalid_input_response(reason, detected_lang, original_input_identifier):
+    return {
+        "input": original_input_identifier,
+        "message": input_validator.message(reason, detected_lang),
+        "label": "INVALID",
+        "confidence_score": 0,
+        "fallback_triggered": False,
+        "used_model": "N/A"
+    }, 400
+
+
+def detect_and_validate(input_text, original_input_identifier="N/A"):
+    """
+    Detects the input language and rejects inputs that cannot be fact-checked.
+    Returns a tuple: (detected_lang, None) when the text is valid,
+    or (detected_lang, (response_dict, status_code)) when it is rejected.
+    """
+    detected_lang = detect_language(input_text)
+
+    # --- Input Validation (with language awareness) ---
+    started_at = time.perf_counter()
+    reason = input_validator.validate(input_text, detected_lang)
+    record_timing("validation", time.perf_counter() - started_at)
+    if reason is not None:
+        return detected_lang, invalid_input_response(reason, detected_lang, original_input_identifier)
+
+    return detected_lang, None
+
+
+def prepare_text(input_text, original_input_identifier="N/A"):
+    """
+    First stage of the pipeline: language detection, validation and translation to English.
+    Returns a tuple: (prepared_dict, None) when the text can be checked,
+    or (None, (response_dict, status_code)) when it is rejected.
+    """
+    if not input_text:
+        return None, ({"error": "Input text is empty after processing (e.g., OCR failed or empty input)."}, 400)
+
+    detected_lang, rejection = detect_and_validate(input_text, original_input_identifier)
+    if rejection is not None:
+        return None, rejection
+    return translate_for_checking(input_text, detected_lang, original_input_identifier)
+
+
+def translation_failed_response(original_input_identifier):
+    return {
+        "input": original_input_identifier,
+        "label": "UNSURE",
+        "confidence_score": "N/A",
+        "fallback_triggered": False,
+        "used_model": "N/A",
+        "message": f"🌐 Translation failed. Please try again."
+    }, 500
+
+
+def translate_for_checking(input_text, detected_lang, original_input_identifier="N/A"):
+    """
+    Translates a validated text to English when it is in another supported language.
+    Returns a tuple: (prepared_dict, None), or (None, (response_dict, status_code))
+    when the translation fails.
+    """
     # --- Process text in English if needed ---
     original_lang = detected_lang
     text_to_process = input_text
@@ -324,48 +935,41 @@ def process_text_for_fakery(input_text, original_input_identifier="N/A"):
     needs_translation = detected_lang != 'en' and detected_lang in SUPPORTED_LANGUAGES.keys()
     
     if needs_translation:
-        print(f"🌐 Detected language: {detected_lang}. Translating to English for processing.")
+        log_sampled(f"🌐 Detected language: {detected_lang}. Translating to English for processing.")
+        started_at = time.perf_counter()
         translated_to_en = translate_text(input_text, 'en', detected_lang)
+        record_timing("translation_in", time.perf_counter() - started_at)
         if "⚠️ Translation Failed:" in translated_to_en:
-            return {
-                "input": original_input_identifier,
-                "label": "UNSURE",
-                "confidence_score": "N/A",
-                "fallback_triggered": False,
-                "used_model": "N/A",
-                "message": f"🌐 Translation failed. Please try again."
-            }, 500
+            return None, translation_failed_response(original_input_identifier)
         text_to_process = translated_to_en
 
-    # --- Prediction Logic ---
-    # Try each model until one works
-    score = None
-    label = None
-    primary_output = None
-    used_model = "None"
-    
-    # Try each model until one works
-    for model in FAKE_NEWS_MODELS:
-        print(f"Trying model: {model}")
-        score, label, primary_output = get_prediction(model, text_to_process)
-        if score is not None and label is not None:
-            used_model = model
-            print(f"✅ Successfully got prediction from {used_model}")
-            break
-    
+    return {
+        "input": original_input_identifier,
+        "language": original_lang,
+        "text_to_process": text_to_process,
+        "needs_translation": needs_translation
+    }, None
+
+
+def combine_verdicts(prepared, model_result, gemini_result):
+    """
+    Combines the model and Gemini answers into the English response.
+    Returns a tuple: (response_dict, status_code)
+    """
+    original_input_identifier = prepared["input"]
+    original_lang = prepared["language"]
+    text_to_process = prepared["text_to_process"]
+    score, label, primary_output, used_model = model_result
+    gemini_score, gemini_label, gemini_explanation = gemini_result
+
     fallback_triggered = False
     explanation = ""
 
-    # --- Always Use Gemini for Verification ---
-    # For statements with high confidence or low confidence, we'll use Gemini
-    # to verify and potentially adjust the assessment
-    gemini_score, gemini_label, gemini_explanation = get_gemini_response(text_to_process)
-    
     # If the primary model is very confident (>7.5) but Gemini disagrees with the label
     # OR if the primary model has low confidence (<6)
     # Use Gemini's assessment
     if score is None or score < 6 or (score > 7.5 and gemini_label != label):
-        print(f"⚠️ Using Gemini as either primary model failed, had low confidence, or disagreed with Gemini.")
+        log_sampled(f"⚠️ Using Gemini as either primary model failed, had low confidence, or disagreed with Gemini.")
         fallback_triggered = True
         used_model = "Google Gemini"
         
@@ -403,52 +1007,584 @@ def process_text_for_fakery(input_text, original_input_identifier="N/A"):
         if "⚠️ Gemini Error:" not in gemini_explanation:
             explanation += "\n\nAdditional context from our AI: " + gemini_explanation
 
-    # --- Result Translation (if necessary) ---
-    if needs_translation:
-        print(f"🌐 Translating results back to original language: {original_lang}")
-        try:
-            final_label = translate_text(label, original_lang, 'en')
-            final_explanation = translate_text(explanation, original_lang, 'en')
-            
-            # Verify translation success
-            if "⚠️ Translation Failed:" in final_label or "⚠️ Translation Failed:" in final_explanation:
-                # If translation fails, return the English results
-                final_label = label
-                final_explanation = explanation
-        except Exception as e:
-            print(f"⚠️ Translation error: {e}")
+    # --- Construct Response ---
+    response_data = {
+        "input": original_input_identifier,
+        "label": label,
+        "confidence_score": score,
+        "fallback_triggered": fallback_triggered,
+        "used_model": used_model,
+        "explanation": explanation,
+        "language": original_lang  # Add language information to response
+    }
+    VERDICTS.inc(label=label, fallback_triggered=str(fallback_triggered).lower())
+    return response_data, 200
+
+
+def localize_verdict(response_data, prepared):
+    """Translates the label and explanation of an English response back to the input language."""
+    if not prepared["needs_translation"]:
+        return response_data
+
+    original_lang = prepared["language"]
+    label = response_data["label"]
+    explanation = response_data["explanation"]
+    log_sampled(f"🌐 Translating results back to original language: {original_lang}")
+    started_at = time.perf_counter()
+    try:
+        # Labels are usually precomputed; when they are not, translate both at once
+        final_label = translator.get_cached(label, original_lang, 'en')
+        label_future = None
+        if final_label is None:
+            label_future = inference_executor.submit(translate_text, label, original_lang, 'en')
+        final_explanation = translate_text(explanation, original_lang, 'en')
+        if label_future is not None:
+            final_label = label_future.result()
+        
+        # Verify translation success
+        if "⚠️ Translation Failed:" in final_label or "⚠️ Translation Failed:" in final_explanation:
+            # If translation fails, return the English results
             final_label = label
             final_explanation = explanation
-    else:
+    except Exception as e:
+        print(f"⚠️ Translation error: {e}")
         final_label = label
         final_explanation = explanation
+    record_timing("translation_out", time.perf_counter() - started_at)
+
+    return dict(response_data, label=final_label, explanation=final_explanation)
+
+
+def build_verdict(prepared, model_result, gemini_result, localize=True):
+    """
+    Last stage of the pipeline: combines the model and Gemini answers and translates
+    the result back to the input language, unless localize is False.
+    Returns a tuple: (response_dict, status_code)
+    """
+    response_data, status_code = combine_verdicts(prepared, model_result, gemini_result)
+    if status_code != 200:
+        return response_data, status_code
+    remember_claim(prepared, response_data)
+    return (localize_verdict(response_data, prepared) if localize else response_data), status_code
+
+
+def find_known_claim(prepared):
+    """
+    Looks the English claim up in the claim index. Returns the English response of
+    a near-identical claim checked before, with a "matched_claim" reference, or None.
+    """
+    if claim_index is None:
+        return None
+    started_at = time.perf_counter()
+    match = claim_index.lookup(prepared["text_to_process"])
+    record_timing("claim_lookup", time.perf_counter() - started_at)
+    if match is None:
+        return None
+
+    log_sampled(f"🔁 Reusing the verdict of a similar claim ({match['similarity']}): {match['text']}")
+    return dict(
+        match["response"],
+        input=prepared["input"],
+        language=prepared["language"],
+        matched_claim={
+            "text": match["text"],
+            "similarity": match["similarity"],
+            "checked_at": match["checked_at"]
+        }
+    )
+
+
+def remember_claim(prepared, response_data):
+    """Adds a freshly checked claim and its English response to the claim index."""
+    if claim_index is not None:
+        claim_index.add(prepared["text_to_process"], response_data)
+
+
+def process_text_for_fakery(input_text, original_input_identifier="N/A", localize=True):
+    """
+    Core logic for checking news text. Handles validation, language,
+    prediction, fallback, and translation. With localize=False the verdict
+    stays in English instead of being translated back to the input language.
+    Returns a tuple: (response_dict, status_code)
+    """
+    if is_long_text(input_text):
+        return check_claims(input_text, original_input_identifier, localize=localize)
+
+    prepared, rejection = prepare_text(input_text, original_input_identifier)
+    if rejection is not None:
+        return rejection
+    text_to_process = prepared["text_to_process"]
+
+    # --- Reworded claims checked before skip the models ---
+    known = find_known_claim(prepared)
+    if known is not None:
+        return (localize_verdict(known, prepared) if localize else known), 200
+
+    # --- Prediction Logic ---
+    if INFERENCE_MODE == "concurrent":
+        (score, label, primary_output, used_model), (gemini_score, gemini_label, gemini_explanation) = \
+            run_models_concurrently(text_to_process)
+    else:
+        score, label, primary_output, used_model = run_models_sequentially(text_to_process)
+
+        # --- Always Use Gemini for Verification ---
+        # For statements with high confidence or low confidence, we'll use Gemini
+        # to verify and potentially adjust the assessment
+        gemini_score, gemini_label, gemini_explanation = get_gemini_response(text_to_process)
+
+    return build_verdict(
+        prepared,
+        (score, label, primary_output, used_model),
+        (gemini_score, gemini_label, gemini_explanation),
+        localize=localize
+    )
+
+
+def check_text_cached(input_text, original_input_identifier="N/A"):
+    """
+    Wraps process_text_for_fakery with the verdict cache. Concurrent requests for
+    the same text share one pipeline run. Uncached checks go through admission
+    control and raise Overloaded when they are shed.
+    Returns a tuple: (response_dict, status_code)
+    """
+    if not input_text:
+        return process_text_for_fakery(input_text, original_input_identifier)
+
+    cache_key = make_cache_key(input_text, MODEL_VERSION, GEMINI_PROMPT_VERSION)
+    cached = verdict_cache.get(cache_key)
+    if cached is None:
+        cached = inflight_checks.do(cache_key, _check_and_cache, cache_key, input_text, original_input_identifier)
+
+    response_data, status_code = cached
+    # The same claim can arrive from different sources, so report the current one
+    return dict(response_data, input=original_input_identifier), status_code
+
+
+def _check_and_cache(cache_key, input_text, original_input_identifier):
+    check_budget.admit("all")
+    with check_slots.slot():
+        response_data, status_code = process_text_for_fakery(input_text, original_input_identifier)
+    if status_code in CACHEABLE_STATUS_CODES:
+        verdict_cache.set(cache_key, response_data, status_code)
+    return response_data, status_code
+
+
+def check_prepared_batch(prepared_items, localize=True):
+    """
+    Runs the model chain and one Gemini prompt over a chunk of prepared texts.
+    Returns a list of (response_dict, status_code) tuples in the same order,
+    in English when localize is False.
+    """
+    results = []
+    for prepared in prepared_items:
+        known = find_known_claim(prepared)
+        if known is not None and localize:
+            known = localize_verdict(known, prepared)
+        results.append((known, 200) if known is not None else None)
+
+    pending = [prepared for prepared, result in zip(prepared_items, results) if result is None]
+    if pending:
+        texts = [prepared["text_to_process"] for prepared in pending]
+        gemini_future = inference_executor.submit(get_gemini_batch_response, texts)
+        model_results = run_models_batch(texts)
+        gemini_results = gemini_future.result()
+        verdicts = iter([
+            build_verdict(prepared, model_result, gemini_result, localize)
+            for prepared, model_result, gemini_result in zip(pending, model_results, gemini_results)
+        ])
+        results = [result if result is not None else next(verdicts) for result in results]
+    return results
+
+
+def check_admitted_batch(prepared_items):
+    """check_prepared_batch within the shared budget and a check slot. Raises Overloaded when shed."""
+    check_budget.admit("all", len(prepared_items))
+    with check_slots.slot():
+        return check_prepared_batch(prepared_items)
+
+
+def check_admitted_claims(input_text):
+    """check_claims within the shared budget and a check slot, as a one-item batch result."""
+    check_budget.admit("all")
+    with check_slots.slot():
+        return [check_claims(input_text, input_text)]
+
+
+def is_long_text(input_text):
+    """Whether a text is long enough to be checked claim by claim."""
+    return bool(input_text) and SEGMENT_MIN_TOKENS > 0 and estimate_tokens(input_text) >= SEGMENT_MIN_TOKENS
+
+
+def check_claims(input_text, original_input_identifier="N/A", localize=True):
+    """
+    Checks a long text claim by claim: its most checkable sentences, within
+    CLAIM_TOKEN_BUDGET, run through the batch path (one model call and one
+    Gemini prompt per chunk) and their verdicts are combined into one. Each
+    sentence is validated on its own, so an opinion or a question in one of
+    them does not reject the whole text. The response has the usual fields
+    plus a "claims" breakdown.
+    Returns a tuple: (response_dict, status_code)
+    """
+    detected_lang = detect_language(input_text)
+
+    # --- Split into claims, leaving out the sentences validation rejects ---
+    reasons = []
+
+    def accept(sentence):
+        reason = input_validator.validate(sentence, detected_lang)
+        if reason is not None:
+            reasons.append(reason)
+        return reason is None
+
+    started_at = time.perf_counter()
+    segmentation = claim_splitter.split(input_text, accept=accept)
+    record_timing("segmentation", time.perf_counter() - started_at)
+    claims = segmentation["claims"]
+    if not claims:
+        reason = max(set(reasons), key=reasons.count) if reasons else "meaningless"
+        return invalid_input_response(reason, detected_lang, original_input_identifier)
+    log_sampled(f"✂️ Checking {len(claims)} of {segmentation['sentences']} sentences as separate claims")
+    # The admitted check paid for one text, the other claims are paid for here
+    if len(claims) > 1:
+        check_budget.admit("all", len(claims) - 1)
+
+    # --- All claims are translated to English in one packed call ---
+    needs_translation = detected_lang != 'en' and detected_lang in SUPPORTED_LANGUAGES.keys()
+    texts_to_process = claims
+    if needs_translation:
+        started_at = time.perf_counter()
+        try:
+            texts_to_process = translator.translate_many(claims, 'en', detected_lang)
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"⚠️ Translation Error from {detected_lang} to en: {e}")
+            return translation_failed_response(original_input_identifier)
+        finally:
+            record_timing("translation_in", time.perf_counter() - started_at)
+    prepared_items = [
+        {"input": claim, "language": detected_lang, "text_to_process": text, "needs_translation": needs_translation}
+        for claim, text in zip(claims, texts_to_process)
+    ]
+
+    verdicts = []
+    for start in range(0, len(prepared_items), GEMINI_BATCH_SIZE):
+        verdicts.extend(check_prepared_batch(prepared_items[start:start + GEMINI_BATCH_SIZE], localize=False))
+    checked = [(prepared, response) for prepared, (response, status_code) in zip(prepared_items, verdicts)
+               if status_code == 200]
+    if not checked:
+        return dict(verdicts[0][0], input=original_input_identifier), verdicts[0][1]
+
+    # --- Combine the claim verdicts ---
+    label, score, decisive = aggregate_claim_verdicts([(response["label"], response["confidence_score"])
+                                                       for _, response in checked])
+    labels = [response["label"] for _, response in checked]
+    explanation = (f"The text was checked as {len(checked)} separate claims: {labels.count('REAL')} look real, "
+                   f"{labels.count('FAKE')} look fake and {labels.count('UNSURE')} are unsure.")
+    if segmentation["over_budget"]:
+        explanation += f" {segmentation['over_budget']} further sentences were not checked."
+    if decisive is not None:
+        prepared, response = checked[decisive]
+        explanation += f"\n\nDeciding claim: \"{prepared['text_to_process']}\"\n{response['explanation']}"
+    used_models = [response["used_model"] for _, response in checked]
 
-    # --- Construct Response ---
     response_data = {
         "input": original_input_identifier,
-        "label": final_label,
+        "label": label,
         "confidence_score": score,
-        "fallback_triggered": fallback_triggered,
-        "used_model": used_model,
-        "explanation": final_explanation,
-        "language": original_lang  # Add language information to response
+        "fallback_triggered": any(response["fallback_triggered"] for _, response in checked),
+        "used_model": max(set(used_models), key=used_models.count),
+        "explanation": explanation,
+        "language": detected_lang,
+        "claims": [
+            {
+                "claim": prepared["input"],
+                "status": status_code,
+                "label": response.get("label", "UNSURE"),
+                "confidence_score": response.get("confidence_score", "N/A"),
+                "used_model": response.get("used_model", "N/A"),
+                "explanation": response.get("explanation") or response.get("error") or response.get("message", "")
+            }
+            for prepared, (response, status_code) in zip(prepared_items, verdicts)
+        ],
+        "sentences": {
+            "total": segmentation["sentences"],
+            "boilerplate": segmentation["boilerplate"],
+            "rejected": segmentation["rejected"],
+            "unchecked": segmentation["over_budget"]
+        }
     }
+    if needs_translation and localize:
+        response_data = localize_claims(response_data, detected_lang)
     return response_data, 200
 
 
+def localize_claims(response_data, lang):
+    """Translates the verdict and the claim breakdown of a check_claims response in one packed call."""
+    texts = [response_data["label"], response_data["explanation"]]
+    for claim in response_data["claims"]:
+        texts += [claim["label"], claim["explanation"]]
+    started_at = time.perf_counter()
+    try:
+        translated = translator.translate_many(texts, lang, 'en')
+    except Overloaded:
+        raise
+    except Exception as e:
+        # If translation fails, return the English results
+        print(f"⚠️ Translation error: {e}")
+        return response_data
+    finally:
+        record_timing("translation_out", time.perf_counter() - started_at)
+
+    pairs = zip(translated[::2], translated[1::2])
+    label, explanation = next(pairs)
+    return dict(
+        response_data,
+        label=label,
+        explanation=explanation,
+        claims=[dict(claim, label=label, explanation=explanation)
+                for claim, (label, explanation) in zip(response_data["claims"], pairs)]
+    )
+
+
+def stream_batch_results(texts):
+    """
+    Checks a list of texts and yields one NDJSON line per input as results become available.
+    Duplicate texts are checked once; cached verdicts and rejected inputs are sent first.
+    """
+    def line(index, response_data, status_code):
+        return json.dumps({"index": index, "status": status_code, "result": response_data}) + "\n"
+
+    # Group duplicate texts under their cache key
+    groups = {}
+    for index, text in enumerate(texts):
+        key = make_cache_key(text, MODEL_VERSION, GEMINI_PROMPT_VERSION)
+        groups.setdefault(key, (text, []))[1].append(index)
+
+    to_prepare = []
+    for key, (text, indices) in groups.items():
+        cached = verdict_cache.get(key) if text else None
+        if cached is None:
+            to_prepare.append(key)
+            continue
+        for index in indices:
+            yield line(index, dict(cached[0], input=text), cached[1])
+
+    # Long texts are checked claim by claim, each on its own
+    futures = {}
+    for key in [key for key in to_prepare if is_long_text(groups[key][0])]:
+        to_prepare.remove(key)
+        futures[batch_executor.submit(check_admitted_claims, groups[key][0])] = [(key, None)]
+
+    # Language detection, validation and translation run concurrently per unique text
+    prepared_items = []
+    for key, (prepared, rejection) in zip(to_prepare, inference_executor.map(
+            lambda key: prepare_text(groups[key][0], groups[key][0]), to_prepare)):
+        if rejection is not None:
+            if rejection[1] in CACHEABLE_STATUS_CODES and groups[key][0]:
+                verdict_cache.set(key, rejection[0], rejection[1])
+            for index in groups[key][1]:
+                yield line(index, rejection[0], rejection[1])
+        else:
+            prepared_items.append((key, prepared))
+
+    # Model and Gemini calls run per chunk, results stream back as each chunk finishes
+    for start in range(0, len(prepared_items), GEMINI_BATCH_SIZE):
+        chunk = prepared_items[start:start + GEMINI_BATCH_SIZE]
+        futures[batch_executor.submit(check_admitted_batch, [prepared for _, prepared in chunk])] = chunk
+    for future in as_completed(futures):
+        chunk = futures[future]
+        try:
+            verdicts = future.result()
+        except Overloaded as e:
+            verdicts = [overloaded_response(e)[:2]] * len(chunk)
+        except Exception as e:
+            print(f"⚠️ Error checking batch chunk: {e}")
+            verdicts = [({"error": f"An unexpected error occurred: {str(e)}"}, 500)] * len(chunk)
+        for (key, _), (response_data, status_code) in zip(chunk, verdicts):
+            if status_code in CACHEABLE_STATUS_CODES:
+                verdict_cache.set(key, response_data, status_code)
+            for index in groups[key][1]:
+                yield line(index, response_data, status_code)
+
+    yield json.dumps({"done": True, "total": len(texts), "unique": len(groups)}) + "\n"
+
+
+def stream_check_events(input_text):
+    """
+    Checks one text and yields (event, data) pairs as each stage finishes:
+    "language", "validation", "translation" (only for non-English input),
+    "model", "gemini_verdict" (Gemini's label and confidence, sent while it
+    still writes the justification) and "gemini" with the English verdicts, and finally
+    "result" with {"status": ..., "result": {...}}, the same response
+    /check_news returns. Cached and previously matched claims, and long texts
+    checked claim by claim, go straight to "result".
+    """
+    def result(response_data, status_code, **extra):
+        return "result", dict(extra, status=status_code, result=response_data)
+
+    if not input_text:
+        yield result(*prepare_text(input_text, input_text)[1])
+        return
+
+    cache_key = make_cache_key(input_text, MODEL_VERSION, GEMINI_PROMPT_VERSION)
+    cached = verdict_cache.get(cache_key)
+    if cached is not None:
+        yield result(dict(cached[0], input=input_text), cached[1], cached=True)
+        return
+
+    if is_long_text(input_text):
+        # Long texts are checked claim by claim, as one batch, so there are no stages to stream
+        yield result(*check_text_cached(input_text, input_text))
+        return
+
+    detected_lang, rejection = detect_and_validate(input_text, input_text)
+    yield "language", {"language": detected_lang}
+    if rejection is not None:
+        verdict_cache.set(cache_key, rejection[0], rejection[1])
+        yield "validation", {"valid": False, "message": rejection[0]["message"]}
+        yield result(*rejection)
+        return
+    yield "validation", {"valid": True}
+
+    # Admission control, as in check_text_cached
+    try:
+        check_budget.admit("all")
+        check_slots.acquire()
+    except Overloaded as e:
+        yield result(*overloaded_response(e)[:2])
+        return
+    try:
+        prepared, rejection = translate_for_checking(input_text, detected_lang, input_text)
+        if rejection is not None:
+            yield result(*rejection)
+            return
+        text_to_process = prepared["text_to_process"]
+        if prepared["needs_translation"]:
+            yield "translation", {"text": text_to_process}
+
+        known = find_known_claim(prepared)
+        if known is not None:
+            response_data, status_code = localize_verdict(known, prepared), 200
+        else:
+            # Gemini runs while the model chain is tried, each verdict is sent once it is known.
+            # Its label and confidence arrive on gemini_events before the justification is written.
+            gemini_events = queue.Queue()
+
+            def submit_gemini():
+                future = inference_executor.submit(get_gemini_response, text_to_process,
+                                                   lambda confidence, label: gemini_events.put((confidence, label)))
+                future.add_done_callback(lambda _: gemini_events.put(None))
+                return future, time.monotonic()
+
+            if INFERENCE_MODE == "concurrent":
+                gemini_future, started_at = submit_gemini()
+                model_result = race_models(
+                    model_order(), get_prediction, text_to_process, inference_executor,
+                    hedge_delay=INFERENCE_HEDGE_DELAY_SECONDS, deadline=INFERENCE_DEADLINE_SECONDS,
+                    hedge_executor=hedge_executor
+                )
+            else:
+                model_result = run_models_sequentially(text_to_process)
+                gemini_future, started_at = submit_gemini()
+            score, label, _, used_model = model_result
+            yield "model", {"label": label, "confidence_score": score, "used_model": used_model}
+
+            remaining = max(INFERENCE_DEADLINE_SECONDS - (time.monotonic() - started_at), 0)
+            try:
+                early_verdict = gemini_events.get(timeout=remaining)
+            except queue.Empty:
+                early_verdict = None
+            if early_verdict is not None:
+                yield "gemini_verdict", {"label": early_verdict[1], "confidence_score": early_verdict[0]}
+
+            gemini_result = wait_for_gemini(gemini_future, started_at)
+            gemini_score, gemini_label, gemini_explanation = gemini_result
+            if "⚠️ Gemini Error:" in gemini_explanation:
+                yield "gemini", {"error": "Gemini did not return a verdict."}
+            else:
+                yield "gemini", {"label": gemini_label, "confidence_score": gemini_score,
+                                 "explanation": gemini_explanation}
+
+            response_data, status_code = build_verdict(prepared, model_result, gemini_result)
+    finally:
+        check_slots.release()
+
+    if status_code in CACHEABLE_STATUS_CODES:
+        verdict_cache.set(cache_key, response_data, status_code)
+    yield result(response_data, status_code)
+
+
+def format_stream_events(events, sse=False):
+    """
+    Serializes (event, data) pairs as Server-Sent Events, or as NDJSON lines of
+    {"event": ..., "data": {...}}. An unexpected error ends the stream with a 500 "result",
+    a check shed on the way with a 503 one.
+    """
+    try:
+        for event, data in events:
+            if sse:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            else:
+                yield json.dumps({"event": event, "data": data}) + "\n"
+    except Overloaded as e:
+        yield from format_stream_events([("result", {"status": e.status_code, "result": overloaded_response(e)[0]})], sse)
+    except Exception as e:
+        print(f"⚠️ Error while streaming a check: {e}")
+        yield from format_stream_events(
+            [("result", {"status": 500, "result": {"error": f"An unexpected error occurred: {str(e)}"}})], sse
+        )
+
+
 # --- Flask Routes ---
 
+def forwarded_client_address(forwarded_for, peer_address):
+    """
+    The client address set by the TRUSTED_PROXY_COUNT proxies in front of the app,
+    counted from the right of X-Forwarded-For, or the peer address without them.
+    """
+    addresses = [address.strip() for address in (forwarded_for or "").split(",") if address.strip()]
+    if TRUSTED_PROXY_COUNT > 0 and len(addresses) >= TRUSTED_PROXY_COUNT:
+        return addresses[-TRUSTED_PROXY_COUNT]
+    return peer_address
+
+
+def client_key():
+    """Rate limit key of the caller: the user of a valid session token, otherwise its address."""
+    user_id = session_user_id(request.headers.get("Authorization"))
+    return f"user:{user_id}" if user_id else (request.remote_addr or "unknown")
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    response_data, status_code, headers = overloaded_response(error)
+    return jsonify(response_data), status_code, headers
+
+
 @app.route('/')
 def home():
     return "🧠 Fake News Detection API is live! Use /check_news (POST JSON) or /check_news_image (POST form-data)."
 
+# Answer to a JSON request whose body does not parse, or is not a JSON object
+INVALID_JSON_ERROR = "Request body must be a JSON object"
+
+
+def request_json_object():
+    """The JSON object in the request body, or None when the body is not one."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
 @app.route('/check_news', methods=['POST'])
 def check_news_route():
     """Endpoint for text-based news checking."""
     if not request.is_json:
          return jsonify({"error": "Request must be JSON"}), 415 # Unsupported Media Type
 
-    data = request.get_json()
+    client_limiter.admit(client_key())
+    data = request_json_object()
+    if data is None:
+        return jsonify({"error": INVALID_JSON_ERROR}), 400
     input_text = data.get("text", "").strip()
 
     if not input_text:
@@ -456,15 +1592,162 @@ def check_news_route():
         response_data, status_code = process_text_for_fakery("", "")
         return jsonify(response_data), status_code
 
-    # Call the core processing function
-    response_data, status_code = process_text_for_fakery(input_text, input_text)
+    # Call the core processing function through the verdict cache
+    response_data, status_code = check_text_cached(input_text, input_text)
     return jsonify(response_data), status_code
 
+@app.route('/check_news/stream', methods=['POST'])
+def check_news_stream_route():
+    """
+    Streaming variant of /check_news: sends an event as each pipeline stage finishes.
+    Responds with Server-Sent Events when the client accepts text/event-stream,
+    otherwise with NDJSON lines.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 415
+
+    client_limiter.admit(client_key())
+    data = request_json_object()
+    if data is None:
+        return jsonify({"error": INVALID_JSON_ERROR}), 400
+    input_text = data.get("text", "").strip()
+    sse = "text/event-stream" in request.headers.get("Accept", "")
+    return Response(
+        format_stream_events(stream_check_events(input_text), sse=sse),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        # Proxies must pass every event on as soon as it is written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/check_news_batch', methods=['POST'])
+def check_news_batch_route():
+    """
+    Endpoint for checking many texts in one call.
+    Expects {"texts": [...]} and streams one NDJSON line per text:
+    {"index": ..., "status": ..., "result": {...}}, followed by a final {"done": true, ...} line.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 415
+
+    data = request_json_object()
+    if data is None:
+        return jsonify({"error": INVALID_JSON_ERROR}), 400
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"error": "'texts' must be a non-empty list of strings"}), 400
+    if len(texts) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many texts. At most {BATCH_MAX_ITEMS} are accepted per request."}), 400
+    if not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": "'texts' must be a non-empty list of strings"}), 400
+
+    client_limiter.admit(client_key(), cost=len(texts))
+    # Its model and Gemini calls queue behind interactive checks
+    request_priority.set(BULK)
+    return Response(stream_batch_results([text.strip() for text in texts]), mimetype='application/x-ndjson')
+
+def is_allowed_image(filename):
+    """Checks the upload's extension against ALLOWED_IMAGE_EXTENSIONS."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_IMAGE_EXTENSIONS
+
+
+def ocr_no_text_response(filename):
+    """Response for images without enough readable text."""
+    return {
+        "input": f"Image: {filename}",
+        "message": "🚫 OCR could not detect readable text in the image. Try a clearer image with visible text.",
+        "label": "UNSURE",
+        "confidence_score": 0,
+        "fallback_triggered": False,
+        "used_model": "OCR Preprocessing"
+    }, 400
+
+
+def ocr_error_response(error, filename):
+    """Response for an image that could not be read."""
+    if isinstance(error, pytesseract.TesseractNotFoundError):
+        print("ERROR: Tesseract is not installed or not in your PATH.")
+        return {"error": "OCR Error: Tesseract is not installed. Please install Tesseract OCR to process images."}, 500
+    if isinstance(error, Image.UnidentifiedImageError):
+        return {"error": f"Cannot identify image file: {filename}. It might be corrupted or an unsupported format."}, 400
+    print(f"⚠️ Error processing image file: {error}")
+    return {"error": f"An unexpected error occurred during image processing: {str(error)}"}, 500
+
+
+def ocr_queue_full_response(error):
+    """429 response, with Retry-After, for uploads that arrive while the OCR queue is full."""
+    return {
+        "error": "🚦 Too many images are being processed right now. Please retry shortly.",
+        "retry_after": error.retry_after
+    }, 429, {"Retry-After": str(error.retry_after)}
+
+
+def extract_text_from_image(ocr_outcome, filename):
+    """Returns the text of a finished OCR job, re-raising its errors."""
+    extracted_text = ocr_service.unwrap(ocr_outcome, on_stage=record_timing)
+    log_sampled(f"📄 OCR Extracted Text ({filename}): {extracted_text}")
+    return extracted_text
+
+
+def hash_uploaded_image(image_bytes):
+    """Fingerprint of an upload for the image cache. Raises Image.UnidentifiedImageError."""
+    started_at = time.perf_counter()
+    image_hash = image_cache.hash_image(image_bytes)
+    record_timing("image_hash", time.perf_counter() - started_at)
+    return image_hash
+
+
+def cached_image_result(image_hash, filename):
+    """
+    Returns the cached (response_dict, status_code) of an identical (or, when
+    IMAGE_CACHE_MAX_DISTANCE allows, near-identical) image checked before, or None.
+    """
+    cached = image_cache.get(image_hash)
+    if cached is None:
+        return None
+    log_sampled(f"🖼️ Image cache hit for {filename}, skipping OCR.")
+    _, (response_data, status_code) = cached
+    return dict(response_data, input=f"Image: {filename}"), status_code
+
+
+def cache_image_result(image_hash, extracted_text, result):
+    if result[1] in CACHEABLE_STATUS_CODES:
+        image_cache.set(image_hash, extracted_text, result)
+
+
+def check_image(ocr_future, filename, image_hash=None):
+    """
+    Waits for the OCR of an uploaded image and fact-checks the extracted text.
+    The result is added to the image cache when image_hash is given.
+    Returns a tuple: (response_dict, status_code)
+    """
+    try:
+        extracted_text = extract_text_from_image(ocr_future.result(), filename)
+    except Exception as e:
+        return ocr_error_response(e, filename)
+
+    if not extracted_text or len(extracted_text) < 5:  # Require minimum meaningful text
+        result = ocr_no_text_response(filename)
+    else:
+        # Pass the filename as the original identifier
+        result = check_text_cached(extracted_text, f"Image: {filename}")
+
+    if image_hash is not None:
+        cache_image_result(image_hash, extracted_text, result)
+    return result
+
+
+def wants_async(query_args, headers):
+    """Clients opt into job polling with ?async=true or a "Prefer: respond-async" header."""
+    return query_args.get('async', '').lower() == 'true' or 'respond-async' in headers.get('Prefer', '')
+
+
 @app.route('/check_news_image', methods=['POST'])
 def check_news_image_route():
-    """Endpoint for image-based news checking using OCR."""
-    file_path = None  # Initialize file_path variable for cleanup later
-    
+    """
+    Endpoint for image-based news checking using OCR.
+    With ?async=true it answers 202 with a job ID to poll instead of waiting.
+    """
+    client_limiter.admit(client_key())
     if 'image' not in request.files:
         return jsonify({"error": "No 'image' file part found in the request."}), 400
 
@@ -474,86 +1757,50 @@ def check_news_image_route():
         return jsonify({"error": "No image file selected."}), 400
 
     # Validate file type
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif'}
-    if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
-         return jsonify({"error": f"Invalid image format. Allowed formats: {', '.join(allowed_extensions)}"}), 400
+    if not is_allowed_image(file.filename):
+         return jsonify({"error": f"Invalid image format. Allowed formats: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"}), 400
 
+    image_bytes = file.read()
     try:
-        # Create directory if it doesn't exist
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER)
-            
-        # Use a unique filename to avoid collisions and security issues
-        import uuid
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        file.save(file_path)
-        
-        # Read image
-        img = Image.open(file_path)
-        
-        # For very large images, resize to improve OCR performance
-        max_dimension = 2000
-        if img.width > max_dimension or img.height > max_dimension:
-            ratio = min(max_dimension / img.width, max_dimension / img.height)
-            new_size = (int(img.width * ratio), int(img.height * ratio))
-            img = img.resize(new_size, Image.LANCZOS)
-            img.save(file_path)  # Save the resized image
-
-        # Check for Tesseract installation
-        if not pytesseract.pytesseract.tesseract_cmd:
-            # Set default path for Windows
-            if os.name == 'nt':
-                pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-            # For Linux/Mac, assume it's in PATH
-
-        # Perform OCR with additional config for better results
-        extracted_text = pytesseract.image_to_string(
-            img, 
-            config='--psm 3 --oem 3'  # Page segmentation mode 3 (fully automatic) and OCR Engine mode 3 (default)
-        ).strip()
-        
-        print(f"\n📄 OCR Extracted Text:\n---\n{extracted_text}\n---")
-
-        # Close the image before deleting
-        img.close()
-
-        # Delete the file immediately after processing
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"✅ Deleted temporary file: {file_path}")
-
-        if not extracted_text or len(extracted_text) < 5:  # Require minimum meaningful text
-             return jsonify({
-                 "input": f"Image: {file.filename}",
-                 "message": "🚫 OCR could not detect readable text in the image. Try a clearer image with visible text.",
-                 "label": "UNSURE",
-                 "confidence_score": 0,
-                 "fallback_triggered": False,
-                 "used_model": "OCR Preprocessing"
-                 }), 400
-
-        # Call the core processing function with extracted text
-        # Pass the filename as the original identifier
-        response_data, status_code = process_text_for_fakery(extracted_text, f"Image: {file.filename}")
+        image_hash = hash_uploaded_image(image_bytes)
+    except Exception as e:
+        response_data, status_code = ocr_error_response(e, file.filename)
         return jsonify(response_data), status_code
 
-    except pytesseract.TesseractNotFoundError:
-         print("ERROR: Tesseract is not installed or not in your PATH.")
-         return jsonify({"error": "OCR Error: Tesseract is not installed. Please install Tesseract OCR to process images."}), 500
-    except Image.UnidentifiedImageError:
-        return jsonify({"error": f"Cannot identify image file: {file.filename}. It might be corrupted or an unsupported format."}), 400
-    except Exception as e:
-        print(f"⚠️ Error processing image file: {e}")
-        return jsonify({"error": f"An unexpected error occurred during image processing: {str(e)}"}), 500
-    finally:
-        # Cleanup in finally block to ensure file is deleted even if an error occurs
-        try:
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"✅ Deleted temporary file in finally block: {file_path}")
-        except Exception as cleanup_error:
-            print(f"⚠️ Error during file cleanup: {cleanup_error}")
+    # Near-identical images are answered from the cache, even when ?async=true was asked for
+    cached = cached_image_result(image_hash, file.filename)
+    if cached is not None:
+        response_data, status_code = cached
+        return jsonify(response_data), status_code
+
+    try:
+        ocr_future = ocr_service.submit(image_bytes)
+    except OcrQueueFull as e:
+        response_data, status_code, headers = ocr_queue_full_response(e)
+        return jsonify(response_data), status_code, headers
+
+    if wants_async(request.args, request.headers):
+        job_id = ocr_jobs.submit(check_image, ocr_future, file.filename, image_hash)
+        status_url = f"/check_news_image/jobs/{job_id}"
+        return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+    response_data, status_code = check_image(ocr_future, file.filename, image_hash)
+    return jsonify(response_data), status_code
+
+
+@app.route('/check_news_image/jobs/<job_id>', methods=['GET'])
+def check_news_image_job(job_id):
+    """Polls an image check submitted with ?async=true. "result" is set once status is "done"."""
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job ID."}), 404
+
+    response = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        response["result"], response["status_code"] = job["result"]
+    elif job["status"] == "failed":
+        response["error"] = job["error"]
+    return jsonify(response), 200
 
 # Define cleanup function
 def cleanup_uploads():
@@ -568,17 +1815,43 @@ def cleanup_uploads():
     except Exception as e:
         print(f"⚠️ Error cleaning upload folder: {e}")
 
-# Clean up on startup
-cleanup_uploads()
 
-# Alternative for newer Flask versions that don't support before_first_request
 @app.before_request
-def cleanup_before_request():
-    """Clean up old files periodically."""
-    # Only clean up occasionally to avoid doing it on every request
-    import random
-    if random.random() < 0.01:  # ~1% chance to clean up on any request
-        cleanup_uploads()
+def start_request_timings():
+    request_timings.set({})
+    request_priority.set(INTERACTIVE)
+    g.request_started_at = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response):
+    timings = request_timings.get()
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    # Streamed responses are timed until their first byte
+    record_request(request.url_rule.rule if request.url_rule else "unmatched", request.method,
+                   response.status_code, time.perf_counter() - g.request_started_at, timings)
+    return response
+
+
+def record_request(route, method, status_code, seconds, timings):
+    """Records a finished request in the request histogram and, sampled, as a trace log line."""
+    REQUEST_SECONDS.observe(seconds, route=route, method=method, status=status_code)
+    if log_sampled.sampled():
+        print("🧭 " + json.dumps({
+            "route": route, "method": method, "status": status_code, "ms": round(seconds * 1000, 2),
+            "stages": {stage: round(stage_seconds * 1000, 2) for stage, stage_seconds in (timings or {}).items()}
+        }))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics of this worker process."""
+    for limiter in [check_slots, password_slots, *upstream_limiters.values()]:
+        stats = limiter.stats()
+        IN_FLIGHT.set(stats["in_flight"], limiter=limiter.name)
+        for priority, depth in stats["queue_depth"].items():
+            QUEUE_DEPTH.set(depth, limiter=limiter.name, priority=priority)
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
@@ -592,7 +1865,9 @@ def translate_result_endpoint():
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 415
         
-    data = request.get_json()
+    data = request_json_object()
+    if data is None:
+        return jsonify({"error": INVALID_JSON_ERROR}), 400
     target_language = data.get('target_language')
     content = data.get('content')
     
@@ -613,17 +1888,240 @@ def translate_result_endpoint():
         return jsonify({"error": f"Translation error: {str(e)}"}), 500
 
 # MongoDB Integration
-client = MongoClient('mongodb://localhost:27017')
-db = client['factflow']
-users_collection = db['users']
-history_collection = db['history']
-
-# Helper for JSON serialization with ObjectId
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        return super().default(o)
+MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://localhost:27017")
+MONGODB_DATABASE = os.environ.get("MONGODB_DATABASE", "factflow")
+MONGODB_MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", "100"))  # Connections per worker process
+MONGODB_MIN_POOL_SIZE = int(os.environ.get("MONGODB_MIN_POOL_SIZE", "0"))  # Connections kept open while idle
+MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+# Requests fail after this long when MongoDB is unreachable, instead of pymongo's 30s
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000"))  # Wait for a free pooled connection
+
+
+def create_mongo_client():
+    # pymongo is imported here, it is one of the slowest imports of the app
+    from pymongo import MongoClient
+    client = MongoClient(
+        MONGODB_URI,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[mongo_command_listener(record_mongo_command)]
+    )
+    # Runs in the background so the first request does not wait for index builds
+    threading.Thread(target=ensure_indexes, daemon=True).start()
+    return client
+
+
+def record_mongo_command(command_name, seconds, status):
+    record_upstream("mongodb", command_name, seconds, status)
+    record_timing("mongodb", seconds)
+
+
+# One client per process, created on first use (after any fork) and shared by every route
+mongo_client = LazyResource("mongodb", create_mongo_client, warm_up=lambda client: client.admin.command("ping"))
+
+
+def mongo_collection(name):
+    return LazyCollection(mongo_client, MONGODB_DATABASE, name)
+
+users_collection = mongo_collection('users')
+history_collection = mongo_collection('history')
+
+# History paging settings
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get("HISTORY_MAX_PAGE_SIZE", "200"))
+# Only the fields the history views render
+HISTORY_PROJECTION = {'content': 1, 'type': 1, 'result': 1, 'confidence': 1, 'timestamp': 1}
+
+
+def ensure_indexes():
+    """Creates the indexes the user and history queries rely on."""
+    try:
+        users_collection.create_index('email')
+        # Serves the history filter, its newest-first sort and the keyset cursor in one index scan
+        history_collection.create_index([('userId', 1), ('timestamp', -1), ('_id', -1)])
+        print("✅ MongoDB indexes are in place")
+    except Exception as e:
+        print(f"⚠️ Could not create MongoDB indexes: {e}")
+
+# Write-behind history settings
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", "100"))  # Entries per insert_many
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", "1.0"))  # Max seconds an entry is buffered
+HISTORY_MAX_PENDING = int(os.environ.get("HISTORY_MAX_PENDING", "10000"))  # Beyond this, saves get a 503
+HISTORY_JOURNAL_DIR = os.environ.get("HISTORY_JOURNAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history_journal"))
+HISTORY_JOURNAL_FSYNC = os.environ.get("HISTORY_JOURNAL_FSYNC", "false").lower() == "true"  # Also survive power loss
+
+history_sink = HistorySink(
+    history_collection,
+    HISTORY_JOURNAL_DIR,
+    batch_size=HISTORY_BATCH_SIZE,
+    flush_interval=HISTORY_FLUSH_INTERVAL,
+    max_pending=HISTORY_MAX_PENDING,
+    fsync=HISTORY_JOURNAL_FSYNC
+)
+
+# --- Authentication ---
+# Password hashing is deliberately slow, so it runs on a few threads of its own and
+# logins queue for them instead of taking CPU from fact-checking
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")  # werkzeug method and cost
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))  # Passwords hashed at once
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", "32"))  # Beyond this, logins get a 503
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+# Signs session tokens; without it a random key is used and tokens do not survive a restart
+SESSION_SECRET_KEY = os.environ.get("SESSION_SECRET_KEY", "")
+SESSION_TOKEN_MAX_AGE_SECONDS = int(os.environ.get("SESSION_TOKEN_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.environ.get("USER_CACHE_TTL_SECONDS", "300"))
+# Fields of a user record kept in user_cache, never the password hash
+USER_PROJECTION = {'username': 1, 'email': 1}
+
+password_slots = PriorityLimiter("password_hashing", PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE,
+                                 PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS, on_wait=record_queue_wait)
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS, limiter=password_slots)
+if not SESSION_SECRET_KEY:
+    print("⚠️ SESSION_SECRET_KEY is not set, session tokens only work until a restart and on this worker")
+session_tokens = SessionTokens(SESSION_SECRET_KEY or os.urandom(32).hex(), SESSION_TOKEN_MAX_AGE_SECONDS)
+user_cache = UserCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+
+def timed_password_hash(operation, *args):
+    """Runs a password_hasher operation and records its time as the password_hashing stage."""
+    started_at = time.perf_counter()
+    try:
+        return getattr(password_hasher, operation)(*args)
+    finally:
+        record_timing("password_hashing", time.perf_counter() - started_at)
+
+
+def remember_user(user):
+    user_cache.set(user['_id'], {key: user[key] for key in USER_PROJECTION if key in user})
+
+
+def user_exists(user_id):
+    """Checks a user ID against user_cache, asking MongoDB only for users not seen recently."""
+    if user_cache.get(user_id) is not None:
+        return True
+    user = users_collection.find_one({'_id': user_id}, USER_PROJECTION)
+    if user is None:
+        return False
+    remember_user(user)
+    return True
+
+
+def session_user_id(authorization):
+    """User ID in a valid "Bearer <token>" Authorization header, or None."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return session_tokens.verify(token.strip())
+
+
+def authorize_user(user_id):
+    """
+    Checks that the request may act for user_id. A session token is verified
+    locally; requests without one only need an existing user, as before tokens.
+    Returns None when allowed, or the (response, status_code) to send.
+    """
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        token_user_id = session_user_id(authorization)
+        if token_user_id is None:
+            return jsonify({'message': 'Session expired, please log in again'}), 401
+        if token_user_id != str(user_id):
+            return jsonify({'message': 'Not allowed to access this user'}), 403
+        return None
+    if not user_exists(user_id):
+        return jsonify({'message': 'User not found'}), 404
+    return None
+
+# Verdict cache in front of process_text_for_fakery
+verdict_cache = VerdictCache(
+    max_entries=VERDICT_CACHE_MAX_ENTRIES,
+    ttl_seconds=VERDICT_CACHE_TTL_SECONDS,
+    shared_collection=mongo_collection('verdict_cache') if VERDICT_CACHE_SHARED else None
+)
+
+# Near-duplicate claim index, stored next to the history collection
+claim_index = ClaimIndex(
+    collection=mongo_collection('claim_index'),
+    threshold=CLAIM_MATCH_THRESHOLD,
+    version=f"{MODEL_VERSION}|{GEMINI_PROMPT_VERSION}",
+    ttl_days=CLAIM_INDEX_TTL_DAYS,
+    breaker=CircuitBreaker("claim_index", failure_threshold=1, base_backoff=30.0)
+) if CLAIM_INDEX_ENABLED else None
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Reports verdict, translation, language, image and user cache hit ratios and sizes."""
+    return jsonify(dict(
+        verdict_cache.stats(),
+        coalescing=inflight_checks.stats(),
+        translation=translator.stats(),
+        language_detection=language_detector.stats(),
+        image_cache=image_cache.stats(),
+        claim_index=claim_index.stats() if claim_index is not None else None,
+        users=user_cache.stats()
+    )), 200
+
+@app.route('/upstream/stats', methods=['GET'])
+def upstream_stats():
+    """Reports circuit breaker and keep-warm state per model, admission queues and Hugging Face connection pool usage."""
+    return jsonify({
+        "breakers": {model: breaker.snapshot() for model, breaker in model_breakers.items()},
+        "keep_warm": dict(model_warmer.stats(), enabled=KEEP_WARM_ENABLED),
+        "connection_pools": pool_stats(hf_session),
+        "local_inference": local_engine.stats() if local_engine is not None else None,
+        "ocr": dict(ocr_service.stats(), jobs=ocr_jobs.stats()),
+        "history_sink": history_sink.stats(),
+        "resources": {name: resource.stats() for name, resource in lazy_resources.items()},
+        "admission": {
+            "clients": client_limiter.stats(),
+            "budget": check_budget.stats(),
+            "checks": check_slots.stats(),
+            "password_hashing": password_slots.stats(),
+            "upstreams": {name: limiter.stats() for name, limiter in upstream_limiters.items()}
+        }
+    }), 200
+
+# Keyset cursors and streamed pages for the history route
+def encode_history_cursor(entry):
+    """Opaque cursor pointing just past a history entry in newest-first order."""
+    raw = json.dumps([entry['timestamp'], str(entry['_id'])])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_history_cursor(cursor):
+    """Returns (timestamp, ObjectId). Raises ValueError for malformed cursors."""
+    try:
+        timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return timestamp, ObjectId(entry_id)
+    except (TypeError, ValueError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def stream_history_page(entries, limit):
+    """
+    Streams {"history": [...], "next_cursor": ...} while `entries` (up to limit + 1
+    history documents) are read, converting each ObjectId as the entry is written.
+    """
+    yield '{"history": ['
+    last_entry = None
+    for count, entry in enumerate(entries):
+        if count == limit:
+            # The extra entry only tells us that there is a next page
+            yield '], "next_cursor": ' + json.dumps(encode_history_cursor(last_entry)) + '}'
+            return
+        entry['_id'] = str(entry['_id'])
+        yield (', ' if count else '') + json.dumps(entry)
+        last_entry = entry
+    yield '], "next_cursor": null}'
 
 # User Authentication Routes
 @app.route('/register', methods=['POST'])
@@ -638,14 +2136,16 @@ def register():
     user = {
         'username': data['username'],
         'email': data['email'],
-        'password': generate_password_hash(data['password'])
+        'password': timed_password_hash('hash', data['password'])
     }
     
     result = users_collection.insert_one(user)
+    remember_user(user)
     
     return jsonify({
         'message': 'User registered successfully',
-        'userId': str(result.inserted_id)
+        'userId': str(result.inserted_id),
+        'token': session_tokens.issue(result.inserted_id)
     }), 201
 
 @app.route('/login', methods=['POST'])
@@ -653,29 +2153,43 @@ def login():
     data = request.json
     user = users_collection.find_one({'email': data['email']})
     
-    if not user or not check_password_hash(user['password'], data['password']):
+    if not user or not timed_password_hash('verify', user['password'], data['password']):
         return jsonify({'message': 'Invalid email or password'}), 401
+    # Hashes made before a PASSWORD_HASH_METHOD change are upgraded while the password is at hand
+    if password_hasher.needs_rehash(user['password']):
+        users_collection.update_one({'_id': user['_id']},
+                                    {'$set': {'password': timed_password_hash('hash', data['password'])}})
+    remember_user(user)
     
     return jsonify({
         'message': 'Login successful',
         'userId': str(user['_id']),
         'username': user['username'],
-        'email': user['email']
+        'email': user['email'],
+        'token': session_tokens.issue(user['_id'])
     }), 200
 
 # User History Routes
 @app.route('/user/save-history', methods=['POST'])
 def save_history():
+    """
+    Queues a history entry for writing and returns its ID right away. The entry
+    is journaled locally first and written to MongoDB in the background.
+    """
     data = request.json
+    if not ObjectId.is_valid(data.get('userId')):
+        return jsonify({'message': 'Invalid user ID'}), 400
+    user_id = ObjectId(data['userId'])
+
+    # Verify the session token, or that the user exists
+    denied = authorize_user(user_id)
+    if denied is not None:
+        return denied
     
-    # Verify user exists
-    user = users_collection.find_one({'_id': ObjectId(data['userId'])})
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    # Create history entry
+    # Create history entry, its ID is allocated here instead of by the insert
     history_entry = {
-        'userId': ObjectId(data['userId']),
+        '_id': ObjectId(),
+        'userId': user_id,
         'content': data['content'],
         'type': data['type'],
         'result': data['result'],
@@ -683,27 +2197,71 @@ def save_history():
         'timestamp': data['timestamp']
     }
     
-    result = history_collection.insert_one(history_entry)
+    try:
+        history_sink.add(history_entry)
+    except HistoryBacklogFull as e:
+        print(f"⚠️ {e}")
+        return jsonify({'message': 'History is temporarily unavailable, please try again later'}), 503, \
+            {'Retry-After': str(max(1, math.ceil(HISTORY_FLUSH_INTERVAL)))}
     
     return jsonify({
         'message': 'History saved successfully',
-        'historyId': str(result.inserted_id)
+        'historyId': str(history_entry['_id'])
     }), 201
 
 @app.route('/user/history/<user_id>', methods=['GET'])
 def get_user_history(user_id):
-    # Verify user exists
-    user = users_collection.find_one({'_id': ObjectId(user_id)})
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    # Get user history
-    history = list(history_collection.find({'userId': ObjectId(user_id)}).sort('timestamp', -1))
-    
-    # Convert ObjectId to string for JSON serialization
-    history_serialized = json.loads(JSONEncoder().encode({'history': history}))
-    
-    return jsonify(history_serialized), 200
+    """
+    Returns one page of a user's history, newest first. Pass ?limit= (default
+    HISTORY_PAGE_SIZE) and the previous page's next_cursor as ?cursor= for the next page.
+    """
+    if not ObjectId.is_valid(user_id):
+        return jsonify({'message': 'Invalid user ID'}), 400
+    user_id = ObjectId(user_id)
+
+    # Verify the session token, or that the user exists
+    denied = authorize_user(user_id)
+    if denied is not None:
+        return denied
+
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'message': 'limit must be a number'}), 400
+
+    # Keyset paging: continue strictly after the last entry of the previous page
+    query = {'userId': user_id}
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            timestamp, entry_id = decode_history_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': entry_id}}
+        ]
+
+    entries = history_collection.find(query, HISTORY_PROJECTION) \
+        .sort([('timestamp', -1), ('_id', -1)]).limit(limit + 1).batch_size(limit + 1)
+    # Fetch the first batch here, so database errors fail the request before streaming starts
+    first_entry = next(entries, None)
+    entries = itertools.chain([first_entry], entries) if first_entry is not None else []
+    return Response(stream_history_page(entries, limit), mimetype='application/json')
+
+# --- Startup ---
+# Clients are created on first use. STARTUP_WARMUP lists the ones to create and
+# connect right after startup instead, e.g. "gemini,mongodb". Leave it empty when
+# a server preloads the app and forks workers afterwards.
+STARTUP_WARMUP = [name.strip() for name in os.environ.get("STARTUP_WARMUP", "").split(",") if name.strip()]
+lazy_resources = {resource.name: resource for resource in (gemini_model, mongo_client)}
+for name in set(STARTUP_WARMUP) - set(lazy_resources):
+    print(f"⚠️ Unknown STARTUP_WARMUP entry '{name}', expected one of {', '.join(lazy_resources)}")
+if not IN_OCR_WORKER:
+    warm_up_in_background([lazy_resources[name] for name in STARTUP_WARMUP if name in lazy_resources],
+                          tasks=[cleanup_uploads])
+if KEEP_WARM_ENABLED and not IN_OCR_WORKER:
+    model_warmer.start()
 
 # --- Main Execution ---
 if __name__ == '__main__':
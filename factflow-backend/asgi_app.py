@@ -0,0 +1,513 @@
+"""
+Async serving path for FactFlow.
+
+The fact-checking routes (/check_news, /check_news_image and /translate_result)
+run on asyncio with non-blocking HTTP clients, so one process can hold many
+in-flight checks while waiting on Hugging Face, Gemini and the translator.
+Every other route is served by the Flask app in app.py.
+
+Run with:
+    uvicorn asgi_app:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import os
+import time
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from bs4 import BeautifulSoup
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import app as core
+from coalescing import AsyncSingleFlight
+from gemini_output import VerdictStreamParser
+from model_race import race_models_async
+from ocr_service import OcrQueueFull
+from translation import GOOGLE_LANGUAGE_CODES
+from verdict_cache import make_cache_key
+
+# Connection limits for the async upstream client
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("ASYNC_MAX_CONNECTIONS", "200"))
+ASYNC_MAX_KEEPALIVE = int(os.environ.get("ASYNC_MAX_KEEPALIVE", "50"))
+
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+
+http_client = None  # Created in lifespan so it is bound to the serving event loop
+inflight_checks = AsyncSingleFlight()
+
+
+# --- Async Helper Functions ---
+
+async def get_prediction_async(model_name, input_text):
+    """Async version of app.get_prediction."""
+    started_at = time.perf_counter()
+    try:
+        return await _get_prediction_async(model_name, input_text)
+    finally:
+        core.record_timing("model_inference", time.perf_counter() - started_at)
+
+
+async def _get_prediction_async(model_name, input_text):
+    if core.local_engine is not None and core.local_engine.supports(model_name):
+        started_at = time.perf_counter()
+        try:
+            raw = await asyncio.wait_for(
+                asyncio.wrap_future(core.local_engine.submit(model_name, input_text)), core.HF_READ_TIMEOUT
+            )
+            core.record_upstream("local", model_name, time.perf_counter() - started_at, "ok")
+            return core.parse_prediction(model_name, raw)
+        except Exception as e:
+            core.record_upstream("local", model_name, time.perf_counter() - started_at, type(e).__name__)
+            print(f"⚠️ Local inference error ({model_name}): {e}")
+            return None, None, {"error": f"Local inference failed: {str(e)}"}
+
+    breaker = core.model_breakers.get(model_name)
+    if breaker is not None and not breaker.allow_request():
+        core.UPSTREAM_RESPONSES.inc(upstream="huggingface", target=model_name, status="circuit_open")
+        return None, None, {"error": f"Circuit open for {model_name}, skipping model"}
+
+    url = f"{core.HF_INFERENCE_URL}/{model_name}"
+    try:
+        started_at = time.perf_counter()
+        try:
+            response = await http_client.post(url, json={"inputs": input_text}, headers=core.HEADERS)
+        except httpx.HTTPError as e:
+            core.record_upstream("huggingface", model_name, time.perf_counter() - started_at, type(e).__name__)
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or failed before an answer, the breaker learned nothing
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            if response.status_code in core.BREAKER_FAILURE_STATUS_CODES:
+                breaker.record_failure(retry_after=core.get_retry_after(response))
+            else:
+                # Any other answer, a 4xx for a bad input included, means the model is up
+                breaker.record_success()
+        core.record_upstream("huggingface", model_name, time.perf_counter() - started_at, response.status_code)
+        response.raise_for_status()
+        result = response.json()
+        core.model_warmer.observe(model_name, "ok", time.perf_counter() - started_at)
+        core.log_sampled(f"🔍 Model ({model_name}) response: {result}")
+        return core.parse_prediction(model_name, result)
+    except httpx.HTTPError as e:
+        core.model_warmer.observe(model_name, core.warm_state_outcome(e), time.perf_counter() - started_at)
+        print(f"⚠️ Hugging Face API Error ({model_name}): {e}")
+        return None, None, {"error": f"API request failed: {str(e)}"}
+    except Exception as e:
+        print(f"⚠️ Error processing prediction ({model_name}): {e}")
+        return None, None, {"error": f"Prediction processing error: {str(e)}"}
+
+
+async def get_gemini_response_async(input_text, on_verdict=None):
+    """Async version of app.get_gemini_response, streaming the structured answer."""
+    started_at = time.perf_counter()
+
+    def record_verdict(confidence, label):
+        core.record_timing("gemini_verdict", time.perf_counter() - started_at)
+        if on_verdict is not None:
+            on_verdict(confidence, label)
+
+    parser = VerdictStreamParser(record_verdict)
+    try:
+        # The first call imports the Gemini client, keep that off the event loop
+        model = core.gemini_model.get() if core.gemini_model.created else await asyncio.to_thread(core.gemini_model.get)
+        response = await model.generate_content_async(
+            core.build_gemini_prompt(input_text), generation_config=core.GEMINI_GENERATION_CONFIG, stream=True
+        )
+        async for chunk in response:
+            if chunk.parts:
+                parser.feed(chunk.text)
+        core.log_sampled(f"✨ Gemini Raw Response: {parser.text}")
+        core.record_upstream("gemini", core.GEMINI_MODEL_NAME, time.perf_counter() - started_at, "ok")
+        return parser.result()
+    except Exception as e:
+        core.record_upstream("gemini", core.GEMINI_MODEL_NAME, time.perf_counter() - started_at, type(e).__name__)
+        print(f"⚠️ Gemini API Error: {e}")
+        return 5.0, "UNSURE", f"⚠️ Gemini Error: {str(e)}"
+    finally:
+        core.record_timing("gemini", time.perf_counter() - started_at)
+
+
+async def translate_text_async(text, target_lang, source_lang='auto'):
+    """
+    Async version of app.translate_text, talking to the same Google endpoint as deep_translator.
+    Shares the translation cache with the sync path.
+    """
+    if not text or not target_lang or source_lang == target_lang:
+        return text
+    cached = core.translator.get_cached(text, target_lang, source_lang)
+    if cached is not None:
+        return cached
+    started_at = time.perf_counter()
+    try:
+        response = await http_client.get(GOOGLE_TRANSLATE_URL, params={
+            "tl": GOOGLE_LANGUAGE_CODES.get(target_lang, target_lang),
+            "sl": GOOGLE_LANGUAGE_CODES.get(source_lang, source_lang),
+            "q": text
+        })
+        core.record_upstream("google_translate", target_lang, time.perf_counter() - started_at, response.status_code)
+        response.raise_for_status()
+        element = BeautifulSoup(response.text, "html.parser").find("div", {"class": "result-container"})
+        if element is None:
+            raise ValueError("No translation found in the response")
+        translated = element.get_text(strip=True)
+        core.translator.store(text, target_lang, source_lang, translated)
+        return translated
+    except Exception as e:
+        print(f"⚠️ Translation Error from {source_lang} to {target_lang}: {e}")
+        return f"⚠️ Translation Failed: {text}"
+
+
+async def prepare_text_async(input_text, original_input_identifier="N/A"):
+    """Async version of app.prepare_text."""
+    if not input_text:
+        return None, ({"error": "Input text is empty after processing (e.g., OCR failed or empty input)."}, 400)
+
+    detected_lang, rejection = core.detect_and_validate(input_text, original_input_identifier)
+    if rejection is not None:
+        return None, rejection
+
+    text_to_process = input_text
+    needs_translation = detected_lang != 'en' and detected_lang in core.SUPPORTED_LANGUAGES.keys()
+    if needs_translation:
+        core.log_sampled(f"🌐 Detected language: {detected_lang}. Translating to English for processing.")
+        started_at = time.perf_counter()
+        text_to_process = await translate_text_async(input_text, 'en', detected_lang)
+        core.record_timing("translation_in", time.perf_counter() - started_at)
+        if "⚠️ Translation Failed:" in text_to_process:
+            return None, ({
+                "input": original_input_identifier,
+                "label": "UNSURE",
+                "confidence_score": "N/A",
+                "fallback_triggered": False,
+                "used_model": "N/A",
+                "message": "🌐 Translation failed. Please try again."
+            }, 500)
+
+    return {
+        "input": original_input_identifier,
+        "language": detected_lang,
+        "text_to_process": text_to_process,
+        "needs_translation": needs_translation
+    }, None
+
+
+async def run_models_sequentially_async(text_to_process):
+    """Async version of app.run_models_sequentially."""
+    for model in core.model_order():
+        core.log_sampled(f"Trying model: {model}")
+        score, label, primary_output = await get_prediction_async(model, text_to_process)
+        if score is not None and label is not None:
+            core.log_sampled(f"✅ Successfully got prediction from {model}")
+            return score, label, primary_output, model
+    return None, None, primary_output, "None"
+
+
+async def run_models_concurrently_async(text_to_process):
+    """Async version of app.run_models_concurrently."""
+    started_at = time.monotonic()
+    gemini_task = asyncio.ensure_future(get_gemini_response_async(text_to_process))
+
+    model_result = await race_models_async(
+        core.model_order(), get_prediction_async, text_to_process,
+        hedge_delay=core.INFERENCE_HEDGE_DELAY_SECONDS, deadline=core.INFERENCE_DEADLINE_SECONDS
+    )
+    if model_result[3] != "None":
+        core.log_sampled(f"✅ Successfully got prediction from {model_result[3]}")
+
+    remaining = max(core.INFERENCE_DEADLINE_SECONDS - (time.monotonic() - started_at), 0)
+    try:
+        gemini_result = await asyncio.wait_for(gemini_task, timeout=remaining)
+    except asyncio.TimeoutError:
+        gemini_result = (5.0, "UNSURE", f"⚠️ Gemini Error: No response within {core.INFERENCE_DEADLINE_SECONDS}s")
+
+    return model_result, gemini_result
+
+
+async def localize_verdict_async(response_data, prepared):
+    """Async version of app.localize_verdict; label and explanation are translated concurrently."""
+    if not prepared["needs_translation"]:
+        return response_data
+
+    original_lang = prepared["language"]
+    label = response_data["label"]
+    explanation = response_data["explanation"]
+    core.log_sampled(f"🌐 Translating results back to original language: {original_lang}")
+    started_at = time.perf_counter()
+    final_label, final_explanation = await asyncio.gather(
+        translate_text_async(label, original_lang, 'en'),
+        translate_text_async(explanation, original_lang, 'en')
+    )
+    core.record_timing("translation_out", time.perf_counter() - started_at)
+    if "⚠️ Translation Failed:" in final_label or "⚠️ Translation Failed:" in final_explanation:
+        final_label = label
+        final_explanation = explanation
+    return dict(response_data, label=final_label, explanation=final_explanation)
+
+
+async def process_text_for_fakery_async(input_text, original_input_identifier="N/A"):
+    """
+    Async version of app.process_text_for_fakery.
+    Returns a tuple: (response_dict, status_code)
+    """
+    if core.is_long_text(input_text):
+        # Claim by claim checks use the blocking batch path, keep them off the event loop
+        return await asyncio.to_thread(core.check_claims, input_text, original_input_identifier)
+
+    prepared, rejection = await prepare_text_async(input_text, original_input_identifier)
+    if rejection is not None:
+        return rejection
+    text_to_process = prepared["text_to_process"]
+
+    # The claim index talks to MongoDB, keep that off the event loop
+    known = await asyncio.to_thread(core.find_known_claim, prepared)
+    if known is not None:
+        return await localize_verdict_async(known, prepared), 200
+
+    if core.INFERENCE_MODE == "concurrent":
+        model_result, gemini_result = await run_models_concurrently_async(text_to_process)
+    else:
+        model_result = await run_models_sequentially_async(text_to_process)
+        gemini_result = await get_gemini_response_async(text_to_process)
+
+    response_data, status_code = core.combine_verdicts(prepared, model_result, gemini_result)
+    if status_code != 200:
+        return response_data, status_code
+    await asyncio.to_thread(core.remember_claim, prepared, response_data)
+    return await localize_verdict_async(response_data, prepared), status_code
+
+
+async def check_text_cached_async(input_text, original_input_identifier="N/A"):
+    """Async version of app.check_text_cached, sharing the same verdict cache."""
+    if not input_text:
+        return await process_text_for_fakery_async(input_text, original_input_identifier)
+
+    cache_key = make_cache_key(input_text, core.MODEL_VERSION, core.GEMINI_PROMPT_VERSION)
+    cached = await _cache_get(cache_key)
+    if cached is None:
+        cached = await inflight_checks.do(cache_key, _check_and_cache_async, cache_key, input_text, original_input_identifier)
+
+    response_data, status_code = cached
+    return dict(response_data, input=original_input_identifier), status_code
+
+
+async def _check_and_cache_async(cache_key, input_text, original_input_identifier):
+    # The shared budget applies here too; the blocking slot limiters of the sync path do not
+    core.check_budget.admit("all")
+    response_data, status_code = await process_text_for_fakery_async(input_text, original_input_identifier)
+    if status_code in core.CACHEABLE_STATUS_CODES:
+        await _cache_set(cache_key, response_data, status_code)
+    return response_data, status_code
+
+
+async def _cache_get(cache_key):
+    # The shared tier talks to MongoDB, keep that off the event loop
+    if core.verdict_cache.shared_collection is None:
+        return core.verdict_cache.get(cache_key)
+    return await asyncio.to_thread(core.verdict_cache.get, cache_key)
+
+
+async def _cache_set(cache_key, response_data, status_code):
+    if core.verdict_cache.shared_collection is None:
+        core.verdict_cache.set(cache_key, response_data, status_code)
+    else:
+        await asyncio.to_thread(core.verdict_cache.set, cache_key, response_data, status_code)
+
+
+# --- Async Routes ---
+
+def client_key(request):
+    """Rate limit key of the caller, as app.client_key."""
+    user_id = core.session_user_id(request.headers.get("authorization"))
+    if user_id:
+        return f"user:{user_id}"
+    peer_address = request.client.host if request.client else "unknown"
+    return core.forwarded_client_address(request.headers.get("x-forwarded-for"), peer_address)
+
+
+async def request_json_object(request):
+    """The JSON object in the request body, or None when the body is not one, as app.request_json_object."""
+    try:
+        data = await request.json()
+    except ValueError:  # json.JSONDecodeError, or a body that is not UTF-8
+        return None
+    return data if isinstance(data, dict) else None
+
+async def check_news_route(request):
+    """Endpoint for text-based news checking."""
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/json":
+        return JSONResponse({"error": "Request must be JSON"}, status_code=415)
+
+    core.client_limiter.admit(client_key(request))
+    data = await request_json_object(request)
+    if data is None:
+        return JSONResponse({"error": core.INVALID_JSON_ERROR}, status_code=400)
+    input_text = data.get("text", "").strip()
+    response_data, status_code = await check_text_cached_async(input_text, input_text)
+    return JSONResponse(response_data, status_code=status_code)
+
+
+async def check_news_image_route(request):
+    """Endpoint for image-based news checking using OCR."""
+    core.client_limiter.admit(client_key(request))
+    form = await request.form()
+    file = form.get("image")
+    if file is None or isinstance(file, str):
+        return JSONResponse({"error": "No 'image' file part found in the request."}, status_code=400)
+
+    if file.filename == '':
+        return JSONResponse({"error": "No image file selected."}, status_code=400)
+
+    if not core.is_allowed_image(file.filename):
+        return JSONResponse(
+            {"error": f"Invalid image format. Allowed formats: {', '.join(core.ALLOWED_IMAGE_EXTENSIONS)}"},
+            status_code=400
+        )
+
+    image_bytes = await file.read()
+    try:
+        image_hash = await asyncio.to_thread(core.hash_uploaded_image, image_bytes)
+    except Exception as e:
+        response_data, status_code = core.ocr_error_response(e, file.filename)
+        return JSONResponse(response_data, status_code=status_code)
+
+    cached = core.cached_image_result(image_hash, file.filename)
+    if cached is not None:
+        response_data, status_code = cached
+        return JSONResponse(response_data, status_code=status_code)
+
+    try:
+        ocr_future = core.ocr_service.submit(image_bytes)
+    except OcrQueueFull as e:
+        response_data, status_code, headers = core.ocr_queue_full_response(e)
+        return JSONResponse(response_data, status_code=status_code, headers=headers)
+
+    if core.wants_async(request.query_params, request.headers):
+        # Polled through /check_news_image/jobs/<job_id>, which the Flask app serves
+        job_id = core.ocr_jobs.submit(core.check_image, ocr_future, file.filename, image_hash)
+        status_url = f"/check_news_image/jobs/{job_id}"
+        return JSONResponse({"job_id": job_id, "status": "queued", "status_url": status_url},
+                            status_code=202, headers={"Location": status_url})
+
+    try:
+        extracted_text = core.extract_text_from_image(await asyncio.wrap_future(ocr_future), file.filename)
+    except Exception as e:
+        response_data, status_code = core.ocr_error_response(e, file.filename)
+        return JSONResponse(response_data, status_code=status_code)
+
+    if not extracted_text or len(extracted_text) < 5:
+        result = core.ocr_no_text_response(file.filename)
+    else:
+        result = await check_text_cached_async(extracted_text, f"Image: {file.filename}")
+    core.cache_image_result(image_hash, extracted_text, result)
+
+    response_data, status_code = result
+    return JSONResponse(response_data, status_code=status_code)
+
+
+async def translate_result_route(request):
+    """Endpoint to translate analysis results to a different language."""
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/json":
+        return JSONResponse({"error": "Request must be JSON"}, status_code=415)
+
+    data = await request_json_object(request)
+    if data is None:
+        return JSONResponse({"error": core.INVALID_JSON_ERROR}, status_code=400)
+    target_language = data.get('target_language')
+    content = data.get('content')
+
+    if not target_language or not content:
+        return JSONResponse({"error": "Missing target_language or content parameter"}, status_code=400)
+
+    if target_language not in core.SUPPORTED_LANGUAGES:
+        return JSONResponse(
+            {"error": f"Language {target_language} not supported. Supported languages: {list(core.SUPPORTED_LANGUAGES.keys())}"},
+            status_code=400
+        )
+
+    if target_language == 'en':
+        return JSONResponse({"translated_content": content}, status_code=200)
+
+    translated_content = await translate_text_async(content, target_language, 'en')
+    return JSONResponse({"translated_content": translated_content}, status_code=200)
+
+
+async def overloaded_handler(request, error):
+    response_data, status_code, headers = core.overloaded_response(error)
+    return JSONResponse(response_data, status_code=status_code, headers=headers)
+
+
+class ServerTimingMiddleware:
+    """Reports stage timings in the Server-Timing header and records request metrics, like the Flask hooks in app.py."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        core.request_timings.set(timings)
+        started_at = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                core.record_request(scope["path"], scope["method"], message["status"],
+                                    time.perf_counter() - started_at, timings)
+                if timings:
+                    header = (b"server-timing", core.server_timing_header(timings).encode("latin-1"))
+                    message = dict(message, headers=list(message.get("headers", [])) + [header])
+            await send(message)
+
+        await self.app(scope, receive, send_with_timings)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_MAX_KEEPALIVE),
+        timeout=httpx.Timeout(core.HF_READ_TIMEOUT, connect=core.HF_CONNECT_TIMEOUT)
+    )
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+
+
+async_routes = Starlette(
+    routes=[
+        Route('/check_news', check_news_route, methods=['POST']),
+        Route('/check_news_image', check_news_image_route, methods=['POST']),
+        Route('/translate_result', translate_result_route, methods=['POST']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        Middleware(ServerTimingMiddleware)
+    ],
+    exception_handlers={core.Overloaded: overloaded_handler},
+    lifespan=lifespan
+)
+ASYNC_PATHS = {route.path for route in async_routes.routes}
+
+# Everything else (auth, history, stats, batch) keeps running on the Flask app
+flask_routes = WsgiToAsgi(core.app)
+
+
+async def application(scope, receive, send):
+    """ASGI entry point that sends the fact-checking routes to the async handlers."""
+    if scope["type"] == "lifespan" or (scope["type"] == "http" and scope["path"] in ASYNC_PATHS):
+        await async_routes(scope, receive, send)
+    else:
+        await flask_routes(scope, receive, send)
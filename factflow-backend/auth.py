@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's password hashing on `workers` threads of its own, so a
+    burst of logins keeps at most that many cores busy; hashlib releases the
+    GIL while it hashes. `method` is a werkzeug method such as
+    "pbkdf2:sha256:600000". `limiter` (a PriorityLimiter), if given, bounds
+    the callers waiting for a thread and sheds the rest with Overloaded.
+    """
+
+    def __init__(self, method="pbkdf2:sha256:600000", workers=2, limiter=None):
+        self.method = method
+        self.limiter = limiter
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._prefix = None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with another method or cost than `method`."""
+        if self._prefix is None:
+            self._prefix = self.hash("").split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._prefix
+
+    def _run(self, fn, *args):
+        with self.limiter.slot() if self.limiter is not None else nullcontext():
+            return self._executor.submit(fn, *args).result()
+
+
+class SessionTokens:
+    """
+    Signed session tokens carrying a user ID. They are verified with the
+    secret key alone, without a database lookup, and expire after `max_age`
+    seconds. Changing the key logs everyone out.
+    """
+
+    def __init__(self, secret_key, max_age, salt="factflow-session"):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=salt)
+
+    def issue(self, user_id):
+        return self._serializer.dumps({"uid": str(user_id)})
+
+    def verify(self, token):
+        """Returns the user ID (a string) of a valid token, None for a forged, malformed or expired one."""
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)["uid"]
+        except (BadSignature, KeyError, TypeError):
+            return None
+
+
+class UserCache:
+    """LRU of user records by ID, each kept for `ttl_seconds`. Records must not hold password hashes."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def set(self, user_id, record):
+        with self._lock:
+            self._entries[user_id] = (record, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), ttl_seconds=self.ttl_seconds)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,90 @@
+"""
+Benchmark for the perceptual-hash image cache.
+
+Times hashing an upload and a near-duplicate lookup in a full cache, and
+reports perceptual hash distances between re-encodings of one screenshot
+and between screenshots of different texts with the same layout, to help
+decide whether, and how far, to enable near-duplicate reuse with
+IMAGE_CACHE_MAX_DISTANCE.
+
+Run from factflow-backend/:
+    python benchmarks/bench_image_cache.py
+"""
+import io
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_cache import ImageCache, ImageFingerprint, hamming_distance  # noqa: E402
+
+
+def make_screenshot(text, size=(1170, 2532)):
+    """A phone screenshot: a header bar and the post text, six words per line."""
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=44)
+    draw.rectangle((0, 0, size[0], 180), fill=(29, 161, 242))
+    words = text.split()
+    for line in range(0, len(words), 6):
+        draw.text((60, 300 + line // 6 * 70), " ".join(words[line:line + 6]), fill="black", font=font)
+    return img
+
+
+def encode(img, fmt="PNG", scale=1.0, quality=85):
+    if scale != 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    img.convert("RGB").save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def random_text(rng, words=15):
+    vocabulary = "council budget road repair minister vaccine election flood report police court million".split()
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def main():
+    rng = random.Random(3)
+    cache = ImageCache(max_distance=10)
+    original = make_screenshot(random_text(rng))
+    png = encode(original)
+    variants = {
+        "JPEG q85": encode(original, "JPEG"),
+        "JPEG q40, 50% size": encode(original, "JPEG", scale=0.5, quality=40),
+        "PNG 75% size": encode(original, scale=0.75),
+        "JPEG q30, 40% size": encode(original, "JPEG", scale=0.4, quality=30),
+    }
+
+    base = cache.hash_image(png)
+    print("Distance to the original (same image, re-encoded):")
+    for label, data in variants.items():
+        print(f"  {label:<24} {hamming_distance(base.perceptual, cache.hash_image(data).perceptual):4d} bits")
+
+    others = [cache.hash_image(encode(make_screenshot(random_text(rng)), "JPEG")) for _ in range(20)]
+    distances = sorted(hamming_distance(base.perceptual, other.perceptual) for other in others)
+    print(f"Distance to 20 different headlines, same layout: min {distances[0]}, median {distances[10]} bits")
+    print(f"near-duplicate lookups below use max_distance {cache.max_distance}")
+
+    for label, data in (("PNG 1170x2532", png), ("JPEG 1170x2532", variants["JPEG q85"])):
+        started_at = time.perf_counter()
+        for _ in range(20):
+            cache.hash_image(data)
+        print(f"hash {label:<20} {(time.perf_counter() - started_at) / 20 * 1000:7.2f} ms")
+
+    for i in range(cache.max_entries):
+        cache.set(ImageFingerprint(rng.getrandbits(2 * cache.hash_size ** 2), str(i)), "text", ({"label": "REAL"}, 200))
+    cache.set(base, "text", ({"label": "REAL"}, 200))
+    query = cache.hash_image(variants["JPEG q40, 50% size"])
+    started_at = time.perf_counter()
+    for _ in range(200):
+        assert cache.get(query) is not None
+    print(f"near-duplicate lookup, {cache.max_entries} entries {(time.perf_counter() - started_at) / 200 * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark for the image decoding and preprocessing in front of Tesseract.
+
+Compares the previous path (save the upload to uploads/, reopen it, resize
+with LANCZOS and save it again) with the in-memory path of ocr.OcrEngine
+(draft-mode decode, binarize, crop) on a synthetic phone-camera sized JPEG.
+When Tesseract is installed, full OCR is timed as well.
+
+Run from factflow-backend/:
+    python benchmarks/bench_ocr.py
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract  # noqa: E402
+from ocr import OcrEngine, binarize_and_crop, load_image  # noqa: E402
+
+
+def make_screenshot_jpeg(width=4000, height=3000):
+    """A light photo-sized JPEG with a block of dark text lines in the middle."""
+    img = Image.new("RGB", (width, height), (236, 232, 224))
+    draw = ImageDraw.Draw(img)
+    for line in range(30):
+        y = height // 3 + line * 30
+        draw.text((width // 4, y), "Council approves 4.2 million budget for road repairs " * 2, fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def legacy_prepare(data, folder):
+    """The steps extract_text_from_image used to run before pytesseract."""
+    file_path = os.path.join(folder, f"{uuid.uuid4()}_upload.jpg")
+    with open(file_path, "wb") as saved_file:
+        shutil.copyfileobj(io.BytesIO(data), saved_file)
+    img = Image.open(file_path)
+    max_dimension = 2000
+    if img.width > max_dimension or img.height > max_dimension:
+        ratio = min(max_dimension / img.width, max_dimension / img.height)
+        img = img.resize((int(img.width * ratio), int(img.height * ratio)), Image.LANCZOS)
+        img.save(file_path)
+    img.load()
+    img.close()
+    os.remove(file_path)
+    return img
+
+
+def in_memory_prepare(data):
+    return binarize_and_crop(load_image(io.BytesIO(data), 2000))
+
+
+def bench(name, fn, number=10):
+    fn()
+    started_at = time.perf_counter()
+    for _ in range(number):
+        fn()
+    per_image = (time.perf_counter() - started_at) / number
+    print(f"{name:<32} {per_image * 1000:8.1f} ms/image")
+    return per_image
+
+
+def main():
+    data = make_screenshot_jpeg()
+    print(f"Upload: {len(data) / 1024:.0f} KiB JPEG, 4000x3000")
+    prepared = in_memory_prepare(data)
+    print(f"Image handed to Tesseract: {prepared.size[0]}x{prepared.size[1]} (cropped to text)")
+
+    with tempfile.TemporaryDirectory() as folder:
+        legacy = bench("legacy disk round trip", lambda: legacy_prepare(data, folder))
+    in_memory = bench("in-memory draft/binarize/crop", lambda: in_memory_prepare(data))
+    print(f"{'speedup':<32} {legacy / in_memory:8.1f}x")
+
+    engine = OcrEngine(workers=1)
+    try:
+        bench(f"full OCR ({engine.backend})", lambda: engine.extract_text(io.BytesIO(data)), number=3)
+    except pytesseract.TesseractNotFoundError:
+        print("Tesseract is not installed, skipping full OCR timing")
+
+
+if __name__ == '__main__':
+    main()
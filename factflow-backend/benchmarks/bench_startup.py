@@ -0,0 +1,99 @@
+"""
+Startup benchmark.
+
+Measures, each in a fresh interpreter, the time from `import app` until the
+app answers its first request, and what every component costs when it is
+first used: the clients that are created lazily (Gemini, MongoDB, the
+translator, the OCR pool) and the ones still built at import (language profiles).
+"eager total" adds the lazy clients to the import, which is roughly what
+startup cost before they were made lazy.
+
+Run from factflow-backend/:
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints the seconds spent in the measured part
+SNIPPETS = {
+    "import app, first request": """
+import time
+started_at = time.perf_counter()
+import app
+app.app.test_client().get('/')
+print(time.perf_counter() - started_at)
+""",
+    "gemini client (first use)": """
+import time, app
+started_at = time.perf_counter()
+app.gemini_model.get()
+print(time.perf_counter() - started_at)
+""",
+    "mongodb client (first use)": """
+import time, app
+started_at = time.perf_counter()
+app.mongo_client.get()
+print(time.perf_counter() - started_at)
+""",
+    "translator (first use, no network)": """
+import time, app
+started_at = time.perf_counter()
+from deep_translator import GoogleTranslator
+print(time.perf_counter() - started_at)
+""",
+    "language profiles (at import)": """
+import time
+from language_id import LanguageDetector
+started_at = time.perf_counter()
+LanguageDetector(['en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'zh', 'ja', 'ko', 'ar', 'hi', 'kn', 'ta', 'te'])
+print(time.perf_counter() - started_at)
+""",
+    "OCR pool start (first image)": """
+import time
+from ocr_service import OcrService
+started_at = time.perf_counter()
+service = OcrService(processes=2)
+service.warm_up()
+print(time.perf_counter() - started_at)
+service.shutdown()
+""",
+}
+
+
+def measure(snippet, env):
+    output = subprocess.run([sys.executable, "-c", snippet], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    env = dict(
+        os.environ,
+        PYTHONPATH=BACKEND_DIR,
+        TRANSLATION_PRECOMPUTE_LABELS="false",
+        STARTUP_WARMUP="",
+        HISTORY_JOURNAL_DIR=tempfile.mkdtemp(prefix="bench-journal-")
+    )
+
+    results = {}
+    print(f"{'component':<38} {'median ms':>10} {'min ms':>8}")
+    for name, snippet in SNIPPETS.items():
+        timings = [measure(snippet, env) * 1000 for _ in range(runs)]
+        results[name] = statistics.median(timings)
+        print(f"{name:<38} {results[name]:>10.1f} {min(timings):>8.1f}")
+
+    eager = sum(results[name] for name in (
+        "import app, first request", "gemini client (first use)", "mongodb client (first use)",
+        "translator (first use, no network)"
+    ))
+    print(f"{'eager total (import + lazy clients)':<38} {eager:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
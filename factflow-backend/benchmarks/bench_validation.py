@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for the input validation stage.
+
+Compares the compiled InputValidator with the previous per-request
+implementation (rebuilt tables, one substring scan per keyword, text split
+twice) on short headlines and on long OCR-like text.
+
+Run from factflow-backend/:
+    python benchmarks/bench_validation.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from input_validator import InputValidator  # noqa: E402
+
+
+def legacy_validate(input_text):
+    """The validation stage as process_text_for_fakery used to run it."""
+    lower_input = input_text.lower().strip()
+    word_count = len(lower_input.split())
+    if word_count < 3:
+        return 'too_short'
+    question_starters = (
+        "what", "why", "how", "when", "where", "who", "whom",
+        "is ", "are ", "was ", "were ", "do ", "does ", "did ", "can ", "could ",
+        "should ", "would ", "will ", "shall ", "have ", "has ", "had ",
+        "am i", "are we", "do they", "did he", "does she", "will it", "could they",
+        "can i", "can we", "should i", "should we", "must i", "would they"
+    )
+    if lower_input.endswith("?") or any(lower_input.startswith(q) for q in question_starters):
+        return 'question'
+    subjective_keywords = [
+        "best", "worst", "amazing", "awesome", "terrible", "beautiful", "ugly", "superior", "inferior",
+        "i think", "i believe", "in my opinion", "greatest", "favorite", "strongest", "nicest",
+        "most beautiful", "most amazing", "most delicious", "should be", "needs to be",
+        "fool", "idiot", "stupid", "dumb", "smart", "genius", "moron", "incompetent",
+        "great", "terrible", "horrible", "wonderful", "perfect", "awful"
+    ]
+    if any(phrase in lower_input for phrase in subjective_keywords):
+        return 'subjective'
+    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"}
+    meaningful_words = [word for word in lower_input.split() if word not in stop_words]
+    if len(meaningful_words) < 2:
+        return 'meaningless'
+    return None
+
+
+def make_ocr_text(words, seed=7):
+    """Builds long, valid, newspaper-like text without subjective keywords."""
+    vocabulary = (
+        "the council approved a budget of 4.2 million for road repairs in the northern district "
+        "officials said work would start in march and continue through the summer months while "
+        "residents reported delays on the main bridge after flooding last year according to records"
+    ).split()
+    rng = random.Random(seed)
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def bench(name, fn, text, number):
+    seconds = min(timeit.repeat(lambda: fn(text), number=number, repeat=5))
+    print(f"{name:<28} {seconds / number * 1e6:10.1f} µs/request")
+    return seconds / number
+
+
+def main():
+    validator = InputValidator()
+    samples = {
+        "headline (12 words)": "The city council approved a new budget for road repairs on Monday",
+        "OCR page (2,000 words)": make_ocr_text(2000),
+        "OCR pages (20,000 words)": make_ocr_text(20000),
+    }
+
+    # Both implementations must agree before their speed is worth comparing
+    for text in list(samples.values()) + ["Is this real?", "The best city ever built", "the of and"]:
+        assert validator.validate(text, 'en') == legacy_validate(text), text
+
+    for label, text in samples.items():
+        number = 2000 if len(text) < 1000 else 50
+        print(f"\n{label}")
+        legacy = bench("legacy per-request tables", legacy_validate, text, number)
+        compiled = bench("compiled InputValidator", lambda t: validator.validate(t, 'en'), text, number)
+        print(f"{'speedup':<28} {legacy / compiled:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+"""
+Offline load test.
+
+Serves the Flask app on a local port with Hugging Face, Gemini, the
+translator and MongoDB replaced by the stand-ins in mock_upstreams.py,
+then sends an open-loop mix of /check_news, /check_news_batch,
+/check_news_image and history traffic at a target rate; long articles
+checked claim by claim (check_news_article) can be added to the mix. Latency is
+measured from the moment a request was due, so a slow server is not
+hidden by requests that are sent late.
+
+Reports p50/p95/p99 latency, status codes and throughput per scenario and
+the calls every upstream received. --max-p95-ms and --max-error-rate make
+the run exit with status 1 when they are exceeded, for CI.
+
+Run from factflow-backend/:
+    python benchmarks/load_test.py --rps 20 --duration 30
+    python benchmarks/load_test.py --hf-down facebook/bart-large-mnli --gemini-error-rate 0.1
+    python benchmarks/load_test.py --mix check_news=1 --repeat-ratio 0.8 --json report.json
+    python benchmarks/load_test.py --mix check_news=4,check_news_article=1
+    python benchmarks/load_test.py --mix check_news=4,login=1
+    python benchmarks/load_test.py --hf-cold facebook/bart-large-mnli --keep-warm
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_upstreams import (  # noqa: E402
+    CallCounter, Faults, MemoryMongoClient, MockGeminiModel, MockHuggingFace, MockTranslator
+)
+
+DEFAULT_MIX = "check_news=50,check_news_batch=10,check_news_image=10,save_history=15,get_history=15"
+
+SUBJECTS = ["The city council", "The health ministry", "A local school board", "The central bank",
+            "The national weather service", "A major airline", "The state university", "The transport authority"]
+ACTIONS = ["approved a budget of {n} million dollars", "reported {n} new cases", "hired {n} additional staff",
+           "closed {n} offices", "opened {n} new routes", "raised fees by {n} percent"]
+WHEN = ["on Monday", "last week", "in {year}", "after a public vote", "during the annual meeting"]
+FOREIGN = [
+    "El ayuntamiento aprobó un presupuesto de {n} millones de euros para el transporte público",
+    "Le ministère de la santé a annoncé {n} nouveaux hôpitaux dans le pays cette année",
+    "Die Stadtverwaltung hat {n} neue Buslinien für den Nahverkehr eröffnet",
+]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class ClaimSource:
+    """
+    Generated claims. `repeat_ratio` of them come from a small hot set, so the
+    verdict cache sees repeats; `foreign_ratio` are not English and go through translation.
+    """
+
+    def __init__(self, repeat_ratio, foreign_ratio, hot_set=20, seed=1):
+        self.repeat_ratio = repeat_ratio
+        self.foreign_ratio = foreign_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._hot = [self._fresh() for _ in range(hot_set)]
+
+    def _fresh(self):
+        n = self._random.randint(2, 9999)
+        if self._random.random() < self.foreign_ratio:
+            return self._random.choice(FOREIGN).format(n=n)
+        return " ".join([
+            self._random.choice(SUBJECTS),
+            self._random.choice(ACTIONS).format(n=n),
+            self._random.choice(WHEN).format(year=self._random.randint(1990, 2026))
+        ])
+
+    def next(self):
+        with self._lock:
+            if self._random.random() < self.repeat_ratio:
+                return self._random.choice(self._hot)
+            return self._fresh()
+
+    def article(self, sentences=12):
+        """A pasted article: claims as sentences, wrapped like OCR output, with page furniture around them."""
+        body = " ".join(self.next().rstrip(".") + "." for _ in range(sentences))
+        words = body.split()
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        return "\n".join(["LOCAL NEWS", "By Staff Reporter | 4 min read"] + lines +
+                         ["Share this article", "© 2026 The Daily Record. All rights reserved."])
+
+
+def make_image(text):
+    """A PNG screenshot of the claim, large enough for OCR."""
+    from PIL import Image, ImageDraw, ImageFont
+    img = Image.new("RGB", (1200, 400), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=40)
+    words = text.split()
+    for line in range(0, len(words), 6):
+        draw.text((40, 40 + line // 6 * 60), " ".join(words[line:line + 6]), fill="black", font=font)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Scenarios:
+    """One method per traffic type; each sends a request and returns its status code."""
+
+    def __init__(self, base_url, claims, users, batch_size):
+        self.base_url = base_url
+        self.claims = claims
+        self.users = users
+        self.batch_size = batch_size
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def check_news(self):
+        response = self.session.post(f"{self.base_url}/check_news", json={"text": self.claims.next()})
+        return response.status_code
+
+    def check_news_batch(self):
+        texts = [self.claims.next() for _ in range(self.batch_size)]
+        response = self.session.post(f"{self.base_url}/check_news_batch", json={"texts": texts})
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        # Streamed with a 200 status; a batch that did not finish counts as a failure
+        if response.status_code == 200 and not (lines and lines[-1].get("done")):
+            return 599
+        return response.status_code
+
+    def check_news_article(self):
+        response = self.session.post(f"{self.base_url}/check_news", json={"text": self.claims.article()})
+        return response.status_code
+
+    def check_news_image(self):
+        files = {"image": ("claim.png", make_image(self.claims.next()), "image/png")}
+        response = self.session.post(f"{self.base_url}/check_news_image", files=files)
+        return response.status_code
+
+    def save_history(self):
+        user_id, token = random.choice(self.users)
+        response = self.session.post(f"{self.base_url}/user/save-history", json={
+            "userId": user_id,
+            "content": self.claims.next(),
+            "type": "text",
+            "result": random.choice(["REAL", "FAKE", "UNSURE"]),
+            "confidence": round(random.uniform(0, 10), 1),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }, headers={"Authorization": f"Bearer {token}"})
+        return response.status_code
+
+    def login(self):
+        response = self.session.post(f"{self.base_url}/login", json={
+            "email": f"load-test-{random.randrange(len(self.users))}@example.com", "password": "load-test-password"
+        })
+        return response.status_code
+
+    def get_history(self):
+        user_id, token = random.choice(self.users)
+        response = self.session.get(f"{self.base_url}/user/history/{user_id}", params={"limit": 20},
+                                    headers={"Authorization": f"Bearer {token}"})
+        response.json()
+        return response.status_code
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Scenarios, name.strip()):
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_model_latency(value):
+    latencies = {}
+    for part in filter(None, value.split(",")):
+        model, _, latency = part.rpartition("=")
+        latencies[model.strip()] = float(latency)
+    return latencies
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rps", type=float, default=20.0, help="Requests started per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=64, help="Client threads (max in-flight requests)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--batch-size", type=int, default=8, help="Texts per /check_news_batch request")
+    parser.add_argument("--users", type=int, default=5, help="Users registered for the history scenarios")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Share of claims taken from a hot set")
+    parser.add_argument("--foreign-ratio", type=float, default=0.1, help="Share of claims that are not English")
+    parser.add_argument("--seed", type=int, default=1)
+    for name, latency in (("hf", 80), ("gemini", 300), ("translate", 60), ("mongo", 2)):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{name}-jitter-ms", type=float, default=latency / 2)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--hf-down", default="", help="Comma-separated models that always answer 503")
+    parser.add_argument("--hf-cold", default="", help="Comma-separated models that start unloaded and unload when idle")
+    parser.add_argument("--hf-warm-up-seconds", type=float, default=3.0, help="Spin-up time of a cold model")
+    parser.add_argument("--hf-cool-down-seconds", type=float, default=60.0, help="Idle time after which a cold model unloads")
+    parser.add_argument("--hf-model-latency", type=parse_model_latency, default={},
+                        help="Extra latency per model, e.g. facebook/bart-large-mnli=400")
+    parser.add_argument("--keep-warm", action="store_true", help="Run the app's keep-warm scheduler")
+    parser.add_argument("--keep-warm-interval", type=float, default=5.0, help="Keep-warm probe interval in seconds")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail when the overall p95 latency is higher")
+    parser.add_argument("--max-error-rate", type=float, help="Fail when a larger share of requests fails")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's log output")
+    return parser.parse_args()
+
+
+def start_app(args, counter):
+    """Imports the app against the stand-ins and serves it on a free local port."""
+    hf = MockHuggingFace(Faults(args.hf_latency_ms, args.hf_jitter_ms, args.hf_error_rate), counter,
+                         down=[model for model in args.hf_down.split(",") if model],
+                         cold=[model for model in args.hf_cold.split(",") if model],
+                         warm_up_seconds=args.hf_warm_up_seconds, cool_down_seconds=args.hf_cool_down_seconds,
+                         model_latency_ms=args.hf_model_latency).start()
+    os.environ.update({
+        "HF_INFERENCE_URL": hf.url,
+        "HISTORY_JOURNAL_DIR": tempfile.mkdtemp(prefix="load-test-journal-"),
+        "TRANSLATION_PRECOMPUTE_LABELS": "false",
+        "STARTUP_WARMUP": "",
+        "LOG_SAMPLE_RATE": "0"
+    })
+    if args.keep_warm:
+        os.environ.update({"KEEP_WARM_ENABLED": "true", "KEEP_WARM_INTERVAL_SECONDS": str(args.keep_warm_interval)})
+    # All traffic comes from one address, so the per-client limit is off unless asked for
+    os.environ.setdefault("ADMISSION_CLIENT_RATE", "0")
+    import app
+    app.gemini_model.override(MockGeminiModel(
+        Faults(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate), counter))
+    # Errors are injected once the users are registered, see main()
+    app.mongo_client.override(MemoryMongoClient(Faults(args.mongo_latency_ms, args.mongo_jitter_ms), counter))
+    app.google_translate = MockTranslator(
+        Faults(args.translate_latency_ms, args.translate_jitter_ms, args.translate_error_rate), counter)
+
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    # Tracebacks of failed requests are counted in the report instead
+    app.app.logger.disabled = not args.verbose
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return app, server, hf, f"http://127.0.0.1:{server.server_port}"
+
+
+def register_users(base_url, count):
+    users = []
+    for i in range(count):
+        response = requests.post(f"{base_url}/register", json={
+            "username": f"load-test-{i}", "email": f"load-test-{i}@example.com", "password": "load-test-password"
+        })
+        response.raise_for_status()
+        users.append((response.json()["userId"], response.json()["token"]))
+    return users
+
+
+def run_load(scenarios, mix, rps, duration, concurrency, seed):
+    """Starts requests on schedule and returns {scenario: [(latency_seconds, status), ...]} and the elapsed time."""
+    schedule_random = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    results = {name: [] for name in names}
+    lock = threading.Lock()
+
+    def run_one(name, due):
+        try:
+            status = getattr(scenarios, name)()
+        except Exception as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - due
+        with lock:
+            results[name].append((latency, status))
+
+    total = int(rps * duration)
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(total):
+            due = started_at + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run_one, schedule_random.choices(names, weights)[0], due)
+    return results, time.perf_counter() - started_at
+
+
+def build_report(results, elapsed, args, counter, app_stats):
+    def summarize(samples):
+        latencies = sorted(latency for latency, _ in samples)
+        statuses = Counter(str(status) for _, status in samples)
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if samples else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if samples else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if samples else None,
+            "statuses": dict(sorted(statuses.items()))
+        }
+
+    scenarios = {name: summarize(samples) for name, samples in results.items()}
+    overall = summarize([sample for samples in results.values() for sample in samples])
+    return {
+        "target_rps": args.rps,
+        "throughput_rps": round(overall["requests"] / elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+        "overall": overall,
+        "scenarios": scenarios,
+        "upstream_calls": counter.snapshot(),
+        "app": app_stats
+    }
+
+
+def print_report(report):
+    print(f"\n{'scenario':<18} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    rows = list(report["scenarios"].items()) + [("overall", report["overall"])]
+    for name, row in rows:
+        latencies = "".join(f"{row[key]:>10.1f}" if row[key] is not None else f"{'-':>10}"
+                            for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{name:<18} {row['requests']:>8} {row['errors']:>7}{latencies}  {row['statuses']}")
+    print(f"\nthroughput: {report['throughput_rps']} req/s (target {report['target_rps']}) "
+          f"over {report['elapsed_s']}s")
+    print("upstream calls:")
+    for upstream, outcomes in report["upstream_calls"].items():
+        print(f"  {upstream:<18} " + ", ".join(f"{outcome} {count}" for outcome, count in outcomes.items()))
+    app_stats = report["app"]
+    print(f"verdict cache hit ratio: {app_stats['verdict_cache'].get('hit_ratio')}, "
+          f"coalesced: {app_stats['verdict_cache'].get('coalescing', {}).get('coalesced')}, "
+          f"open circuits: {app_stats['open_circuits'] or 'none'}")
+    print("model order: " + ", ".join(
+        f"{model} ({app_stats['keep_warm']['models'].get(model, {}).get('state', 'local')})"
+        for model in app_stats["model_order"]))
+
+
+def main():
+    args = parse_args()
+    mix = dict(args.mix)
+    if "check_news_image" in mix and shutil.which("tesseract") is None:
+        print("Tesseract is not installed, leaving check_news_image out of the mix")
+        del mix["check_news_image"]
+
+    counter = CallCounter()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        app, server, hf, base_url = start_app(args, counter)
+        users = register_users(base_url, args.users)
+        app.mongo_client.get().faults.error_rate = args.mongo_error_rate
+        scenarios = Scenarios(base_url, ClaimSource(args.repeat_ratio, args.foreign_ratio, seed=args.seed),
+                              users, args.batch_size)
+        results, elapsed = run_load(scenarios, mix, args.rps, args.duration, args.concurrency, args.seed)
+        app_stats = {
+            "verdict_cache": requests.get(f"{base_url}/cache/stats").json(),
+            "open_circuits": [model for model, breaker in app.model_breakers.items()
+                              if breaker.snapshot()["state"] != "closed"],
+            "model_order": app.model_order(),
+            "keep_warm": app.model_warmer.stats()
+        }
+        app.history_sink.flush()
+        server.shutdown()
+        hf.stop()
+
+    report = build_report(results, elapsed, args, counter, app_stats)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.max_p95_ms is not None and (report["overall"]["p95_ms"] or 0) > args.max_p95_ms:
+        failures.append(f"p95 {report['overall']['p95_ms']}ms is above {args.max_p95_ms}ms")
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {report['overall']['error_rate']} is above {args.max_error_rate}")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
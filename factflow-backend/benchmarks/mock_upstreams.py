@@ -0,0 +1,438 @@
+"""
+Local stand-ins for the services FactFlow calls, for offline load tests.
+
+- MockHuggingFace: an HTTP server speaking the inference API, reached
+  through HF_INFERENCE_URL so the real pooled session and circuit
+  breakers are exercised.
+- MockGeminiModel: replaces the Gemini client and streams structured
+  answers like generate_content(stream=True).
+- MockTranslator: replaces the Google translation backend.
+- MemoryMongoClient: an in-memory subset of the pymongo API, covering the
+  queries the app runs.
+
+Every stand-in takes a Faults object for latency and error injection and
+reports its calls to a shared CallCounter.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+class Faults:
+    """Latency (a fixed part plus uniform jitter, in ms) and a random error rate."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def delay(self):
+        seconds = (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class CallCounter:
+    """Thread-safe counts of upstream calls by (upstream, outcome)."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, upstream, outcome):
+        with self._lock:
+            self._counts[(upstream, outcome)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for (upstream, outcome), count in sorted(self._counts.items()):
+                result.setdefault(upstream, {})[outcome] = count
+            return result
+
+
+def _verdict_for(text):
+    """A stable verdict per text, so repeated claims get the same answer."""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest()
+    label = ("REAL", "FAKE", "UNSURE")[digest[0] % 3]
+    confidence = 0.55 + (digest[1] / 255) * 0.4
+    return label, round(confidence, 3)
+
+
+# --- Hugging Face ---
+
+class MockHuggingFace:
+    """
+    Serves POST /models/<model name> on 127.0.0.1. NLI models answer with
+    labels/scores, the other models with a label/score list; a list of
+    inputs gets one answer per input. Failures are 503s with Retry-After.
+    Models named in `down` always fail.
+
+    Models named in `cold` behave like hosted models that were unloaded:
+    the first request starts a `warm_up_seconds` spin-up during which they
+    answer 503 "currently loading" with an estimated_time, and they unload
+    again after `cool_down_seconds` without requests. `model_latency_ms`
+    adds a fixed latency per model on top of `faults`.
+    """
+
+    def __init__(self, faults, counter, down=(), cold=(), warm_up_seconds=3.0, cool_down_seconds=60.0,
+                 model_latency_ms=None):
+        self.faults = faults
+        self.counter = counter
+        self.down = set(down)
+        self.cold = set(cold)
+        self.warm_up_seconds = warm_up_seconds
+        self.cool_down_seconds = cool_down_seconds
+        self.model_latency_ms = dict(model_latency_ms or {})
+        self._loading_since = {}
+        self._last_request = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/models"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-hf", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def loading_seconds_left(self, model_name):
+        """Seconds until a cold model is loaded, 0 once it is warm."""
+        if model_name not in self.cold:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            last_request = self._last_request.get(model_name)
+            self._last_request[model_name] = now
+            if last_request is None or now - last_request > self.cool_down_seconds:
+                self._loading_since[model_name] = now  # Unloaded, this request starts loading it again
+            return max(0.0, self._loading_since[model_name] + self.warm_up_seconds - now)
+
+    @staticmethod
+    def answer(model_name, text):
+        label, score = _verdict_for(text)
+        if model_name.endswith("mnli") or "fever" in model_name.lower():
+            nli_label = {"REAL": "entailment", "FAKE": "contradiction", "UNSURE": "neutral"}[label]
+            others = [other for other in ("entailment", "contradiction", "neutral") if other != nli_label]
+            rest = round((1 - score) / 2, 3)
+            return {"sequence": text, "labels": [nli_label] + others, "scores": [score, rest, rest]}
+        other = "FAKE" if label == "REAL" else "REAL"
+        return [{"label": label, "score": score}, {"label": other, "score": round(1 - score, 3)}]
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+            def do_POST(self):
+                model_name = self.path.split("/models/", 1)[-1]
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                mock.faults.delay()
+                if model_name in mock.model_latency_ms:
+                    time.sleep(mock.model_latency_ms[model_name] / 1000)
+                loading = mock.loading_seconds_left(model_name)
+                if loading > 0:
+                    mock.counter.count("huggingface", "loading")
+                    self._send(503, {"error": f"Model {model_name} is currently loading",
+                                     "estimated_time": round(loading, 1)})
+                    return
+                if model_name in mock.down or mock.faults.should_fail():
+                    mock.counter.count("huggingface", "error")
+                    self._send(503, {"error": f"Model {model_name} is currently loading"}, {"Retry-After": "1"})
+                    return
+                inputs = json.loads(body)["inputs"]
+                if isinstance(inputs, list):
+                    payload = [mock.answer(model_name, text) for text in inputs]
+                else:
+                    payload = [mock.answer(model_name, inputs)]
+                mock.counter.count("huggingface", "ok")
+                self._send(200, payload)
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# --- Gemini ---
+
+_PROMPT_CLAIM_RE = re.compile(r'User Input: "(.*)"\n', re.S)
+_BATCH_CLAIM_RE = re.compile(r'^(\d+)\. "(.*)"$', re.M)
+
+
+class MockGeminiModel:
+    """
+    Stands in for genai.GenerativeModel. `faults` applies before the first
+    chunk; the answer then streams in `chunk_size` character chunks, one
+    every `chunk_interval_ms`.
+    """
+
+    def __init__(self, faults, counter, chunk_size=40, chunk_interval_ms=5.0):
+        self.faults = faults
+        self.counter = counter
+        self.chunk_size = chunk_size
+        self.chunk_interval_ms = chunk_interval_ms
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.faults.delay()
+        if self.faults.should_fail():
+            self.counter.count("gemini", "error")
+            raise RuntimeError("503 The model is overloaded (injected)")
+        self.counter.count("gemini", "ok")
+
+        schema = (generation_config or {}).get("response_schema") or {}
+        if schema.get("type") == "array":
+            answer = json.dumps([dict(self._verdict(text), id=int(i)) for i, text in _BATCH_CLAIM_RE.findall(prompt)])
+        else:
+            match = _PROMPT_CLAIM_RE.search(prompt)
+            answer = json.dumps(self._verdict(match.group(1) if match else prompt))
+        if not stream:
+            return SimpleNamespace(text=answer, parts=[answer])
+        return self._stream(answer)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False):
+        response = await asyncio.to_thread(self.generate_content, prompt, generation_config, False)
+        if not stream:
+            return response
+
+        async def chunks():
+            for start in range(0, len(response.text), self.chunk_size):
+                await asyncio.sleep(self.chunk_interval_ms / 1000)
+                text = response.text[start:start + self.chunk_size]
+                yield SimpleNamespace(text=text, parts=[text])
+        return chunks()
+
+    def _stream(self, answer):
+        for start in range(0, len(answer), self.chunk_size):
+            time.sleep(self.chunk_interval_ms / 1000)
+            text = answer[start:start + self.chunk_size]
+            yield SimpleNamespace(text=text, parts=[text])
+
+    @staticmethod
+    def _verdict(text):
+        label, score = _verdict_for(text)
+        return {
+            "classification": label,
+            "confidence": round(score * 10, 1),
+            "justification": "Stand-in answer. " + "No independent sources were checked for this claim. " * 3
+        }
+
+
+# --- Translation ---
+
+class MockTranslator:
+    """Stands in for translation.google_translate; the 'translation' is tagged with the target language."""
+
+    def __init__(self, faults, counter):
+        self.faults = faults
+        self.counter = counter
+
+    def __call__(self, text, target_lang, source_lang):
+        self.faults.delay()
+        if self.faults.should_fail():
+            self.counter.count("google_translate", "error")
+            raise ConnectionError("Translation request failed (injected)")
+        self.counter.count("google_translate", "ok")
+        return f"[{target_lang}] {text}"
+
+
+# --- MongoDB ---
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            for op, operand in condition.items():
+                if op == "$in":
+                    ok = any(item in operand for item in values)
+                elif op == "$lt":
+                    ok = value is not None and value < operand
+                elif op == "$gt":
+                    ok = value is not None and value > operand
+                else:
+                    raise NotImplementedError(f"MemoryCollection does not support {op}")
+                if not ok:
+                    return False
+        elif condition not in values and value != condition:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = {key for key, include in projection.items() if include}
+    if projection.get("_id", 1):
+        fields.add("_id")
+    return {key: copy.deepcopy(value) for key, value in doc.items() if key in fields}
+
+
+class MemoryCursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._limit = 0
+        self._iterator = None
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self._docs.sort(key=lambda doc: doc.get(key), reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, _):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            docs = self._docs[:self._limit] if self._limit else self._docs
+            self._iterator = iter([_project(doc, self._projection) for doc in docs])
+        return next(self._iterator)
+
+
+class MemoryCollection:
+    """The subset of pymongo's Collection the app uses; every call pays `faults`."""
+
+    def __init__(self, name, faults, counter):
+        self.name = name
+        self.faults = faults
+        self.counter = counter
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation):
+        self.faults.delay()
+        if self.faults.should_fail():
+            self.counter.count("mongodb", "error")
+            from pymongo.errors import AutoReconnect
+            raise AutoReconnect(f"{self.name}.{operation} failed (injected)")
+        self.counter.count("mongodb", "ok")
+
+    def create_index(self, keys, **kwargs):
+        return keys if isinstance(keys, str) else "_".join(f"{key}_{direction}" for key, direction in keys)
+
+    def find_one(self, query, projection=None):
+        self._call("find_one")
+        with self._lock:
+            for doc in self._docs.values():
+                if _matches(doc, query):
+                    return _project(doc, projection)
+        return None
+
+    def find(self, query, projection=None):
+        self._call("find")
+        with self._lock:
+            docs = [doc for doc in self._docs.values() if _matches(doc, query)]
+        return MemoryCursor(docs, projection)
+
+    def insert_one(self, doc):
+        from bson import ObjectId
+        self._call("insert_one")
+        doc.setdefault("_id", ObjectId())
+        with self._lock:
+            self._docs[doc["_id"]] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs, ordered=True):
+        from bson import ObjectId
+        self._call("insert_many")
+        with self._lock:
+            for doc in docs:
+                doc.setdefault("_id", ObjectId())
+                self._docs.setdefault(doc["_id"], copy.deepcopy(doc))
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    def replace_one(self, query, doc, upsert=False):
+        self._call("replace_one")
+        with self._lock:
+            self._docs[query["_id"]] = copy.deepcopy(doc)
+
+    def update_one(self, query, update, upsert=False):
+        self._call("update_one")
+        with self._lock:
+            doc = self._docs.get(query["_id"])
+            if doc is None and upsert:
+                doc = self._docs[query["_id"]] = {"_id": query["_id"]}
+            if doc is not None:
+                doc.update(copy.deepcopy(update.get("$set", {})))
+
+    def bulk_write(self, requests, ordered=True):
+        """Applies pymongo UpdateOne requests by _id; other request types are not supported."""
+        self._call("bulk_write")
+        modified = 0
+        with self._lock:
+            for request in requests:
+                doc = self._docs.get(request._filter["_id"])
+                if doc is not None:
+                    doc.update(copy.deepcopy(request._doc.get("$set", {})))
+                    modified += 1
+        return SimpleNamespace(matched_count=modified, modified_count=modified)
+
+    def count(self):
+        with self._lock:
+            return len(self._docs)
+
+
+class MemoryMongoClient:
+    """client[database][collection] returns shared MemoryCollections."""
+
+    def __init__(self, faults, counter):
+        self.faults = faults
+        self.counter = counter
+        self._collections = {}
+        self._lock = threading.Lock()
+        self.admin = SimpleNamespace(command=lambda name: {"ok": 1})
+
+    def __getitem__(self, database):
+        client = self
+
+        class Database:
+            def __getitem__(self, name):
+                with client._lock:
+                    key = (database, name)
+                    if key not in client._collections:
+                        client._collections[key] = MemoryCollection(name, client.faults, client.counter)
+                    return client._collections[key]
+
+        return Database()
@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls are
+    rejected without touching the network. Once the backoff has elapsed a single
+    probe call is let through (half-open): success closes the breaker, failure
+    re-opens it with a doubled backoff, up to `max_backoff`.
+    """
+
+    def __init__(self, name, failure_threshold=3, base_backoff=5.0, max_backoff=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._trips = 0  # Consecutive times the breaker opened, drives the backoff
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow_request(self):
+        """Returns True if a call may go through right now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() >= self._open_until:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trips = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """
+        Ends a call that told nothing about the upstream's health, e.g. one that failed
+        before a request was sent. A half-open breaker then lets the next call probe.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_failure(self, retry_after=None):
+        """Counts a failure. `retry_after` (seconds) comes from the upstream when it tells us how long to wait."""
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            was_probe = self._state == HALF_OPEN
+            self._probe_in_flight = False
+            if was_probe or self._consecutive_failures >= self.failure_threshold:
+                self._trips += 1
+                backoff = min(self.base_backoff * (2 ** (self._trips - 1)), self.max_backoff)
+                if retry_after:
+                    backoff = min(max(backoff, retry_after), self.max_backoff)
+                self._state = OPEN
+                self._open_until = time.monotonic() + backoff
+                self._stats["opened"] += 1
+                print(f"🔌 Circuit for {self.name} opened for {backoff:.1f}s after {self._consecutive_failures} failure(s).")
+
+    def snapshot(self):
+        """Returns the breaker state and counters."""
+        with self._lock:
+            state = self._state
+            if state == OPEN and time.monotonic() >= self._open_until:
+                state = HALF_OPEN  # Next call will be a probe
+            return dict(
+                self._stats,
+                state=state,
+                consecutive_failures=self._consecutive_failures,
+                retry_in_seconds=round(max(self._open_until - time.monotonic(), 0), 1) if state == OPEN else 0
+            )
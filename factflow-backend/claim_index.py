@@ -0,0 +1,213 @@
+import hashlib
+import random
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from verdict_cache import normalize_text
+
+_WORD_RE = re.compile(r"[^\W_]+(?:[.,'’][^\W_]+)*")
+_NUMBER_RE = re.compile(r"\d")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Function words: adding, dropping or swapping these does not change what a claim states
+STOP_WORDS = frozenset("""
+a an the and or but if then than so as of in on at to for from by with about into over after before
+is are was were be been being am has have had having do does did will would shall should can could
+may might must that this these those there here it its they them their he she his her we our you your
+i me my who whom which what when where while also just very really still now today yesterday says said
+according reportedly report reports new
+""".split())
+
+# A match must agree on these, "X is Y" and "X is not Y" share every other word
+NEGATIONS = frozenset("""
+not no never none nobody nothing neither nor without cannot cant dont doesnt didnt isnt arent wasnt
+werent wont wouldnt shouldnt couldnt hasnt havent hadnt fake false hoax deny denies denied
+""".split())
+
+
+def _stem(word):
+    """Strips common English inflections so "confirms", "confirmed" and "confirm" match."""
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def claim_terms(text):
+    """
+    Returns (terms, guard): the set of stemmed content words of a claim, and
+    the negations and numbers in it, which two claims must share to match.
+    """
+    words = [re.sub(r"['’]", "", word) for word in _WORD_RE.findall(normalize_text(text))]
+    terms = {_stem(word) for word in words if word not in STOP_WORDS}
+    guard = {word for word in words if word in NEGATIONS or _NUMBER_RE.search(word)}
+    return terms, guard
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ClaimIndex:
+    """
+    Near-duplicate index over claims that were already fact-checked.
+
+    Claims are reduced to their stemmed content words, MinHash signatures of
+    those sets are split into LSH bands, and claims sharing a band are
+    compared by exact Jaccard similarity. A candidate matches when it
+    reaches `threshold` and has the same negations and numbers.
+
+    With a MongoDB `collection` the claims, their band keys and verdicts are
+    stored there (a multikey index on "bands" makes the candidate lookup
+    one query); without one the index is kept in memory. An optional
+    `breaker` (CircuitBreaker) skips the index while MongoDB is failing.
+    """
+
+    def __init__(self, collection=None, threshold=0.9, num_perm=64, bands=16, version="", ttl_days=30,
+                 breaker=None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.collection = collection
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.version = version
+        self.breaker = breaker
+        rng = random.Random(1)  # Fixed, so signatures stay comparable across processes and restarts
+        self._permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+                              for _ in range(num_perm)]
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(set)  # In-memory only: band key -> claim IDs
+        self._claims = {}  # In-memory only: claim ID -> document
+        self._stats = {"lookups": 0, "matches": 0, "stored": 0, "errors": 0}
+        self._ttl_seconds = ttl_days * 86400
+        self._indexed = False
+
+    def lookup(self, text):
+        """
+        Returns the closest matching claim as {"claim_id", "text", "similarity",
+        "response", "checked_at"}, or None.
+        """
+        terms, guard = claim_terms(text)
+        with self._lock:
+            self._stats["lookups"] += 1
+        if not terms:
+            return None
+
+        if self.breaker is not None and not self.breaker.allow_request():
+            return None
+        try:
+            candidates = self._candidates(self._band_keys(terms))
+        except Exception as e:
+            self._record_error("Claim index lookup failed", e)
+            return None
+        self._record_success()
+
+        best, best_similarity = None, self.threshold
+        for doc in candidates:
+            stored_terms = set(doc["terms"])
+            similarity = len(terms & stored_terms) / len(terms | stored_terms)
+            if similarity >= best_similarity and set(doc["guard"]) == guard:
+                best, best_similarity = doc, similarity
+        if best is None:
+            return None
+
+        with self._lock:
+            self._stats["matches"] += 1
+        return {
+            "claim_id": best["_id"],
+            "text": best["text"],
+            "similarity": round(best_similarity, 3),
+            "response": best["response"],
+            "checked_at": best["createdAt"].isoformat()
+        }
+
+    def add(self, text, response_data):
+        """Stores a checked claim and its verdict."""
+        terms, guard = claim_terms(text)
+        if not terms:
+            return
+        doc = {
+            "_id": hashlib.sha256(f"{self.version}|{normalize_text(text)}".encode("utf-8")).hexdigest(),
+            "text": text,
+            "terms": sorted(terms),
+            "guard": sorted(guard),
+            "bands": self._band_keys(terms),
+            "version": self.version,
+            "response": response_data,
+            "createdAt": datetime.utcnow()
+        }
+        if self.breaker is not None and not self.breaker.allow_request():
+            return
+        try:
+            if self.collection is not None:
+                self._ensure_indexes()
+                self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+            else:
+                with self._lock:
+                    self._claims[doc["_id"]] = doc
+                    for key in doc["bands"]:
+                        self._buckets[key].add(doc["_id"])
+        except Exception as e:
+            self._record_error("Could not store claim in the index", e)
+            return
+        self._record_success()
+        with self._lock:
+            self._stats["stored"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, threshold=self.threshold, shared=self.collection is not None)
+        stats["match_ratio"] = round(stats["matches"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+    # --- Internal helpers ---
+
+    def _record_success(self):
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _record_error(self, message, error):
+        print(f"⚠️ {message}: {error}")
+        with self._lock:
+            self._stats["errors"] += 1
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+    def _ensure_indexes(self):
+        # On first use rather than at import, so a missing MongoDB does not stall startup
+        if not self._indexed:
+            self.collection.create_index("bands")
+            self.collection.create_index("createdAt", expireAfterSeconds=self._ttl_seconds)
+            self._indexed = True
+
+    def _signature(self, terms):
+        hashes = [_token_hash(term) for term in terms]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._permutations]
+
+    def _band_keys(self, terms):
+        signature = self._signature(terms)
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).hexdigest()
+            keys.append(f"{band}:{digest}")
+        return keys
+
+    def _candidates(self, band_keys):
+        if self.collection is not None:
+            self._ensure_indexes()
+            return list(self.collection.find(
+                {"bands": {"$in": band_keys}, "version": self.version},
+                {"text": 1, "terms": 1, "guard": 1, "response": 1, "createdAt": 1}
+            ).limit(50))
+        with self._lock:
+            ids = set().union(*(self._buckets.get(key, ()) for key in band_keys))
+            return [self._claims[claim_id] for claim_id in ids]
@@ -0,0 +1,171 @@
+import math
+import re
+
+# Sentence ends: Latin punctuation followed by whitespace, or CJK punctuation
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+|(?<=[。！？])")
+# Words before a period that do not end a sentence
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no", "fig",
+    "u.s", "u.k", "u.n", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec"
+}
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+# Page furniture of articles and social media screenshots
+_BOILERPLATE_RE = re.compile(
+    r"https?://|www\.|©|\ball rights reserved\b|\bclick here\b|\bsubscribe\b|\bsign up\b|\bnewsletter\b"
+    r"|\bread more\b|\bshare this\b|\bfollow us\b|\bcookies?\b|\badvertisement\b|\bsponsored\b|\bmin read\b",
+    re.IGNORECASE
+)
+# Like counters and timestamps of a screenshotted post
+_NOISE_LINE_RE = re.compile(
+    r"^\W*([\d.,]+\s*[KkMm]?\s+(likes?|retweets?|reposts?|quotes?|comments?|shares?|views?|replies)\b"
+    r"|\d{1,2}:\d{2}\b)",
+    re.IGNORECASE
+)
+# Signals that a sentence states something checkable
+_REPORTING_RE = re.compile(
+    r"\b(said|says|announced|reported|confirmed|according to|claimed|claims|found|shows?|revealed|approved|"
+    r"banned|killed|died|arrested|increased|decreased|rose|fell)\b",
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text):
+    """Rough model token count: about 4/3 per word, one per CJK character."""
+    cjk = len(_CJK_RE.findall(text))
+    words = len(_WORD_RE.findall(_CJK_RE.sub(" ", text)))
+    return math.ceil(words * 4 / 3) + cjk
+
+
+class ClaimSplitter:
+    """
+    Splits long text (OCR output, pasted articles) into checkable claim sentences.
+
+    Boilerplate, OCR noise, questions, fragments under `min_words` and
+    repeated sentences are dropped. The most checkable sentences (numbers,
+    names, reporting verbs) are kept, in their original order, until
+    `max_claims` or `token_budget` estimated tokens is reached. Sentences
+    longer than `max_claim_tokens` are cut.
+    """
+
+    def __init__(self, min_words=5, max_claims=8, max_claim_tokens=128, token_budget=600):
+        self.min_words = min_words
+        self.max_claims = max_claims
+        self.max_claim_tokens = max_claim_tokens
+        self.token_budget = token_budget
+
+    def split(self, text, accept=None):
+        """
+        Returns {"claims": [...], "sentences": n, "boilerplate": n, "rejected": n, "over_budget": n}:
+        the selected claims and how many sentences were found, dropped as noise, turned
+        down by `accept` (an optional predicate on a sentence) and left out.
+        """
+        sentences = self.sentences(text)
+        candidates = []
+        seen = set()
+        rejected = 0
+        for position, sentence in enumerate(sentences):
+            key = " ".join(_WORD_RE.findall(sentence.lower()))
+            if key in seen or not self._is_checkable(sentence):
+                continue
+            seen.add(key)
+            if accept is not None and not accept(sentence):
+                rejected += 1
+                continue
+            candidates.append((position, self._truncate(sentence)))
+
+        selected = []
+        tokens = 0
+        for position, sentence in sorted(candidates, key=lambda item: (-self._score(item[1]), item[0])):
+            cost = estimate_tokens(sentence)
+            if len(selected) < self.max_claims and tokens + cost <= self.token_budget:
+                selected.append((position, sentence))
+                tokens += cost
+
+        return {
+            "claims": [sentence for _, sentence in sorted(selected)],
+            "sentences": len(sentences),
+            "boilerplate": len(sentences) - len(candidates) - rejected,
+            "rejected": rejected,
+            "over_budget": len(candidates) - len(selected)
+        }
+
+    def sentences(self, text):
+        """Sentences of the text, with lines wrapped by OCR joined back together."""
+        sentences = []
+        for block in re.split(r"\n\s*\n", text):
+            lines = [line.strip() for line in block.splitlines() if line.strip()]
+            paragraph = []
+            for line in lines:
+                # Headings, captions and page furniture stand alone instead of joining a sentence
+                short = len(_WORD_RE.findall(line)) < self.min_words and not line.endswith((".", "!", "?", "。", "！", "？"))
+                if short or _BOILERPLATE_RE.search(line) or _NOISE_LINE_RE.match(line):
+                    sentences.extend(self._split_paragraph(" ".join(paragraph)))
+                    sentences.append(line)
+                    paragraph = []
+                else:
+                    paragraph.append(line)
+            sentences.extend(self._split_paragraph(" ".join(paragraph)))
+        return [sentence for sentence in sentences if sentence]
+
+    # --- Internal helpers ---
+
+    def _split_paragraph(self, paragraph):
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(paragraph):
+            before = paragraph[start:match.start()]
+            last_word = before.rsplit(None, 1)[-1].rstrip(".").lower() if before.strip() else ""
+            # "Dr. Smith", "U.S. officials" and initials such as "J. Smith" do not end a sentence
+            if before.endswith(".") and (last_word in _ABBREVIATIONS or len(last_word) == 1):
+                continue
+            sentences.append(paragraph[start:match.end()].strip())
+            start = match.end()
+        sentences.append(paragraph[start:].strip())
+        return [sentence for sentence in sentences if sentence]
+
+    def _is_checkable(self, sentence):
+        if _BOILERPLATE_RE.search(sentence) or _NOISE_LINE_RE.match(sentence):
+            return False
+        if sentence.endswith(("?", "？", "؟")):
+            return False
+        letters = sum(char.isalpha() for char in sentence)
+        if letters < len(sentence.replace(" ", "")) * 0.6:
+            return False  # OCR noise, tables, timestamps
+        return estimate_tokens(sentence) >= self.min_words
+
+    def _score(self, sentence):
+        words = sentence.split()
+        score = 2 if re.search(r"\d", sentence) else 0
+        score += min(sum(word[:1].isupper() for word in words[1:]), 3)
+        score += 1 if _REPORTING_RE.search(sentence) else 0
+        return score
+
+    def _truncate(self, sentence):
+        if estimate_tokens(sentence) <= self.max_claim_tokens:
+            return sentence
+        words = sentence.split()
+        while len(words) > 1 and estimate_tokens(" ".join(words)) > self.max_claim_tokens:
+            words = words[:int(len(words) * 0.9)]
+        return " ".join(words) + "…"
+
+
+def aggregate_claim_verdicts(verdicts, fake_threshold=6.0):
+    """
+    Combines per-claim (label, confidence_score) pairs into one verdict.
+    One confidently FAKE claim makes the text FAKE; the text is REAL only
+    when every claim is, and then only as confident as its weakest claim.
+    Returns (label, confidence_score, decisive_index), where decisive_index
+    points at the claim that decided the verdict.
+    """
+    fake = [(score, i) for i, (label, score) in enumerate(verdicts) if label == "FAKE" and score >= fake_threshold]
+    if fake:
+        score, index = max(fake)
+        return "FAKE", score, index
+    if verdicts and all(label == "REAL" for label, _ in verdicts):
+        score, index = min((score, i) for i, (_, score) in enumerate(verdicts))
+        return "REAL", score, index
+    score = round(sum(score for _, score in verdicts) / len(verdicts), 1) if verdicts else 5.0
+    index = next((i for i, (label, _) in enumerate(verdicts) if label != "REAL"), None)
+    return "UNSURE", score, index
@@ -0,0 +1,109 @@
+import json
+import re
+
+VERDICT_LABELS = ("REAL", "FAKE", "UNSURE")
+
+# Gemini emits properties in alphabetical order when the schema sets none, so
+# "classification" and "confidence" always arrive before the long "justification"
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "classification": {"type": "string", "format": "enum", "enum": list(VERDICT_LABELS)},
+        "confidence": {"type": "number"},
+        "justification": {"type": "string"}
+    },
+    "required": ["classification", "confidence", "justification"]
+}
+
+BATCH_VERDICT_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": dict(VERDICT_SCHEMA["properties"], id={"type": "integer"}),
+        "required": ["id"] + VERDICT_SCHEMA["required"]
+    }
+}
+
+_LABEL_RE = re.compile(r'"classification"\s*:\s*"(\w+)"')
+# A number is only complete once the next delimiter has arrived
+_CONFIDENCE_RE = re.compile(r'"confidence"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\s*[,}]')
+_JUSTIFICATION_RE = re.compile(r'"justification"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def format_explanation(label, confidence, justification):
+    """The explanation text the rest of the app expects from Gemini."""
+    return f"Classification: {label}\nConfidence Rating: {confidence}\nJustification: {justification}"
+
+
+def parse_verdict(item):
+    """
+    Turns one decoded VERDICT_SCHEMA object into (confidence, label, explanation).
+    Raises KeyError, TypeError or ValueError for malformed objects.
+    """
+    label = _clean_label(item["classification"])
+    confidence = _clean_confidence(item["confidence"])
+    return confidence, label, format_explanation(label, confidence, str(item["justification"]).strip())
+
+
+class VerdictStreamParser:
+    """
+    Incremental parser for a streamed VERDICT_SCHEMA answer.
+
+    Text chunks are passed to `feed` as they arrive. As soon as the
+    classification and confidence are complete, `on_verdict(confidence,
+    label)` is called once, while Gemini is still writing the justification.
+    """
+
+    def __init__(self, on_verdict=None):
+        self.on_verdict = on_verdict
+        self.verdict = None  # (confidence, label) once both are known
+        self._text = ""
+
+    @property
+    def text(self):
+        return self._text
+
+    def feed(self, chunk):
+        self._text += chunk
+        if self.verdict is not None:
+            return
+        label_match = _LABEL_RE.search(self._text)
+        confidence_match = _CONFIDENCE_RE.search(self._text)
+        if label_match and confidence_match:
+            self.verdict = (_clean_confidence(confidence_match.group(1)), _clean_label(label_match.group(1)))
+            if self.on_verdict is not None:
+                self.on_verdict(*self.verdict)
+
+    def result(self):
+        """
+        Returns (confidence, label, explanation) for the whole answer. An answer
+        cut off by the output token limit keeps its verdict and the justification
+        written so far. Raises ValueError when no verdict could be read.
+        """
+        try:
+            return parse_verdict(json.loads(self._text))
+        except (KeyError, TypeError, ValueError):
+            pass
+        if self.verdict is None:
+            raise ValueError(f"No verdict in Gemini response: {self._text!r:.200}")
+
+        confidence, label = self.verdict
+        justification_match = _JUSTIFICATION_RE.search(self._text)
+        justification = ""
+        if justification_match:
+            # Drop a dangling escape and decode what was written
+            partial = re.sub(r"\\(u[0-9a-fA-F]{0,3})?$", "", justification_match.group(1))
+            try:
+                justification = json.loads(f'"{partial}"').strip() + "…"
+            except ValueError:
+                justification = partial.strip() + "…"
+        return confidence, label, format_explanation(label, confidence, justification)
+
+
+def _clean_label(value):
+    label = str(value).upper()
+    return label if label in VERDICT_LABELS else "UNSURE"
+
+
+def _clean_confidence(value):
+    return min(max(float(value), 0.0), 10.0)
@@ -0,0 +1,246 @@
+import atexit
+import glob
+import itertools
+import os
+import threading
+import time
+
+from bson import json_util
+
+# fcntl is POSIX only; without it journals of other live processes are not told apart
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class HistoryBacklogFull(Exception):
+    """Raised when too many history entries are waiting to be written."""
+
+
+class _Segment:
+    """A journal file and the entries written to it; the file is locked while it is open."""
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else []
+        self.file = open(path, "a+", encoding="utf-8")
+
+    def lock(self):
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def close(self, remove=False):
+        self.file.close()
+        if remove:
+            os.remove(self.path)
+
+
+class HistorySink:
+    """
+    Write-behind buffer for history entries.
+
+    `add` appends the entry to a local journal file and returns; a
+    background thread writes buffered entries with one insert_many once
+    `batch_size` are waiting or every `flush_interval` seconds. Entries
+    must carry their own "_id", so replaying a journal after a crash can
+    skip the ones that were already written.
+
+    Each process journals into its own locked files in `journal_dir`.
+    The journal and the thread are started on first use by the process
+    that uses them, and again after a fork, so a preloaded app does not
+    hand its workers a dead thread and a journal they share. Starting also
+    replays journals left behind by processes that died.
+    """
+
+    def __init__(self, collection, journal_dir, batch_size=100, flush_interval=1.0, max_pending=10000,
+                 fsync=False):
+        self.collection = collection
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()  # One writer at a time: the thread or a caller of flush()
+        self._segments = []  # Sealed segments waiting to be written, oldest first
+        self._active = None
+        self._thread = None
+        self._pid = None  # Process that started the journal and the thread
+        self._pending = 0
+        self._closed = False
+        self._stats = {"added": 0, "written": 0, "recovered": 0, "flushes": 0, "failed_flushes": 0, "rejected": 0}
+
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_locks)
+
+    def start(self):
+        """Replays leftover journals and starts the flush thread now instead of on the first entry."""
+        with self._condition:
+            self._own_journal()
+
+    def add(self, entry):
+        """Journals the entry and queues it for writing. Raises HistoryBacklogFull when the backlog is full."""
+        line = json_util.dumps(entry) + "\n"
+        with self._condition:
+            self._own_journal()
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HistoryBacklogFull(f"{self._pending} history entries are waiting to be written")
+            self._active.file.write(line)
+            self._active.file.flush()
+            if self.fsync:
+                os.fsync(self._active.file.fileno())
+            self._active.entries.append(entry)
+            self._pending += 1
+            self._stats["added"] += 1
+            if len(self._active.entries) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self):
+        """Writes everything buffered so far. Returns False if MongoDB rejected a batch."""
+        with self._condition:
+            self._own_journal()
+            self._seal()
+        return self._write_sealed()
+
+    def stats(self):
+        with self._condition:
+            started = self._pid == os.getpid()
+            return dict(self._stats, pending=self._pending if started else 0,
+                        journals=len(self._segments) + 1 if started else 0)
+
+    def close(self):
+        with self._condition:
+            if self._closed or self._pid != os.getpid():
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=10)
+        # Whatever is still unwritten stays in the journal for the next start
+        with self._condition:
+            if not self._active.entries:
+                self._active.close(remove=True)
+
+    # --- Internal helpers ---
+
+    def _own_journal(self):
+        # Called with self._condition held: starts the journal and the thread, unless this process already did
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            # Inherited through a fork: the parent writes its own entries and keeps its journal locked
+            for segment in self._segments + [self._active]:
+                segment.file.close()
+            self._segments = []
+            self._pending = 0
+        self._pid = os.getpid()
+        self._closed = False
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._recover()
+        self._active = self._new_segment()
+        self._thread = threading.Thread(target=self._run, name="history-sink", daemon=True)
+        self._thread.start()
+
+    def _reset_locks(self):
+        # Runs in a forked child, where the parent's flush thread may have been holding them
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+
+    def _new_segment(self):
+        path = os.path.join(self.journal_dir, f"{os.getpid()}-{time.time_ns()}-{next(self._sequence)}.journal")
+        # Locked under a name recovery does not look at, so no other process replays it as abandoned
+        segment = _Segment(path + ".new")
+        segment.lock()
+        os.rename(segment.path, path)
+        segment.path = path
+        return segment
+
+    def _recover(self):
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.journal"))):
+            segment = _Segment(path)
+            if not segment.lock():
+                segment.close()  # Journal of a live process
+                continue
+            segment.file.seek(0)
+            for line in segment.file:
+                try:
+                    segment.entries.append(json_util.loads(line))
+                except ValueError:
+                    pass  # A line cut off by the crash
+            if segment.entries:
+                self._segments.append(segment)
+                self._pending += len(segment.entries)
+                self._stats["recovered"] += len(segment.entries)
+            else:
+                segment.close(remove=True)
+        if self._stats["recovered"]:
+            print(f"🗂️ Replaying {self._stats['recovered']} history entries from the journal")
+
+    def _seal(self):
+        # Called with self._condition held: the active journal becomes a batch to write
+        if self._active.entries:
+            if self.fsync:
+                os.fsync(self._active.file.fileno())
+            self._segments.append(self._active)
+            self._active = self._new_segment()
+
+    def _write_sealed(self):
+        with self._write_lock:
+            return self._write_sealed_locked()
+
+    def _write_sealed_locked(self):
+        # Called with self._write_lock held, so the oldest segment stays put until it is written
+        while True:
+            with self._condition:
+                if not self._segments:
+                    return True
+                segment = self._segments[0]
+            # Imported here so that pymongo is only loaded once there is something to write
+            from pymongo.errors import BulkWriteError
+            try:
+                self.collection.insert_many(segment.entries, ordered=False)
+            except BulkWriteError as e:
+                # Entries written before a crash come back from the journal; their _id already exists
+                if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])) \
+                        or e.details.get("writeConcernErrors"):
+                    return self._flush_failed(e)
+            except Exception as e:
+                return self._flush_failed(e)
+
+            with self._condition:
+                self._segments.pop(0)
+                self._pending -= len(segment.entries)
+                self._stats["written"] += len(segment.entries)
+                self._stats["flushes"] += 1
+            segment.close(remove=True)
+
+    def _flush_failed(self, error):
+        print(f"⚠️ Could not write history entries, will retry: {error}")
+        with self._condition:
+            self._stats["failed_flushes"] += 1
+        return False
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            with self._condition:
+                if not self._closed and len(self._active.entries) < self.batch_size:
+                    self._condition.wait(timeout=backoff)
+                closed = self._closed
+                self._seal()
+            if self._write_sealed():
+                backoff = self.flush_interval
+            else:
+                backoff = min(backoff * 2, 60.0)
+            if closed:
+                return
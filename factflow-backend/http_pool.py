@@ -0,0 +1,41 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def create_pooled_session(headers=None, pool_connections=10, pool_maxsize=32):
+    """
+    Builds a requests.Session that keeps TCP/TLS connections alive between calls.
+    `pool_connections` is the number of hosts to keep pools for and `pool_maxsize`
+    the number of connections kept per host. Retries are left to the caller.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def pool_stats(session):
+    """Reports connection pool usage per upstream host."""
+    stats = {}
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # Free slots sit in the pool queue, everything else is checked out
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+                "in_use": (pool.pool.maxsize - idle) if pool.pool is not None else 0,
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests
+            }
+    return stats
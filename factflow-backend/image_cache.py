@@ -0,0 +1,178 @@
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+
+
+def image_hash(data, hash_size=32, margin=8):
+    """
+    Gradient hash of the encoded image bytes, a variant of dHash: the image
+    is shrunk to (hash_size + 1) x hash_size gray pixels and every pair of
+    horizontal neighbours contributes two bits, "brighter by more than
+    `margin`" and "darker by more than `margin`". Flat areas, which make up
+    most of a screenshot, then hash to stable zeros instead of JPEG noise.
+    Returns an int of 2 * hash_size^2 bits.
+    Raises Image.UnidentifiedImageError for unreadable images.
+    """
+    img = Image.open(io.BytesIO(data))
+    # JPEGs only need to be decoded at a fraction of their size for a tiny thumbnail
+    ratio = min(hash_size * 4 / min(img.size), 1.0)
+    img.draft("L", (int(img.width * ratio), int(img.height * ratio)))
+    pixels = img.convert("L").resize((hash_size + 1, hash_size), Image.BOX).tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            gradient = pixels[offset + col] - pixels[offset + col + 1]
+            value = (value << 2) | ((gradient > margin) << 1) | (gradient < -margin)
+    return value
+
+
+# `perceptual` finds look-alike images, `pixels` (a digest of the decoded pixels) tells identical ones apart
+ImageFingerprint = namedtuple("ImageFingerprint", ["perceptual", "pixels"])
+
+
+def image_fingerprint(data, hash_size=32):
+    """
+    The perceptual hash and a digest of the decoded pixels of the encoded image
+    bytes. The digest ignores the file format and metadata, but not a single pixel.
+    Raises Image.UnidentifiedImageError for unreadable images.
+    """
+    img = Image.open(io.BytesIO(data))
+    digest = hashlib.blake2b(f"{img.size}".encode(), digest_size=16)
+    digest.update(img.convert("RGB").tobytes())
+    return ImageFingerprint(image_hash(data, hash_size), digest.hexdigest())
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over hashes, for finding every hash within a distance of a query."""
+
+    def __init__(self, distance=hamming_distance):
+        self.distance = distance
+        self.root = None  # (item, {distance: child node})
+        self.size = 0
+
+    def add(self, item):
+        if self.root is None:
+            self.root = (item, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = self.distance(item, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (item, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, item, max_distance):
+        """Returns (distance, item) pairs within max_distance of item, closest first."""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_item, children = stack.pop()
+            distance = self.distance(item, node_item)
+            if distance <= max_distance:
+                results.append((distance, node_item))
+            # Triangle inequality: only these subtrees can hold matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results)
+
+
+class ImageCache:
+    """
+    Cache of OCR text and verdicts for uploaded images, keyed by ImageFingerprint.
+
+    By default (`max_distance` 0) only an image with the same decoded pixels
+    is a hit: screenshots with the same layout can have the same perceptual
+    hash while saying opposite things. With `max_distance` above 0, lookups
+    fall back to the closest cached image within that many differing
+    perceptual hash bits, found through a BK-tree, so re-encoded or resized
+    copies are hits too, at the risk of matching a similar-looking image.
+    Entries expire after `ttl_seconds` and the least recently used ones are
+    evicted beyond `max_entries`; the tree is rebuilt once it holds more
+    evicted hashes than live ones.
+    """
+
+    def __init__(self, max_distance=0, max_entries=5000, ttl_seconds=3600, hash_size=32):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hash_size = hash_size
+        self._entries = OrderedDict()  # fingerprint -> (stored_at, text, (response_dict, status_code))
+        self._by_perceptual = {}  # perceptual hash -> latest fingerprint with it, for near matches
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "evictions": 0}
+
+    def hash_image(self, data):
+        """The ImageFingerprint of the encoded image bytes."""
+        return image_fingerprint(data, self.hash_size)
+
+    def get(self, fingerprint):
+        """Returns (text, (response_dict, status_code)) for an identical, or near-identical, cached image, or None."""
+        with self._lock:
+            candidates = [(fingerprint, "exact_hits")]
+            if self.max_distance > 0:
+                candidates += [(self._by_perceptual.get(cached_hash), "near_hits")
+                               for _, cached_hash in self._tree.search(fingerprint.perceptual, self.max_distance)]
+
+            for cached, kind in candidates:
+                entry = self._entries.get(cached)
+                if entry is None:
+                    continue
+                stored_at, text, result = entry
+                if time.time() - stored_at > self.ttl_seconds:
+                    del self._entries[cached]
+                    continue
+                self._entries.move_to_end(cached)
+                self._stats[kind] += 1
+                return text, result
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, fingerprint, text, result):
+        with self._lock:
+            if self.max_distance > 0:
+                self._tree.add(fingerprint.perceptual)
+                self._by_perceptual[fingerprint.perceptual] = fingerprint
+            self._entries[fingerprint] = (time.time(), text, result)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            if self._tree.size > 2 * len(self._entries):
+                self._rebuild_tree()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), tree_nodes=self._tree.size,
+                         max_distance=self.max_distance)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["exact_hits"] + stats["near_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # --- Internal helpers ---
+
+    def _rebuild_tree(self):
+        # Called with self._lock held; BK-trees have no cheap delete
+        self._tree = BKTree()
+        self._by_perceptual = {}
+        for fingerprint in self._entries:
+            self._tree.add(fingerprint.perceptual)
+            self._by_perceptual[fingerprint.perceptual] = fingerprint
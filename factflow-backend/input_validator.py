@@ -0,0 +1,261 @@
+import itertools
+import re
+
+# pyahocorasick is optional, the trie regex below is used without it
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# --- Rule Tables ---
+# English rules apply to every language, since users often mix English into
+# other languages; a language's own entries are added on top of them. A
+# language's own entries only match whole words ("mejor" does not match
+# "mejoramiento"), so they leave out words that also start statements, such as
+# conjunctions and relative pronouns ("que", "como", "quando").
+
+QUESTION_MARKS = ("?", "？", "؟")
+
+QUESTION_STARTERS = {
+    'en': (
+        "what", "why", "how", "when", "where", "who", "whom",
+        "is ", "are ", "was ", "were ", "do ", "does ", "did ", "can ", "could ",
+        "should ", "would ", "will ", "shall ", "have ", "has ", "had ",
+        "am i", "are we", "do they", "did he", "does she", "will it", "could they",
+        "can i", "can we", "should i", "should we", "must i", "would they"
+    ),
+    'es': ("¿", "qué", "por qué", "cómo", "cuándo", "dónde", "quién", "cuál", "cuánto"),
+    'fr': ("est-ce", "pourquoi", "comment", "où", "quel", "quelle", "combien"),
+    'de': ("warum", "wann", "wo", "wer", "welche", "wieso", "weshalb", "ist", "sind"),
+    'it': ("che cosa", "cosa", "perché", "dove", "chi", "quale", "quanto"),
+    'pt': ("o que", "por que", "onde", "quem", "qual", "quanto"),
+    'hi': ("क्या", "क्यों", "कैसे", "कब ", "कहाँ", "कौन", "किस"),
+    'kn': ("ಏನು", "ಏಕೆ", "ಹೇಗೆ", "ಯಾವಾಗ", "ಎಲ್ಲಿ", "ಯಾರು", "ಯಾವ"),
+}
+
+SUBJECTIVE_KEYWORDS = {
+    'en': (
+        "best", "worst", "amazing", "awesome", "terrible", "beautiful", "ugly", "superior", "inferior",
+        "i think", "i believe", "in my opinion", "greatest", "favorite", "strongest", "nicest",
+        "most beautiful", "most amazing", "most delicious", "should be", "needs to be",
+        "fool", "idiot", "stupid", "dumb", "smart", "genius", "moron", "incompetent",
+        "great", "terrible", "horrible", "wonderful", "perfect", "awful"
+    ),
+    'es': ("mejor", "peor", "increíble", "horrible", "hermoso", "feo", "creo que", "en mi opinión",
+           "idiota", "estúpido", "tonto", "perfecto", "maravilloso"),
+    'fr': ("meilleur", "pire", "incroyable", "horrible", "magnifique", "moche", "je pense", "je crois",
+           "à mon avis", "idiot", "stupide", "parfait", "merveilleux"),
+    'de': ("beste", "schlechteste", "unglaublich", "schrecklich", "wunderschön", "hässlich", "ich denke",
+           "ich glaube", "meiner meinung", "idiot", "dumm", "perfekt", "wunderbar"),
+    'it': ("migliore", "peggiore", "incredibile", "terribile", "bellissimo", "brutto", "penso che",
+           "credo che", "secondo me", "idiota", "stupido", "perfetto", "meraviglioso"),
+    'pt': ("melhor", "pior", "incrível", "terrível", "lindo", "feio", "eu acho", "eu acredito",
+           "na minha opinião", "idiota", "estúpido", "perfeito", "maravilhoso"),
+    'hi': ("सबसे अच्छा", "सबसे बुरा", "बेहतरीन", "भयानक", "सुंदर", "मुझे लगता", "मेरी राय", "मूर्ख", "बेवकूफ"),
+    'kn': ("ಅತ್ಯುತ್ತಮ", "ಕೆಟ್ಟ", "ಅದ್ಭುತ", "ಸುಂದರ", "ನನ್ನ ಅಭಿಪ್ರಾಯ", "ನಾನು ಭಾವಿಸುತ್ತೇನೆ", "ಮೂರ್ಖ"),
+}
+
+STOP_WORDS = {
+    'en': {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"},
+    'es': {"el", "la", "los", "las", "un", "una", "y", "o", "pero", "en", "a", "de", "con", "por", "para"},
+    'fr': {"le", "la", "les", "un", "une", "et", "ou", "mais", "dans", "à", "de", "du", "des", "avec", "par", "pour"},
+    'de': {"der", "die", "das", "ein", "eine", "und", "oder", "aber", "in", "an", "zu", "für", "von", "mit"},
+    'it': {"il", "lo", "la", "i", "gli", "le", "un", "una", "e", "o", "ma", "in", "a", "di", "con", "per"},
+    'pt': {"o", "a", "os", "as", "um", "uma", "e", "ou", "mas", "em", "de", "com", "por", "para"},
+    'hi': {"और", "या", "का", "की", "के", "में", "से", "को", "पर", "है"},
+    'kn': {"ಮತ್ತು", "ಅಥವಾ", "ಆದರೆ"},
+}
+
+VALIDATION_MESSAGES = {
+    'en': {
+        'too_short': "🛑 Input is too short. Please provide a complete statement or headline (at least 3 words).",
+        'question': "🛑 Input appears to be a question. Please provide a factual statement or headline.",
+        'subjective': "📋 Input appears subjective or contains personal opinions/attacks. Please provide a factual or neutral statement.",
+        'meaningless': "🛑 Input lacks meaningful content. Please provide a complete statement or headline."
+    },
+    'es': {
+        'too_short': "🛑 El texto es demasiado corto. Proporcione una afirmación o un titular completo (al menos 3 palabras).",
+        'question': "🛑 El texto parece una pregunta. Proporcione una afirmación o un titular basado en hechos.",
+        'subjective': "📋 El texto parece subjetivo o contiene opiniones/ataques personales. Proporcione una afirmación factual o neutral.",
+        'meaningless': "🛑 El texto no tiene contenido significativo. Proporcione una afirmación o un titular completo."
+    },
+    'fr': {
+        'too_short': "🛑 Le texte est trop court. Veuillez fournir une affirmation ou un titre complet (au moins 3 mots).",
+        'question': "🛑 Le texte ressemble à une question. Veuillez fournir une affirmation ou un titre factuel.",
+        'subjective': "📋 Le texte semble subjectif ou contient des opinions/attaques personnelles. Veuillez fournir une affirmation factuelle ou neutre.",
+        'meaningless': "🛑 Le texte manque de contenu significatif. Veuillez fournir une affirmation ou un titre complet."
+    },
+    'de': {
+        'too_short': "🛑 Die Eingabe ist zu kurz. Bitte geben Sie eine vollständige Aussage oder Schlagzeile ein (mindestens 3 Wörter).",
+        'question': "🛑 Die Eingabe scheint eine Frage zu sein. Bitte geben Sie eine sachliche Aussage oder Schlagzeile ein.",
+        'subjective': "📋 Die Eingabe wirkt subjektiv oder enthält persönliche Meinungen/Angriffe. Bitte geben Sie eine sachliche oder neutrale Aussage ein.",
+        'meaningless': "🛑 Die Eingabe hat keinen aussagekräftigen Inhalt. Bitte geben Sie eine vollständige Aussage oder Schlagzeile ein."
+    },
+    'it': {
+        'too_short': "🛑 Il testo è troppo breve. Fornisci un'affermazione o un titolo completo (almeno 3 parole).",
+        'question': "🛑 Il testo sembra una domanda. Fornisci un'affermazione o un titolo basato sui fatti.",
+        'subjective': "📋 Il testo sembra soggettivo o contiene opinioni/attacchi personali. Fornisci un'affermazione fattuale o neutrale.",
+        'meaningless': "🛑 Il testo non ha un contenuto significativo. Fornisci un'affermazione o un titolo completo."
+    },
+    'pt': {
+        'too_short': "🛑 O texto é muito curto. Forneça uma afirmação ou manchete completa (pelo menos 3 palavras).",
+        'question': "🛑 O texto parece ser uma pergunta. Forneça uma afirmação ou manchete factual.",
+        'subjective': "📋 O texto parece subjetivo ou contém opiniões/ataques pessoais. Forneça uma afirmação factual ou neutra.",
+        'meaningless': "🛑 O texto não tem conteúdo significativo. Forneça uma afirmação ou manchete completa."
+    },
+    'hi': {
+        'too_short': "🛑 इनपुट बहुत छोटा है। कृपया पूरा कथन या शीर्षक दें (कम से कम 3 शब्द)।",
+        'question': "🛑 इनपुट एक प्रश्न जैसा लगता है। कृपया तथ्यात्मक कथन या शीर्षक दें।",
+        'subjective': "📋 इनपुट व्यक्तिपरक लगता है या इसमें व्यक्तिगत राय/हमले हैं। कृपया तथ्यात्मक या तटस्थ कथन दें।",
+        'meaningless': "🛑 इनपुट में सार्थक सामग्री नहीं है। कृपया पूरा कथन या शीर्षक दें।"
+    },
+    'kn': {
+        'too_short': "🛑 ಇನ್‌ಪುಟ್ ತುಂಬಾ ಚಿಕ್ಕದಾಗಿದೆ. ದಯವಿಟ್ಟು ಪೂರ್ಣ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ (ಕನಿಷ್ಠ 3 ಪದಗಳು).",
+        'question': "🛑 ಇನ್‌ಪುಟ್ ಪ್ರಶ್ನೆಯಂತೆ ಕಾಣುತ್ತದೆ. ದಯವಿಟ್ಟು ವಾಸ್ತವಿಕ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ.",
+        'subjective': "📋 ಇನ್‌ಪುಟ್ ವಸ್ತುನಿಷ್ಠವಾಗಿ ಕಾಣುತ್ತದೆ ಅಥವಾ ವೈಯಕ್ತಿಕ ಅಭಿಪ್ರಾಯಗಳು/ದಾಳಿಗಳನ್ನು ಒಳಗೊಂಡಿರುತ್ತದೆ. ದಯವಿಟ್ಟು ವಾಸ್ತವಿಕ ಅಥವಾ ತಟಸ್ಥ ಹೇಳಿಕೆಯನ್ನು ಒದಗಿಸಿ.",
+        'meaningless': "🛑 ಇನ್‌ಪುಟ್‌ನಲ್ಲಿ ಅರ್ಥಪೂರ್ಣ ವಿಷಯವಿಲ್ಲ. ದಯವಿಟ್ಟು ಪೂರ್ಣ ಹೇಳಿಕೆ ಅಥವಾ ಶೀರ್ಷಿಕೆಯನ್ನು ಒದಗಿಸಿ."
+    }
+}
+
+
+def _trie_pattern(phrases):
+    """
+    Builds a regex from a prefix trie of the phrases, e.g. "best|bad" -> "b(?:ad|est)",
+    so the engine tests one character per position instead of every phrase.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        ends_here = "" in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A phrase ending here makes the rest optional; any match is enough for us
+        return f"(?:{body})?" if ends_here else body
+
+    return emit(trie)
+
+
+def _word_pattern(phrases):
+    """Builds a regex matching any of the phrases as whole words, longest first."""
+    parts = []
+    for phrase in sorted({phrase.strip() for phrase in phrases}, key=len, reverse=True):
+        part = re.escape(phrase)
+        # Phrases that start or end with punctuation, such as "¿", are bounded by it
+        if phrase[:1].isalnum():
+            part = r"(?<!\w)" + part
+        if phrase[-1:].isalnum():
+            part += r"(?!\w)"
+        parts.append(part)
+    return "|".join(parts)
+
+
+class _KeywordMatcher:
+    """Finds whether any keyword occurs in a text, with an Aho-Corasick automaton when available."""
+
+    def __init__(self, keywords):
+        keywords = sorted(set(keywords))
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+            self._regex = None
+        else:
+            self._automaton = None
+            self._regex = re.compile(_trie_pattern(keywords))
+
+    def search(self, text):
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+        return self._regex.search(text) is not None
+
+
+class _CompiledRules:
+    def __init__(self, question_starters, subjective_keywords, stop_words, messages,
+                 own_question_starters=(), own_subjective_keywords=()):
+        self.question_re = re.compile(_trie_pattern(question_starters))
+        self.subjective = _KeywordMatcher(subjective_keywords)
+        self.own_question_re = re.compile(_word_pattern(own_question_starters)) if own_question_starters else None
+        self.own_subjective_re = re.compile(_word_pattern(own_subjective_keywords)) if own_subjective_keywords else None
+        self.stop_words = frozenset(stop_words)
+        self.messages = messages
+
+    def is_question(self, text):
+        return self.question_re.match(text) is not None \
+            or (self.own_question_re is not None and self.own_question_re.match(text) is not None)
+
+    def is_subjective(self, text):
+        return self.subjective.search(text) \
+            or (self.own_subjective_re is not None and self.own_subjective_re.search(text) is not None)
+
+
+_WORD_RE = re.compile(r"\S+")
+
+
+class InputValidator:
+    """
+    Rejects inputs that cannot be fact-checked: too short, questions, subjective
+    statements and inputs without meaningful words.
+
+    The keyword tables are compiled once per language: the English question
+    starters into a trie-shaped regex anchored at the start, the English
+    subjective keywords into an Aho-Corasick automaton (pyahocorasick) or a
+    trie-shaped regex, and a language's own entries into a whole-word regex.
+    The text is tokenized lazily in one pass, and only as far as the checks need.
+    """
+
+    def __init__(self, min_words=3, min_meaningful_words=2, default_lang='en'):
+        self.min_words = min_words
+        self.min_meaningful_words = min_meaningful_words
+        self.default_lang = default_lang
+        self._rules = {}
+        for lang in set(QUESTION_STARTERS) | set(SUBJECTIVE_KEYWORDS) | set(VALIDATION_MESSAGES):
+            own = lang != default_lang
+            self._rules[lang] = _CompiledRules(
+                QUESTION_STARTERS[default_lang],
+                SUBJECTIVE_KEYWORDS[default_lang],
+                STOP_WORDS[default_lang] | (STOP_WORDS.get(lang, set()) if own else set()),
+                VALIDATION_MESSAGES.get(lang, VALIDATION_MESSAGES[default_lang]),
+                own_question_starters=QUESTION_STARTERS.get(lang, ()) if own else (),
+                own_subjective_keywords=SUBJECTIVE_KEYWORDS.get(lang, ()) if own else ()
+            )
+
+    def languages(self):
+        return sorted(self._rules)
+
+    def validate(self, text, lang='en'):
+        """
+        Returns None for a valid input, or the rejection reason:
+        'too_short', 'question', 'subjective' or 'meaningless'.
+        """
+        rules = self._rules.get(lang, self._rules[self.default_lang])
+        lower_input = text.lower().strip()
+        words = _WORD_RE.finditer(lower_input)
+        first_words = [match.group() for match in itertools.islice(words, self.min_words)]
+
+        if len(first_words) < self.min_words:
+            return 'too_short'
+        if lower_input.endswith(QUESTION_MARKS) or rules.is_question(lower_input):
+            return 'question'
+        if rules.is_subjective(lower_input):
+            return 'subjective'
+
+        # Stop reading as soon as enough meaningful words were seen
+        meaningful = 0
+        for word in itertools.chain(first_words, (match.group() for match in words)):
+            if word not in rules.stop_words:
+                meaningful += 1
+                if meaningful >= self.min_meaningful_words:
+                    return None
+        return 'meaningless'
+
+    def message(self, reason, lang='en'):
+        """Returns the user-facing message for a rejection reason in the given language."""
+        return self._rules.get(lang, self._rules[self.default_lang]).messages[reason]
@@ -0,0 +1,69 @@
+import threading
+import time
+import uuid
+
+
+class JobStore:
+    """
+    Runs background jobs on an executor and keeps their results for
+    `ttl_seconds` after they finish, so clients can poll for them by ID.
+    """
+
+    def __init__(self, executor, ttl_seconds=600):
+        self.executor = executor
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "done": 0, "failed": 0, "expired": 0}
+
+    def submit(self, fn, *args):
+        """Queues fn(*args) and returns the job ID."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job_id] = {"job_id": job_id, "status": "queued", "created_at": time.time()}
+            self._stats["submitted"] += 1
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def get(self, job_id):
+        """Returns a copy of the job ({job_id, status, result or error}), or None if unknown or expired."""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+            stats["stored"] = len(self._jobs)
+        return stats
+
+    # --- Internal helpers ---
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status="running")
+        try:
+            result = fn(*args)
+        except Exception as e:
+            print(f"⚠️ Job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            with self._lock:
+                self._stats["failed"] += 1
+            return
+        self._update(job_id, status="done", result=result, finished_at=time.time())
+        with self._lock:
+            self._stats["done"] += 1
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.get("finished_at", cutoff + 1) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self._stats["expired"] += len(expired)
@@ -0,0 +1,115 @@
+import threading
+import time
+
+
+class ModelWarmer:
+    """
+    Keeps hosted models warm and ranks them by how they currently behave.
+
+    Every `interval` seconds a background thread calls `probe(model)` for the
+    models that served no request during the last interval. `probe` returns
+    "ok", "loading" (the model is cold and spinning up), "error", or None
+    when it could not tell; the latency is kept as an exponential moving average. Real requests
+    report through `observe`, so busy models are never probed.
+
+    `order()` lists warm models first, then cold ones and then failing ones.
+    Within a group, a model moves ahead of one configured before it only
+    when it is at least `reorder_margin` times faster.
+    """
+
+    def __init__(self, models, probe, interval=240.0, reorder_margin=1.25, latency_alpha=0.3):
+        self.models = list(models)
+        self.probe = probe
+        self.interval = interval
+        self.reorder_margin = reorder_margin
+        self.latency_alpha = latency_alpha
+        self._state = {model: {"state": "unknown", "latency_ms": None, "last_seen": None, "probes": 0,
+                               "cold_starts": 0} for model in self.models}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the probe thread; the first round runs right away."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="keep-warm", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def observe(self, model, outcome, seconds):
+        """Records one probe or request outcome ("ok", "loading" or "error") and its latency."""
+        with self._lock:
+            state = self._state.get(model)
+            if state is None:
+                return
+            state["last_seen"] = time.monotonic()
+            if outcome == "loading" and state["state"] != "cold":
+                state["cold_starts"] += 1
+            state["state"] = {"ok": "warm", "loading": "cold"}.get(outcome, "failing")
+            if outcome == "ok":
+                latency_ms = seconds * 1000
+                previous = state["latency_ms"]
+                state["latency_ms"] = latency_ms if previous is None else \
+                    previous + self.latency_alpha * (latency_ms - previous)
+
+    def probe_all(self):
+        """Probes every model not seen within the last interval. Returns the models probed."""
+        now = time.monotonic()
+        with self._lock:
+            due = [model for model, state in self._state.items()
+                   if state["last_seen"] is None or now - state["last_seen"] >= self.interval]
+        for model in due:
+            started_at = time.monotonic()
+            try:
+                outcome = self.probe(model)
+            except Exception as e:
+                print(f"⚠️ Keep-warm probe of {model} failed: {e}")
+                outcome = "error"
+            if outcome is not None:
+                self.observe(model, outcome, time.monotonic() - started_at)
+            with self._lock:
+                self._state[model]["probes"] += 1
+        return due
+
+    def order(self):
+        """The models in the order they should be tried."""
+        with self._lock:
+            snapshot = {model: dict(state) for model, state in self._state.items()}
+        group = {"warm": 0, "unknown": 1, "cold": 1, "failing": 2}
+        ranked = sorted(self.models, key=lambda model: group[snapshot[model]["state"]])
+        # One bubble pass per model: a clearly faster model overtakes a configured one
+        for _ in range(len(ranked)):
+            for i in range(len(ranked) - 1):
+                ahead, behind = snapshot[ranked[i]], snapshot[ranked[i + 1]]
+                if group[ahead["state"]] == group[behind["state"]] \
+                        and ahead["latency_ms"] is not None and behind["latency_ms"] is not None \
+                        and behind["latency_ms"] * self.reorder_margin < ahead["latency_ms"]:
+                    ranked[i], ranked[i + 1] = ranked[i + 1], ranked[i]
+        return ranked
+
+    def stats(self):
+        now = time.monotonic()
+        models = {}
+        with self._lock:
+            for model, state in self._state.items():
+                last_seen = state["last_seen"]
+                models[model] = {
+                    "state": state["state"],
+                    "latency_ms": round(state["latency_ms"], 1) if state["latency_ms"] is not None else None,
+                    "seconds_since_seen": round(now - last_seen, 1) if last_seen is not None else None,
+                    "probes": state["probes"],
+                    "cold_starts": state["cold_starts"]
+                }
+        return {"running": self._thread is not None and not self._stop.is_set(), "interval": self.interval,
+                "order": self.order(), "models": models}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe_all()
+            except Exception as e:
+                print(f"⚠️ Keep-warm round failed: {e}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+
+# langid is optional, it is faster than langdetect but not installed by default
+try:
+    from langid.langid import LanguageIdentifier, model as langid_model
+except ImportError:
+    LanguageIdentifier = None
+
+# Detector codes that we fold into one supported code
+LANGUAGE_ALIASES = {'zh-cn': 'zh', 'zh-tw': 'zh'}
+
+
+class LanguageDetector:
+    """
+    Language identification restricted to a fixed set of languages.
+
+    The langdetect backend loads only the profiles of `languages` at
+    construction, so detection scores 15 languages instead of 55, and uses a
+    fixed seed so the same text always gets the same answer. The "langid"
+    backend uses langid.py's n-gram model, which is faster still. Results for
+    texts up to `memo_max_chars` characters are memoized in an LRU.
+    """
+
+    def __init__(self, languages, backend="langdetect", seed=0, max_text_chars=2000,
+                 memo_max_chars=512, max_entries=10000):
+        self.languages = set(languages)
+        self.memo_max_chars = memo_max_chars
+        self.max_entries = max_entries
+        self.max_text_chars = max_text_chars
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"detections": 0, "memo_hits": 0, "failures": 0, "detect_seconds": 0.0}
+
+        if backend == "langid" and LanguageIdentifier is None:
+            print("⚠️ LANGUAGE_DETECTOR=langid but the 'langid' package is not installed, using langdetect.")
+            backend = "langdetect"
+        self.backend = backend
+
+        if backend == "langid":
+            self._identifier = LanguageIdentifier.from_modelstring(langid_model, norm_probs=False)
+            self._identifier.set_languages([lang for lang in self.languages if lang in self._identifier.nb_classes])
+        else:
+            self._factory = self._load_factory(seed)
+
+    def detect(self, text):
+        """
+        Returns (language, seconds): the detected language, or None when no
+        supported language could be identified, and the time detection took.
+        """
+        started_at = time.perf_counter()
+        memoize = len(text) <= self.memo_max_chars
+        if memoize:
+            with self._lock:
+                if text in self._memo:
+                    self._memo.move_to_end(text)
+                    self._stats["memo_hits"] += 1
+                    return self._memo[text], time.perf_counter() - started_at
+
+        language = self._identify(text)
+        elapsed = time.perf_counter() - started_at
+
+        with self._lock:
+            self._stats["detections"] += 1
+            self._stats["detect_seconds"] += elapsed
+            if language is None:
+                self._stats["failures"] += 1
+            if memoize:
+                self._memo[text] = language
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return language, elapsed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, memo_size=len(self._memo), backend=self.backend)
+        detections = stats.pop("detect_seconds")
+        stats["avg_detect_ms"] = round(detections / stats["detections"] * 1000, 3) if stats["detections"] else 0.0
+        return stats
+
+    # --- Internal helpers ---
+
+    def _load_factory(self, seed):
+        # Profiles are read once here instead of lazily on the first request
+        profiles = []
+        for filename in sorted(os.listdir(PROFILES_DIRECTORY)):
+            if LANGUAGE_ALIASES.get(filename, filename) in self.languages:
+                with open(os.path.join(PROFILES_DIRECTORY, filename), encoding="utf-8") as f:
+                    profiles.append(f.read())
+        factory = DetectorFactory()
+        factory.load_json_profile(profiles)
+        factory.seed = seed
+        return factory
+
+    def _identify(self, text):
+        if self.backend == "langid":
+            language, _ = self._identifier.classify(text[:self.max_text_chars])
+        else:
+            try:
+                detector = self._factory.create()
+                detector.set_max_text_length(self.max_text_chars)
+                detector.append(text)
+                language = detector.detect()
+            except LangDetectException:
+                return None
+        language = LANGUAGE_ALIASES.get(language, language)
+        return language if language in self.languages else None
@@ -0,0 +1,157 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Local inference is optional, the hosted API keeps working without these packages
+try:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+except ImportError:
+    torch = None
+
+try:
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+except ImportError:
+    ORTModelForSequenceClassification = None
+
+
+def is_nli_model(model_name):
+    """NLI models are parsed from zero-shot style output, see parse_prediction in app.py."""
+    return model_name.endswith("mnli") or "fever" in model_name.lower()
+
+
+class _LoadedModel:
+    def __init__(self, name, tokenizer, model):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.id2label = model.config.id2label
+        self.requests = queue.Queue()
+
+
+class LocalInferenceEngine:
+    """
+    Runs sequence classification models on the local CPU.
+
+    Each model gets a batcher thread that collects requests for up to
+    `max_wait_ms` or `max_batch_size` texts and hands the batch to a shared
+    worker pool for one forward pass. Results use the same shape as the
+    Hugging Face inference API so the existing response parsing applies.
+    """
+
+    def __init__(self, model_names, model_dir=None, max_batch_size=16, max_wait_ms=10,
+                 num_workers=2, quantize=False, use_onnx=False, max_length=512):
+        if torch is None:
+            raise RuntimeError("Local inference needs the 'torch' and 'transformers' packages.")
+        if use_onnx and ORTModelForSequenceClassification is None:
+            raise RuntimeError("ONNX inference needs the 'optimum[onnxruntime]' package.")
+        self.model_dir = model_dir
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.quantize = quantize
+        self.use_onnx = use_onnx
+        self.max_length = max_length
+        self._workers = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="local-inference")
+        self._models = {}
+        self._stats = {"batches": 0, "texts": 0, "inference_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+        # Split the CPU between the workers instead of letting every pass grab all cores
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // num_workers))
+
+        for name in model_names:
+            try:
+                self._models[name] = self._load(name)
+                threading.Thread(target=self._batch_loop, args=(self._models[name],), daemon=True,
+                                 name=f"batcher-{name}").start()
+                print(f"✅ Loaded local model: {name}")
+            except Exception as e:
+                print(f"⚠️ Could not load local model {name}: {e}")
+
+    def supports(self, model_name):
+        return model_name in self._models
+
+    def predict(self, model_name, text, timeout=None):
+        """Classifies one text and returns the raw output in the hosted API format."""
+        return self.predict_many(model_name, [text], timeout=timeout)[0]
+
+    def predict_many(self, model_name, texts, timeout=None):
+        """Classifies several texts; they are merged with concurrent requests into batches."""
+        futures = [self.submit(model_name, text) for text in texts]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def submit(self, model_name, text):
+        """Queues one text and returns a concurrent.futures.Future for its raw output."""
+        future = Future()
+        self._models[model_name].requests.put((text, future))
+        return future
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["models"] = {name: {"queued": loaded.requests.qsize()} for name, loaded in self._models.items()}
+        stats["avg_batch_size"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0
+        stats["backend"] = "onnx" if self.use_onnx else ("torch-int8" if self.quantize else "torch")
+        return stats
+
+    # --- Internal helpers ---
+
+    def _load(self, name):
+        # local_files_only keeps startup working on hosts without network access
+        kwargs = {"cache_dir": self.model_dir, "local_files_only": True}
+        tokenizer = AutoTokenizer.from_pretrained(name, **kwargs)
+        if self.use_onnx:
+            model = ORTModelForSequenceClassification.from_pretrained(name, export=False, **kwargs)
+        else:
+            model = AutoModelForSequenceClassification.from_pretrained(name, **kwargs)
+            model.eval()
+            if self.quantize:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return _LoadedModel(name, tokenizer, model)
+
+    def _batch_loop(self, loaded):
+        while True:
+            batch = [loaded.requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(loaded.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._workers.submit(self._run_batch, loaded, batch)
+
+    def _run_batch(self, loaded, batch):
+        texts = [text for text, _ in batch]
+        started_at = time.monotonic()
+        try:
+            inputs = loaded.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                      return_tensors="pt")
+            with torch.inference_mode():
+                logits = loaded.model(**inputs).logits
+            probabilities = torch.softmax(logits, dim=-1).tolist()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(batch)
+            self._stats["inference_seconds"] += time.monotonic() - started_at
+
+        for (_, future), scores in zip(batch, probabilities):
+            future.set_result(self._format_output(loaded, scores))
+
+    def _format_output(self, loaded, scores):
+        ranked = sorted(
+            ((loaded.id2label[i], score) for i, score in enumerate(scores)),
+            key=lambda item: item[1], reverse=True
+        )
+        if is_nli_model(loaded.name):
+            return [{"labels": [label for label, _ in ranked], "scores": [score for _, score in ranked]}]
+        return [[{"label": label, "score": score} for label, score in ranked]]
@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Set while a raced prediction runs: the event is set once the race is decided, so a
+# call that only now got its turn at the upstream can give up instead of sending
+race_cancelled = contextvars.ContextVar("race_cancelled", default=None)
+
+
+class RaceCancelled(Exception):
+    """Raised by a raced call that would start after another model already won."""
+
+
+def check_race_cancelled():
+    """Raises RaceCancelled when the current raced prediction is no longer needed."""
+    cancelled = race_cancelled.get()
+    if cancelled is not None and cancelled.is_set():
+        raise RaceCancelled("Cancelled, another model already answered")
+
+
+def _is_usable(result):
+    score, label, _ = result
+    return score is not None and label is not None
+
+
+def _winner(results, model_count):
+    """Scans in priority order and stops at the first model that has not answered yet."""
+    for index in range(model_count):
+        if index not in results:
+            return None
+        if _is_usable(results[index]):
+            return index
+    return None
+
+
+def _deadline_winner(results):
+    """Out of time: the highest-priority usable answer that did arrive."""
+    usable = [index for index, result in results.items() if _is_usable(result)]
+    return min(usable) if usable else None
+
+
+def _race_result(models, results, index):
+    if index is None:
+        last_error = results[max(results)][2] if results else {"error": "No model answered before the deadline"}
+        return None, None, last_error, "None"
+    score, label, output = results[index]
+    return score, label, output, models[index]
+
+
+def race_models(models, predict, input_text, executor, hedge_delay=2.0, deadline=30.0, hedge_executor=None):
+    """
+    Runs the model fallback chain concurrently with hedged starts.
+
+    The first model starts immediately. Each following model starts either after
+    `hedge_delay` seconds or as soon as every model started so far has failed,
+    whichever comes first. The answer of the highest-priority model that
+    produced a usable prediction wins; a lower-priority answer is only accepted
+    once every model ahead of it has failed, or when the deadline is reached.
+
+    Only hedged calls, started while an earlier model is still in flight, can
+    be left running when the race ends. They run on `hedge_executor` when
+    given, so abandoned calls never hold workers of `executor`. A call that
+    has not reached the upstream yet skips it through check_race_cancelled.
+
+    Returns a tuple: (score, label, output, used_model). used_model is "None" and
+    score/label are None when no model produced a usable prediction in time.
+    """
+    started_at = time.monotonic()
+    ends_at = started_at + deadline
+    cancelled = threading.Event()
+    results = {}  # model index -> (score, label, output)
+    futures = {}  # future -> model index
+    next_index = 0
+    next_launch_at = started_at
+
+    def run(model_name):
+        # Calls still queued in the executor when the race ends are skipped
+        if cancelled.is_set():
+            return None, None, {"error": "Cancelled, another model already answered"}
+        race_cancelled.set(cancelled)
+        return predict(model_name, input_text)
+
+    def finish(index):
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+        return _race_result(models, results, index)
+
+    while True:
+        now = time.monotonic()
+        pending = [future for future in futures if not future.done()]
+
+        # Start the next model when its hedge timer fires or nothing is left in flight
+        if next_index < len(models) and (now >= next_launch_at or not pending):
+            hedged = bool(pending) and hedge_executor is not None
+            future = (hedge_executor if hedged else executor).submit(run, models[next_index])
+            futures[future] = next_index
+            next_index += 1
+            next_launch_at = now + hedge_delay
+            continue
+
+        if not pending and next_index >= len(models):
+            return finish(_winner(results, len(models)))
+
+        if now >= ends_at:
+            print(f"⏱️ Model race hit the {deadline}s deadline with {len(pending)} call(s) in flight.")
+            return finish(_deadline_winner(results))
+
+        wake_at = ends_at if next_index >= len(models) else min(ends_at, next_launch_at)
+        done, _ = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = (None, None, {"error": f"Prediction processing error: {str(e)}"})
+            # A failure means the next model should not wait for its hedge timer
+            if not _is_usable(results[futures[future]]):
+                next_launch_at = time.monotonic()
+
+        index = _winner(results, len(models))
+        if index is not None:
+            return finish(index)
+
+
+async def race_models_async(models, predict, input_text, hedge_delay=2.0, deadline=30.0):
+    """
+    asyncio version of race_models. `predict` is a coroutine function; calls
+    still in flight when the race ends are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    ends_at = started_at + deadline
+    results = {}  # model index -> (score, label, output)
+    tasks = {}  # task -> model index
+    next_index = 0
+    next_launch_at = started_at
+
+    try:
+        while True:
+            now = loop.time()
+            pending = [task for task in tasks if not task.done()]
+
+            if next_index < len(models) and (now >= next_launch_at or not pending):
+                task = asyncio.ensure_future(predict(models[next_index], input_text))
+                tasks[task] = next_index
+                next_index += 1
+                next_launch_at = now + hedge_delay
+                continue
+
+            if not pending and next_index >= len(models):
+                return _race_result(models, results, _winner(results, len(models)))
+
+            if now >= ends_at:
+                print(f"⏱️ Model race hit the {deadline}s deadline with {len(pending)} call(s) in flight.")
+                return _race_result(models, results, _deadline_winner(results))
+
+            wake_at = ends_at if next_index >= len(models) else min(ends_at, next_launch_at)
+            done, _ = await asyncio.wait(pending, timeout=max(wake_at - now, 0), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    results[tasks[task]] = task.result()
+                except Exception as e:
+                    results[tasks[task]] = (None, None, {"error": f"Prediction processing error: {str(e)}"})
+                if not _is_usable(results[tasks[task]]):
+                    next_launch_at = loop.time()
+
+            index = _winner(results, len(models))
+            if index is not None:
+                return _race_result(models, results, index)
+    finally:
+        for task in tasks:
+            task.cancel()
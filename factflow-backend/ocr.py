@@ -0,0 +1,195 @@
+import io
+import os
+import queue
+import subprocess
+import threading
+import time
+
+import pytesseract
+from PIL import Image, ImageOps
+
+# tesserocr keeps Tesseract loaded in-process; without it every image spawns the tesseract binary
+try:
+    from tesserocr import PyTessBaseAPI
+except ImportError:
+    PyTessBaseAPI = None
+
+# Set default path for Windows, for Linux/Mac assume tesseract is in PATH
+if os.name == 'nt' and pytesseract.pytesseract.tesseract_cmd == 'tesseract':
+    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+# Margin kept around the detected text when cropping
+CROP_PADDING = 10
+
+
+def load_image(stream, max_dimension=2000):
+    """
+    Decodes an image from a file-like object, downscaled to at most
+    `max_dimension` pixels per side and converted to grayscale.
+    JPEGs are decoded directly at a reduced scale (PIL draft mode).
+    Raises Image.UnidentifiedImageError for unreadable images.
+    """
+    img = Image.open(stream)
+    ratio = min(max_dimension / max(img.size), 1.0)
+    # draft only picks a reduced scale that keeps both sides above the requested size
+    img.draft("L", (int(img.width * ratio), int(img.height * ratio)))
+    img = img.convert("L")
+    img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return img
+
+
+def otsu_threshold(histogram):
+    """Gray level that best separates the two classes of a 256-bin histogram."""
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    weight_bg = sum_bg = 0
+    best_threshold, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        weight_fg = total - weight_bg
+        if weight_bg == 0:
+            continue
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def binarize_and_crop(img):
+    """
+    Turns a grayscale image into dark text on a white background and crops
+    it to the area that holds text. Returns None for a blank image.
+    """
+    histogram = img.histogram()
+    threshold = otsu_threshold(histogram)
+    dark_pixels = sum(histogram[:threshold + 1])
+    # Text is the minority class, invert light-on-dark images
+    if dark_pixels > sum(histogram) - dark_pixels:
+        table = [0 if level > threshold else 255 for level in range(256)]
+    else:
+        table = [255 if level > threshold else 0 for level in range(256)]
+    binary = img.point(table)
+
+    box = ImageOps.invert(binary).getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    return binary.crop((
+        max(left - CROP_PADDING, 0), max(top - CROP_PADDING, 0),
+        min(right + CROP_PADDING, binary.width), min(bottom + CROP_PADDING, binary.height)
+    ))
+
+
+class OcrEngine:
+    """
+    In-memory OCR for uploaded images.
+
+    Images are decoded from the request stream, downscaled, binarized and
+    cropped without touching the disk. Recognition runs on a pool of up to
+    `workers` persistent tesserocr instances; without tesserocr the tesseract
+    binary is fed through stdin/stdout, which still avoids temp files.
+    """
+
+    def __init__(self, workers=2, lang="eng", psm=3, oem=3, max_dimension=2000, binarize=True):
+        self.workers = workers
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+        self.max_dimension = max_dimension
+        self.binarize = binarize
+        self.backend = "tesserocr" if PyTessBaseAPI is not None else "tesseract-cli"
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {"images": 0, "blank_images": 0, "decode_seconds": 0.0,
+                       "preprocess_seconds": 0.0, "recognize_seconds": 0.0}
+
+    def extract_text(self, stream, on_stage=None):
+        """
+        Returns the text found in the image read from `stream`.
+        `on_stage(stage, seconds)` is called with the duration of each stage.
+        Raises pytesseract.TesseractNotFoundError when Tesseract is unavailable.
+        """
+        timings = {}
+        started_at = time.perf_counter()
+        img = load_image(stream, self.max_dimension)
+        timings["ocr_decode"] = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        if self.binarize:
+            img = binarize_and_crop(img)
+        timings["ocr_preprocess"] = time.perf_counter() - started_at
+
+        text = ""
+        if img is not None:
+            started_at = time.perf_counter()
+            text = self._recognize(img).strip()
+            timings["ocr_recognize"] = time.perf_counter() - started_at
+
+        with self._lock:
+            self._stats["images"] += 1
+            self._stats["blank_images"] += int(img is None)
+            self._stats["decode_seconds"] += timings["ocr_decode"]
+            self._stats["preprocess_seconds"] += timings["ocr_preprocess"]
+            self._stats["recognize_seconds"] += timings.get("ocr_recognize", 0.0)
+        if on_stage is not None:
+            for stage, seconds in timings.items():
+                on_stage(stage, seconds)
+        return text
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, backend=self.backend, workers=self._created, idle_workers=self._idle.qsize())
+        images = stats["images"] or 1
+        for stage in ("decode", "preprocess", "recognize"):
+            stats[f"avg_{stage}_ms"] = round(stats.pop(f"{stage}_seconds") / images * 1000, 2)
+        return stats
+
+    # --- Internal helpers ---
+
+    def _recognize(self, img):
+        if PyTessBaseAPI is None:
+            return self._recognize_cli(img)
+        api = self._acquire()
+        try:
+            api.SetImage(img)
+            return api.GetUTF8Text()
+        finally:
+            self._idle.put(api)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.workers
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return PyTessBaseAPI(lang=self.lang, psm=self.psm, oem=self.oem)
+        except RuntimeError as e:
+            with self._lock:
+                self._created -= 1
+            print(f"⚠️ Could not start Tesseract: {e}")
+            raise pytesseract.TesseractNotFoundError()
+
+    def _recognize_cli(self, img):
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", compress_level=1)
+        command = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout",
+                   "-l", self.lang, "--psm", str(self.psm), "--oem", str(self.oem)]
+        try:
+            result = subprocess.run(command, input=buffer.getvalue(), capture_output=True)
+        except FileNotFoundError:
+            raise pytesseract.TesseractNotFoundError()
+        if result.returncode != 0:
+            raise pytesseract.TesseractError(result.returncode, result.stderr.decode("utf-8", "replace"))
+        return result.stdout.decode("utf-8")
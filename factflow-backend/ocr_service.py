@@ -0,0 +1,192 @@
+import atexit
+import io
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from PIL import Image
+
+from ocr import OcrEngine
+
+_engine = None  # One OcrEngine per worker process
+
+
+def _init_worker(engine_options):
+    global _engine
+    _engine = OcrEngine(workers=1, **engine_options)
+
+
+def _warm_up():
+    return None
+
+
+def _run_ocr(data):
+    """
+    Runs in a worker process. Errors are returned by name because not all of
+    them can be pickled back to the parent.
+    """
+    timings = {}
+    try:
+        text = _engine.extract_text(io.BytesIO(data), on_stage=timings.__setitem__)
+    except pytesseract.TesseractNotFoundError:
+        return {"error": "tesseract_not_found"}
+    except Image.UnidentifiedImageError:
+        return {"error": "unidentified_image"}
+    except Exception as e:
+        return {"error": "failed", "message": str(e)}
+    return {"text": text, "timings": timings}
+
+
+class OcrQueueFull(Exception):
+    """Raised when the OCR queue cannot take another image; retry_after is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"OCR queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OcrService:
+    """
+    OCR on a dedicated process pool, so CPU-bound Tesseract work uses every
+    core and never runs on the request threads.
+
+    At most `processes + max_queue` images are admitted at a time; beyond
+    that `submit` raises OcrQueueFull with an estimated wait. The pool is
+    created on first use by the process that uses it, and again after a
+    fork: a pool inherited from a preloaded app lost its manager thread, so
+    its futures would never complete.
+    """
+
+    def __init__(self, processes=2, max_queue=16, engine_options=None):
+        self.processes = processes
+        self.max_queue = max_queue
+        self.engine_options = engine_options or {}
+        self._executor = None
+        self._pid = None  # Process that created the executor
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "ocr_seconds": 0.0, "restarts": 0}
+
+        atexit.register(self.shutdown)
+
+        # The pool starts lazily, when the app already runs threads, and forking a
+        # threaded process can copy a lock some thread holds. Workers come from a
+        # single-threaded fork server instead, preloaded with this module; the
+        # initializer loads everything else they need
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._mp_context = multiprocessing.get_context("forkserver")
+            self._mp_context.set_forkserver_preload([__name__])
+        else:
+            self._mp_context = multiprocessing.get_context("spawn")
+
+    def warm_up(self):
+        """Starts the worker processes now instead of on the first image."""
+        with self._lock:
+            executor = self._own_executor() or self._start()
+        executor.submit(_warm_up).result()
+
+    def submit(self, data):
+        """
+        Queues OCR of the image bytes and returns a Future for the worker outcome,
+        to be passed to `unwrap`. Raises OcrQueueFull when the queue is full.
+        """
+        with self._lock:
+            executor = self._own_executor()
+            if self._pending >= self.processes + self.max_queue:
+                self._stats["rejected"] += 1
+                raise OcrQueueFull(self._retry_after())
+            self._pending += 1
+            self._stats["submitted"] += 1
+            executor = executor or self._start()
+
+        try:
+            try:
+                future = executor.submit(_run_ocr, data)
+            except BrokenProcessPool:
+                print("⚠️ OCR worker pool broke, restarting it.")
+                with self._lock:
+                    self._stats["restarts"] += 1
+                    executor = self._start()
+                future = executor.submit(_run_ocr, data)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        future.add_done_callback(self._on_done)
+        return future
+
+    @staticmethod
+    def unwrap(outcome, on_stage=None):
+        """
+        Turns a worker outcome into the extracted text, re-raising
+        pytesseract.TesseractNotFoundError and Image.UnidentifiedImageError.
+        """
+        error = outcome.get("error")
+        if error == "tesseract_not_found":
+            raise pytesseract.TesseractNotFoundError()
+        if error == "unidentified_image":
+            raise Image.UnidentifiedImageError("cannot identify image file")
+        if error is not None:
+            raise RuntimeError(outcome.get("message", error))
+        if on_stage is not None:
+            for stage, seconds in outcome["timings"].items():
+                on_stage(stage, seconds)
+        return outcome["text"]
+
+    def extract_text(self, data, on_stage=None):
+        """Blocking OCR of the image bytes. Raises OcrQueueFull when the queue is full."""
+        return self.unwrap(self.submit(data).result(), on_stage)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, pending=self._pending, processes=self.processes, max_queue=self.max_queue)
+        ocr_seconds = stats.pop("ocr_seconds")
+        stats["avg_ocr_ms"] = round(ocr_seconds / stats["completed"] * 1000, 2) if stats["completed"] else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor = self._own_executor()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # --- Internal helpers ---
+
+    def _own_executor(self):
+        # Called with self._lock held: the executor, unless it was inherited through a fork
+        if self._pid != os.getpid():
+            # Its workers, manager thread and queued images belong to the parent
+            self._executor = None
+            self._pending = 0
+            self._pid = os.getpid()
+        return self._executor
+
+    def _start(self):
+        # Called with self._lock held
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=self._mp_context,
+            initializer=_init_worker, initargs=(self.engine_options,)
+        )
+        self._pid = os.getpid()
+        return self._executor
+
+    def _on_done(self, future):
+        outcome = future.result() if not future.cancelled() and future.exception() is None else {}
+        with self._lock:
+            self._pending -= 1
+            self._stats["completed"] += 1
+            self._stats["ocr_seconds"] += sum(outcome.get("timings", {}).values())
+
+    def _retry_after(self):
+        # Called with self._lock held: time for the workers to drain the queue
+        completed = self._stats["completed"]
+        average = self._stats["ocr_seconds"] / completed if completed else 1.0
+        return max(1, math.ceil(self._pending / self.processes * average))
@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class LazyResource:
+    """
+    A shared client that is created on first use instead of at import.
+
+    `factory()` builds the client. `warm_up(client)`, if given, makes it
+    ready to serve (e.g. opens a first connection) and only runs when
+    `warm` is called. A factory that raises is retried on the next use.
+    """
+
+    def __init__(self, name, factory, warm_up=None):
+        self.name = name
+        self._factory = factory
+        self._warm_up = warm_up
+        self._resource = None
+        self._lock = threading.Lock()
+        self._stats = {"init_ms": None, "warm_up_ms": None, "failures": 0}
+
+    @property
+    def created(self):
+        return self._resource is not None
+
+    def get(self):
+        resource = self._resource
+        if resource is not None:
+            return resource
+        with self._lock:
+            if self._resource is None:
+                started_at = time.perf_counter()
+                try:
+                    self._resource = self._factory()
+                except Exception:
+                    self._stats["failures"] += 1
+                    raise
+                self._stats["init_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+                print(f"🔌 {self.name} client created in {self._stats['init_ms']}ms")
+            return self._resource
+
+    def warm(self):
+        """Creates the client and runs its warm-up."""
+        resource = self.get()
+        if self._warm_up is not None:
+            started_at = time.perf_counter()
+            self._warm_up(resource)
+            self._stats["warm_up_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+
+    def override(self, resource):
+        """Uses `resource` from now on instead of creating one, e.g. a stand-in in benchmarks."""
+        with self._lock:
+            self._resource = resource
+
+    def stats(self):
+        return dict(self._stats, created=self.created)
+
+
+class LazyCollection:
+    """
+    Stands in for a MongoDB collection; the client behind `client_resource`
+    is only created when the collection is first used.
+    """
+
+    def __init__(self, client_resource, database, name):
+        self._client_resource = client_resource
+        self._database = database
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._client_resource.get()[self._database][self._name], attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self._database}.{self._name})"
+
+
+def warm_up_in_background(resources, tasks=()):
+    """
+    Runs `tasks` (plain callables) and warms `resources` on a daemon thread, so
+    startup does not wait for them. Failures are logged; the resource is
+    created again on first use.
+    """
+    def run():
+        for task in tasks:
+            try:
+                task()
+            except Exception as e:
+                print(f"⚠️ Startup task {getattr(task, '__name__', task)} failed: {e}")
+        for resource in resources:
+            try:
+                resource.warm()
+            except Exception as e:
+                print(f"⚠️ Could not warm up {resource.name}: {e}")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
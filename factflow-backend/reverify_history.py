@@ -0,0 +1,410 @@
+"""
+Bulk re-verification of the claims stored in the history collection.
+
+Streams text entries from the history collection through a server-side
+cursor, in _id order, and checks every distinct claim once with
+process_text_for_fakery on a pool of threads or processes. Entries whose
+verdict changed get the new one written back with bulk_write, together
+with the previous verdict and the model version that produced the new one.
+Run it after changing models or prompts to measure how many verdicts drift.
+
+Entries are handled in chunks. After each chunk the last _id and the counts
+so far are saved to --checkpoint, and --resume continues from there. The
+verdict cache and the claim index are bypassed, so every claim is checked
+by the current pipeline. Checks run at bulk priority and wait out the
+admission limits instead of failing.
+
+Run from factflow-backend/:
+    python reverify_history.py --dry-run --limit 1000
+    python reverify_history.py --workers 16 --checkpoint reverify.json
+    python reverify_history.py --checkpoint reverify.json --resume
+    python reverify_history.py --offline --seed-docs 500 --pool process --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELS = ("REAL", "FAKE", "UNSURE")
+# Only the fields the job reads
+PROJECTION = {'content': 1, 'result': 1, 'confidence': 1}
+
+# The app, imported by setup_app() in this process and in every pool worker
+app = None
+_max_retries = 5
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pool", choices=("thread", "process"), default="thread",
+                        help="Check claims on threads (default) or on processes with an app each")
+    parser.add_argument("--workers", type=int, default=8, help="Claims checked at once")
+    parser.add_argument("--chunk-size", type=int, default=200, help="History entries per chunk and checkpoint")
+    parser.add_argument("--cursor-batch-size", type=int, default=500, help="Entries per cursor round trip")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many entries, 0 for all")
+    parser.add_argument("--memo-size", type=int, default=100000,
+                        help="Verdicts remembered across chunks, so repeated claims are checked once")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries of a claim shed by admission control")
+    parser.add_argument("--checkpoint", help="JSON file the progress is saved to after each chunk")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Count the changes without writing them")
+    parser.add_argument("--use-claim-index", action="store_true",
+                        help="Reuse the claim index for near-identical claims instead of checking them again")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--offline", action="store_true",
+                        help="Run against the local stand-ins in benchmarks/mock_upstreams.py")
+    parser.add_argument("--seed-docs", type=int, default=0, help="With --offline, history entries to generate")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="With --seed-docs, share of repeated claims")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="With --offline, stand-in latency")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    if args.seed_docs and not args.offline:
+        parser.error("--seed-docs only works with --offline")
+    return args
+
+
+# --- App setup ---
+
+def configure_environment(options):
+    """Settings for the job, applied before the app is imported; explicit environment values win."""
+    if not options["use_claim_index"]:
+        os.environ["CLAIM_INDEX_ENABLED"] = "false"
+    # The job reads no images
+    os.environ.setdefault("OCR_WORKERS", "1")
+    os.environ.setdefault("STARTUP_WARMUP", "")
+    if options["offline"]:
+        os.environ.setdefault("TRANSLATION_PRECOMPUTE_LABELS", "false")
+        os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+        os.environ.setdefault("HISTORY_JOURNAL_DIR", tempfile.mkdtemp(prefix="reverify-journal-"))
+
+
+def setup_app(options, counter=None):
+    """Imports the app, with the stand-ins in place of Gemini, the translator and MongoDB when offline."""
+    global app
+    configure_environment(options)
+    sys.path.insert(0, BACKEND_DIR)
+    import app as factflow_app
+    if options["offline"]:
+        sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+        from mock_upstreams import CallCounter, Faults, MemoryMongoClient, MockGeminiModel, MockTranslator
+        counter = counter or CallCounter()
+        latency = options["upstream_latency_ms"]
+        factflow_app.gemini_model.override(MockGeminiModel(Faults(latency, latency / 2), counter))
+        factflow_app.google_translate = MockTranslator(Faults(latency, latency / 2), counter)
+        factflow_app.mongo_client.override(MemoryMongoClient(Faults(), counter))
+    app = factflow_app
+    return factflow_app
+
+
+def check_text(text):
+    """
+    Checks one claim with the current pipeline, at bulk priority. Checks shed by
+    admission control are retried after their Retry-After. Returns a dict with
+    "status" and, for checked claims, the English "label", "confidence" and "language".
+    """
+    app.request_priority.set(app.BULK)
+    for attempt in range(_max_retries + 1):
+        try:
+            app.check_budget.admit("all")
+            with app.check_slots.slot():
+                response_data, status_code = app.process_text_for_fakery(text, "reverify", localize=False)
+            break
+        except app.Overloaded as e:
+            if attempt == _max_retries:
+                return {"status": e.status_code, "error": str(e)}
+            time.sleep(e.retry_after)
+        except Exception as e:
+            return {"status": 500, "error": f"{type(e).__name__}: {e}"}
+    return {
+        "status": status_code,
+        "label": response_data.get("label"),
+        "confidence": response_data.get("confidence_score"),
+        "language": response_data.get("language", "en")
+    }
+
+
+def init_process_worker(options):
+    """Initializer of the process pool: every worker imports its own app."""
+    global _max_retries
+    _max_retries = options["max_retries"]
+    setup_app(options)
+
+
+def make_pool(options):
+    if options["pool"] == "process":
+        # Spawned, not forked: the app's pools and clients do not survive a fork
+        return ProcessPoolExecutor(max_workers=options["workers"], mp_context=get_context("spawn"),
+                                   initializer=init_process_worker, initargs=(options,))
+    return ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="reverify")
+
+
+# --- History ---
+
+def iter_history(collection, after_id, batch_size):
+    """
+    Text entries of the history collection in _id order, after `after_id`.
+    A cursor that times out on the server is reopened after the last entry read.
+    """
+    from pymongo.errors import CursorNotFound
+    while True:
+        query = {'type': 'text'}
+        if after_id is not None:
+            query['_id'] = {'$gt': after_id}
+        cursor = collection.find(query, PROJECTION).sort([('_id', 1)]).batch_size(batch_size)
+        try:
+            for entry in cursor:
+                after_id = entry['_id']
+                yield entry
+            return
+        except CursorNotFound:
+            print(f"⚠️ History cursor expired after {after_id}, reopening it")
+
+
+def seed_history(collection, count, repeat_ratio):
+    """Fills the stand-in history collection with generated entries, some of them repeated claims."""
+    import random
+    from bson import ObjectId
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+    from load_test import ClaimSource
+    claims = ClaimSource(repeat_ratio, foreign_ratio=0.1)
+    previous = random.Random(2)
+    collection.insert_many([{
+        '_id': ObjectId(),
+        'userId': ObjectId(),
+        'content': claims.next(),
+        'type': 'text',
+        'result': previous.choice(LABELS),
+        'confidence': round(previous.uniform(5, 9.5), 1),
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    } for _ in range(count)])
+
+
+class LabelNormalizer:
+    """Maps stored labels, which the frontend saves in the user's language, back to English ones."""
+
+    def __init__(self):
+        self._known = {}
+
+    def english(self, stored, language):
+        if stored in LABELS:
+            return stored
+        if not isinstance(stored, str) or language == "en":
+            return None
+        if language not in self._known:
+            # The labels are usually precomputed, so these translations are cache hits
+            self._known[language] = {app.translate_text(label, language, 'en').casefold(): label for label in LABELS}
+        return self._known[language].get(stored.casefold())
+
+
+# --- The job ---
+
+class Reverification:
+    """Counts, memo of checked claims and checkpoint of one run."""
+
+    def __init__(self, options, checkpoint=None):
+        self.options = options
+        self.memo = OrderedDict()
+        self.labels = LabelNormalizer()
+        checkpoint = checkpoint or {}
+        self.last_id = checkpoint.get("last_id")
+        self.counts = Counter(checkpoint.get("counts", {}))
+        self.transitions = Counter(checkpoint.get("transitions", {}))
+        self.confidence_drift = checkpoint.get("confidence_drift", 0.0)
+        self.started_at = time.perf_counter()
+        self.run_counts = Counter()
+
+    def run_chunk(self, pool, entries):
+        """Checks the distinct claims of a chunk, writes the changed verdicts and saves the checkpoint."""
+        from verdict_cache import normalize_text
+        keys = [normalize_text(entry.get('content', '')) for entry in entries]
+        # Verdicts of this chunk's claims, whatever the memo keeps afterwards
+        results = {}
+        pending = {}
+        for key, entry in zip(keys, entries):
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                results[key] = self.memo[key]
+            elif key not in pending:
+                pending[key] = entry['content']
+        self.count("duplicates", len(entries) - len(pending))
+        checked = pool.map(check_text, pending.values(), chunksize=max(1, len(pending) // (self.options["workers"] * 4)))
+        for key, result in zip(pending, checked):
+            results[key] = self.memo[key] = result
+            self.count("claims_checked")
+        while len(self.memo) > self.options["memo_size"]:
+            self.memo.popitem(last=False)
+
+        updates = [update for update in (self.compare(entry, results[key]) for key, entry in zip(keys, entries))
+                   if update is not None]
+        if updates and not self.options["dry_run"]:
+            from pymongo import UpdateOne
+            outcome = app.history_collection.bulk_write(
+                [UpdateOne({'_id': entry_id}, {'$set': fields}) for entry_id, fields in updates], ordered=False)
+            self.count("written", outcome.modified_count)
+        self.count("entries", len(entries))
+        self.last_id = entries[-1]['_id']
+        self.save_checkpoint()
+
+    def compare(self, entry, result):
+        """Counts the outcome for one entry; returns (_id, fields to set) when its verdict changed."""
+        if result["status"] == 400:
+            self.count("invalid")
+            return None
+        if result["status"] != 200:
+            self.count("failed")
+            return None
+        previous = self.labels.english(entry.get('result'), result["language"])
+        if isinstance(entry.get('confidence'), (int, float)) and isinstance(result["confidence"], (int, float)):
+            self.confidence_drift += abs(result["confidence"] - entry['confidence'])
+            self.count("confidence_compared")
+        if previous == result["label"]:
+            self.count("unchanged")
+            return None
+        self.count("changed")
+        self.transitions[f"{previous or entry.get('result')}->{result['label']}"] += 1
+        return entry['_id'], {
+            'result': result["label"],
+            'confidence': result["confidence"],
+            'previousResult': entry.get('result'),
+            'previousConfidence': entry.get('confidence'),
+            'modelVersion': f"{app.MODEL_VERSION}|{app.GEMINI_PROMPT_VERSION}",
+            'reverifiedAt': datetime.now(timezone.utc).isoformat()
+        }
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+        self.run_counts[name] += amount
+
+    def save_checkpoint(self):
+        if not self.options["checkpoint"]:
+            return
+        state = {
+            "last_id": str(self.last_id),
+            "counts": dict(self.counts),
+            "transitions": dict(self.transitions),
+            "confidence_drift": self.confidence_drift,
+            "model_version": f"{app.MODEL_VERSION}|{app.GEMINI_PROMPT_VERSION}",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        # Written next to the checkpoint and renamed over it, so a crash never leaves half a file
+        temporary = f"{self.options['checkpoint']}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temporary, self.options["checkpoint"])
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started_at
+        counts = self.counts
+        compared = counts["changed"] + counts["unchanged"]
+        return {
+            "entries": counts["entries"],
+            "claims_checked": counts["claims_checked"],
+            "duplicates": counts["duplicates"],
+            "changed": counts["changed"],
+            "unchanged": counts["unchanged"],
+            "invalid": counts["invalid"],
+            "failed": counts["failed"],
+            "written": counts["written"],
+            "change_rate": round(counts["changed"] / compared, 4) if compared else 0.0,
+            "mean_confidence_drift": round(self.confidence_drift / counts["confidence_compared"], 2)
+            if counts["confidence_compared"] else None,
+            "transitions": dict(self.transitions.most_common()),
+            "last_id": str(self.last_id) if self.last_id is not None else None,
+            "this_run": {
+                "elapsed_s": round(elapsed, 2),
+                "entries": self.run_counts["entries"],
+                "claims_checked": self.run_counts["claims_checked"],
+                "claims_per_s": round(self.run_counts["claims_checked"] / elapsed, 2) if elapsed else 0.0,
+                "entries_per_s": round(self.run_counts["entries"] / elapsed, 2) if elapsed else 0.0
+            }
+        }
+
+
+def load_checkpoint(path):
+    from bson import ObjectId
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        print(f"No checkpoint at {path}, starting from the beginning")
+        return None
+    checkpoint["last_id"] = ObjectId(checkpoint["last_id"]) if checkpoint.get("last_id") not in (None, "None") else None
+    print(f"Resuming after {checkpoint['last_id']} ({checkpoint['counts'].get('entries', 0)} entries done)")
+    return checkpoint
+
+
+def print_report(report):
+    run = report["this_run"]
+    print(f"\nentries: {report['entries']}, claims checked: {report['claims_checked']}, "
+          f"duplicates: {report['duplicates']}")
+    print(f"changed: {report['changed']} ({report['change_rate']:.1%}), unchanged: {report['unchanged']}, "
+          f"invalid: {report['invalid']}, failed: {report['failed']}, written: {report['written']}")
+    print(f"mean confidence drift: {report['mean_confidence_drift']}")
+    for transition, count in report["transitions"].items():
+        print(f"  {transition:<16} {count}")
+    print(f"this run: {run['claims_checked']} claims in {run['elapsed_s']}s, {run['claims_per_s']} claims/s, "
+          f"{run['entries_per_s']} entries/s")
+
+
+def main():
+    args = parse_args()
+    options = {name: getattr(args, name) for name in (
+        "pool", "workers", "max_retries", "memo_size", "checkpoint", "dry_run", "use_claim_index", "offline",
+        "upstream_latency_ms")}
+
+    hf = counter = None
+    if args.offline:
+        sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+        from mock_upstreams import CallCounter, Faults, MockHuggingFace
+        counter = CallCounter()
+        hf = MockHuggingFace(Faults(args.upstream_latency_ms, args.upstream_latency_ms / 2), counter).start()
+        # Inherited by spawned workers as well
+        os.environ["HF_INFERENCE_URL"] = hf.url
+    global _max_retries
+    _max_retries = args.max_retries
+    setup_app(options, counter)
+    if args.seed_docs:
+        seed_history(app.history_collection, args.seed_docs, args.repeat_ratio)
+
+    job = Reverification(options, load_checkpoint(args.checkpoint) if args.resume else None)
+    print(f"Re-verifying history with {args.workers} {args.pool} workers"
+          f"{' (dry run)' if args.dry_run else ''}, model version {app.MODEL_VERSION}|{app.GEMINI_PROMPT_VERSION}")
+    entries = iter_history(app.history_collection, job.last_id, args.cursor_batch_size)
+    with make_pool(options) as pool:
+        chunk = []
+        for entry in entries:
+            chunk.append(entry)
+            done = args.limit and job.run_counts["entries"] + len(chunk) >= args.limit
+            if len(chunk) == args.chunk_size or done:
+                job.run_chunk(pool, chunk)
+                chunk = []
+                run = job.report()["this_run"]
+                print(f"{job.counts['entries']} entries, {job.counts['claims_checked']} claims checked, "
+                      f"{job.counts['changed']} changed ({run['claims_per_s']} claims/s)")
+                if done:
+                    break
+        if chunk:
+            job.run_chunk(pool, chunk)
+
+    report = job.report()
+    if counter is not None:
+        # Calls made by this process; process workers count their Gemini and translator calls on their own
+        report["upstream_calls"] = counter.snapshot()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if hf is not None:
+        hf.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import glob
+import threading
+import time
+
+from history_sink import HistorySink
+
+
+class SlowCollection:
+    """Records inserted entries; each insert_many takes a while, so writers overlap."""
+
+    def __init__(self):
+        self.ids = []
+        self._lock = threading.Lock()
+
+    def insert_many(self, entries, ordered=True):
+        time.sleep(0.005)
+        with self._lock:
+            self.ids.extend(entry["_id"] for entry in entries)
+
+
+def test_concurrent_flushes_write_every_entry_once(tmp_path):
+    collection = SlowCollection()
+    sink = HistorySink(collection, str(tmp_path), batch_size=5, flush_interval=0.001)
+    errors = []
+
+    def add_and_flush(worker):
+        try:
+            for i in range(40):
+                sink.add({"_id": f"{worker}-{i}"})
+                if i % 3 == 0:
+                    assert sink.flush()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=add_and_flush, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sink.flush()
+    sink.close()
+
+    assert errors == []
+    assert sorted(collection.ids) == sorted(f"{worker}-{i}" for worker in range(8) for i in range(40))
+    assert sink.stats()["pending"] == 0
+    assert glob.glob(str(tmp_path / "*.journal")) == []
+
@@ -0,0 +1,56 @@
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+from image_cache import ImageCache, hamming_distance
+
+
+def screenshot(text, fmt="PNG"):
+    """A 1080x1350 post screenshot: the same header bar and text position for every text."""
+    img = Image.new("RGB", (1080, 1350), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 1080, 160), fill=(29, 161, 242))
+    draw.text((60, 300), text, fill="black", font=ImageFont.load_default(size=40))
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+RESIGNED = screenshot("The president resigned today")
+REFUSED = screenshot("The president refused to resign")
+
+
+def test_same_layout_screenshots_of_different_claims_do_not_share_a_verdict():
+    cache = ImageCache()
+    resigned, refused = cache.hash_image(RESIGNED), cache.hash_image(REFUSED)
+    # Close enough that a perceptual hash alone would call them the same image
+    assert hamming_distance(resigned.perceptual, refused.perceptual) <= 10
+
+    cache.set(resigned, "The president resigned today", ({"label": "REAL"}, 200))
+    assert cache.get(refused) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_identical_image_is_a_hit_after_being_saved_again():
+    cache = ImageCache()
+    cache.set(cache.hash_image(RESIGNED), "The president resigned today", ({"label": "REAL"}, 200))
+
+    # Same pixels in another file format
+    text, result = cache.get(cache.hash_image(screenshot("The president resigned today", fmt="BMP")))
+    assert text == "The president resigned today"
+    assert result == ({"label": "REAL"}, 200)
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_near_duplicate_reuse_is_opt_in():
+    resized = io.BytesIO()
+    Image.open(io.BytesIO(RESIGNED)).resize((540, 675), Image.LANCZOS).save(resized, format="JPEG", quality=60)
+
+    exact_only = ImageCache()
+    exact_only.set(exact_only.hash_image(RESIGNED), "The president resigned today", ({"label": "REAL"}, 200))
+    assert exact_only.get(exact_only.hash_image(resized.getvalue())) is None
+
+    near = ImageCache(max_distance=10)
+    near.set(near.hash_image(RESIGNED), "The president resigned today", ({"label": "REAL"}, 200))
+    assert near.get(near.hash_image(resized.getvalue())) is not None
+    assert near.stats()["near_hits"] == 1
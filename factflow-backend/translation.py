@@ -0,0 +1,138 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Our language codes that Google Translate spells differently
+GOOGLE_LANGUAGE_CODES = {'zh': 'zh-CN'}
+
+# Google Translate rejects inputs above 5000 characters
+MAX_BATCH_CHARS = 4500
+BATCH_SEPARATOR = "\n||\n"
+
+
+def google_translate(text, target_lang, source_lang):
+    """Default translation backend, one GoogleTranslator call."""
+    # Imported on first use, deep_translator is slow to import
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(
+        source=GOOGLE_LANGUAGE_CODES.get(source_lang, source_lang),
+        target=GOOGLE_LANGUAGE_CODES.get(target_lang, target_lang)
+    ).translate(text)
+
+
+class Translator:
+    """
+    Memoizing translation layer.
+
+    Translations are cached by (source, target, text hash) in an LRU. Strings
+    registered through `pin` (e.g. the verdict labels) are never evicted.
+    `translate_many` packs several strings into one upstream call.
+    """
+
+    def __init__(self, backend=google_translate, max_entries=5000):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "upstream_calls": 0, "evictions": 0}
+
+    def translate(self, text, target_lang, source_lang='auto'):
+        """Translates one string. Raises whatever the backend raises on failure."""
+        cached = self.get_cached(text, target_lang, source_lang)
+        if cached is not None:
+            return cached
+        translated = self._call_backend(text, target_lang, source_lang)
+        self.store(text, target_lang, source_lang, translated)
+        return translated
+
+    def translate_many(self, texts, target_lang, source_lang='auto'):
+        """
+        Translates several strings, sending the uncached ones in as few upstream
+        calls as possible. Returns the translations in input order.
+        """
+        results = [self.get_cached(text, target_lang, source_lang) for text in texts]
+        # Repeated strings (e.g. the same label for several claims) are sent once
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+
+        translated = {}
+        for chunk in self._chunks(missing):
+            translated.update(zip(chunk, self._translate_joined(chunk, target_lang, source_lang)))
+        for text, result in translated.items():
+            self.store(text, target_lang, source_lang, result)
+
+        # Answered from what was just translated, the cache may already have evicted it
+        return [result if result is not None else translated[text] for text, result in zip(texts, results)]
+
+    def pin(self, texts, target_langs, source_lang='en'):
+        """Precomputes translations that must never be evicted, one batched call per language."""
+        for target_lang in target_langs:
+            if target_lang == source_lang:
+                continue
+            try:
+                for text, translated in zip(texts, self.translate_many(texts, target_lang, source_lang)):
+                    with self._lock:
+                        self._pinned[self._key(text, target_lang, source_lang)] = translated
+            except Exception as e:
+                print(f"⚠️ Could not precompute translations to {target_lang}: {e}")
+
+    def get_cached(self, text, target_lang, source_lang='auto'):
+        key = self._key(text, target_lang, source_lang)
+        with self._lock:
+            if key in self._pinned:
+                self._stats["hits"] += 1
+                return self._pinned[key]
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, text, target_lang, source_lang, translated):
+        key = self._key(text, target_lang, source_lang)
+        with self._lock:
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), pinned=len(self._pinned))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    # --- Internal helpers ---
+
+    @staticmethod
+    def _key(text, target_lang, source_lang):
+        return source_lang, target_lang, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _call_backend(self, text, target_lang, source_lang):
+        with self._lock:
+            self._stats["upstream_calls"] += 1
+        return self.backend(text, target_lang, source_lang)
+
+    @staticmethod
+    def _chunks(texts):
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) + len(BATCH_SEPARATOR) > MAX_BATCH_CHARS:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + len(BATCH_SEPARATOR)
+        if chunk:
+            yield chunk
+
+    def _translate_joined(self, chunk, target_lang, source_lang):
+        if len(chunk) > 1:
+            joined = self._call_backend(BATCH_SEPARATOR.join(chunk), target_lang, source_lang)
+            parts = [part.strip() for part in joined.split("||")]
+            if len(parts) == len(chunk):
+                return parts
+            # The separator did not survive translation, fall back to one call per string
+        return [self._call_backend(text, target_lang, source_lang) for text in chunk]
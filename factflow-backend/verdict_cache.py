@@ -0,0 +1,134 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normalizes text so trivially different copies of a claim share a cache key."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def make_cache_key(text, model_version, prompt_version):
+    """Builds a content-addressed key from the normalized text and pipeline versions."""
+    digest = hashlib.sha256()
+    digest.update(f"{model_version}|{prompt_version}|".encode("utf-8"))
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    Two-tier cache for fact-check verdicts.
+    The first tier is an in-process LRU with a TTL, the optional second tier is a
+    MongoDB collection shared by every worker.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, shared_collection=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_collection = shared_collection
+        self._entries = OrderedDict()  # key -> (expires_at, response_dict, status_code)
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._indexed = False
+
+    def get(self, key):
+        """Returns (response_dict, status_code) for a cached verdict or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response_data, status_code = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["local_hits"] += 1
+                    return response_data, status_code
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        shared = self._get_shared(key)
+        with self._lock:
+            if shared is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["shared_hits"] += 1
+            self._store_local(key, shared[0], shared[1], now)
+        return shared
+
+    def set(self, key, response_data, status_code):
+        """Stores a verdict in both tiers."""
+        with self._lock:
+            self._store_local(key, response_data, status_code, time.monotonic())
+            self._stats["stores"] += 1
+        self._set_shared(key, response_data, status_code)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns counters and the overall hit ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_ratio"] = round((stats["local_hits"] + stats["shared_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["shared_tier"] = self.shared_collection is not None
+        return stats
+
+    # --- Internal helpers ---
+
+    def _store_local(self, key, response_data, status_code, now):
+        """Inserts into the LRU. Caller must hold the lock."""
+        self._entries[key] = (now + self.ttl_seconds, response_data, status_code)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _get_shared(self, key):
+        if self.shared_collection is None:
+            return None
+        try:
+            doc = self.shared_collection.find_one({"_id": key})
+        except Exception as e:
+            print(f"⚠️ Shared verdict cache read failed: {e}")
+            return None
+        if not doc:
+            return None
+        # The TTL monitor only runs once a minute, so double check the age here
+        created_at = doc.get("createdAt")
+        if created_at and created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+            return None
+        return doc["response"], doc["status"]
+
+    def _ensure_index(self):
+        # On the first write rather than at import, so a missing MongoDB does not stall startup.
+        # MongoDB removes expired documents on its own through the TTL index
+        if not self._indexed:
+            self.shared_collection.create_index("createdAt", expireAfterSeconds=self.ttl_seconds)
+            self._indexed = True
+
+    def _set_shared(self, key, response_data, status_code):
+        if self.shared_collection is None:
+            return
+        try:
+            self._ensure_index()
+            self.shared_collection.update_one(
+                {"_id": key},
+                {"$set": {"response": response_data, "status": status_code, "createdAt": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Shared verdict cache write failed: {e}")
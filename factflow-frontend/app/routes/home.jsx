@@ -77,6 +77,7 @@ export default function Home() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(user.token && { Authorization: `Bearer ${user.token}` }),
         },
         body: JSON.stringify({
           userId: user.userId,
@@ -33,7 +33,8 @@ export default function Login() {
       localStorage.setItem('user', JSON.stringify({
         email: data.email,
         username: data.username,
-        userId: data.userId
+        userId: data.userId,
+        token: data.token
       }));
       
       // Navigate to home page after successful login
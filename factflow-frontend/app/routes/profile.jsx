@@ -5,7 +5,9 @@ import NavigationBar from '../components/NavigationBar';
 export default function Profile() {
   const [user, setUser] = useState(null);
   const [searchHistory, setSearchHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const navigate = useNavigate();
 
@@ -21,32 +23,45 @@ export default function Profile() {
     fetchSearchHistory();
   }, [navigate]);
 
-  const fetchSearchHistory = async () => {
+  // Fetches the first page of history, or the page after `cursor`
+  const fetchSearchHistory = async (cursor = null) => {
     try {
-      setIsLoading(true);
+      cursor ? setIsLoadingMore(true) : setIsLoading(true);
       const userData = JSON.parse(localStorage.getItem('user'));
       
       if (!userData || !userData.userId) {
         throw new Error('User not authenticated');
       }
 
-      const response = await fetch(`http://localhost:5000/user/history/${userData.userId}`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`http://localhost:5000/user/history/${userData.userId}${query}`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
+          ...(userData.token && { Authorization: `Bearer ${userData.token}` }),
         },
       });
 
+      // The session token expired, log in again
+      if (response.status === 401) {
+        localStorage.removeItem('user');
+        navigate('/login');
+        return;
+      }
+
       if (!response.ok) {
         throw new Error('Failed to fetch search history');
       }
 
       const data = await response.json();
-      setSearchHistory(data.history || []);
+      const page = data.history || [];
+      setSearchHistory(previous => cursor ? [...previous, ...page] : page);
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       setError(err.message);
     } finally {
       setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
@@ -149,6 +164,18 @@ export default function Profile() {
                 ))}
               </div>
             )}
+
+            {!isLoading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <button
+                  onClick={() => fetchSearchHistory(nextCursor)}
+                  disabled={isLoadingMore}
+                  className="px-4 py-2 rounded-md border border-neon-green text-neon-green hover:bg-neon-green/10 transition-colors disabled:opacity-50"
+                >
+                  {isLoadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>